@@ -0,0 +1,145 @@
+"""
+Compares the allocations of the parse + response loop of a keep-alive connection when the request objects and
+the response parser are created for each request, as before they were reused, and when they are reused.
+CPython does not count the allocations themselves, so the loop is measured with what it has:
+sys.getallocatedblocks() for the memory blocks held while a request is handled and tracemalloc for the peak
+of the memory allocated by a request.
+Run with: python -m tests.web3pi_proxy.tools.allocation_benchmark
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import (
+    ResponseReceiverGeth,
+)
+from web3pi_proxy.core.rpc.request.middleware.defaultmiddlewares.requestreader import (
+    RequestStream,
+)
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+
+CONTENT = b'{"jsonrpc":"2.0","method":"eth_blockNumber","params":[],"id":0}'
+REQUEST = b"POST / HTTP/1.1\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (
+    len(CONTENT),
+    CONTENT,
+)
+RESULT = b'{"jsonrpc":"2.0","id":0,"result":"0x12a05f2"}'
+RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (
+    len(RESULT),
+    RESULT,
+)
+
+
+class FakeEndpointSocket:
+    """Answers every read with the whole response, there is no system call in the loop"""
+
+    def is_ready_read(self, timeout: float) -> bool:
+        return True
+
+    def recv_into(self, buffer: bytearray) -> int:
+        buffer[:len(RESPONSE)] = RESPONSE
+        return len(RESPONSE)
+
+    def fit_recv_buf_size(self, buf_size: int) -> None:
+        pass
+
+    def is_ssl(self) -> bool:
+        return False
+
+
+def ignore(data) -> None:
+    pass
+
+
+class FreshObjects:
+    """A new request object and a new response parser for each request"""
+
+    def __init__(self) -> None:
+        self.sock = FakeEndpointSocket()
+        self.stream = RequestStream()
+
+    def handle(self) -> tuple:
+        self.stream.spare = RPCRequest()
+        self.stream.feed_data(REQUEST)
+        req = self.stream.completed.popleft()
+        receiver = ResponseReceiverGeth(self.sock)
+        receiver.recv_response(ignore)
+        return req, receiver
+
+    def release(self, handled: tuple) -> None:
+        pass
+
+
+class ReusedObjects:
+    """The request objects are recycled by the stream, the receiver keeps its parser"""
+
+    def __init__(self) -> None:
+        self.stream = RequestStream()
+        self.receiver = ResponseReceiverGeth(FakeEndpointSocket())
+
+    def handle(self) -> tuple:
+        self.stream.spare = self.stream.take_spare_request()
+        self.stream.feed_data(REQUEST)
+        req = self.stream.completed.popleft()
+        self.receiver.recv_response(ignore)
+        return req, self.receiver
+
+    def release(self, handled: tuple) -> None:
+        self.stream.recycle(handled[0])
+
+
+def held_blocks(loop, number: int) -> float:
+    """Average number of memory blocks allocated by a request and held until it is released"""
+    total = 0
+    for _ in range(number):
+        before = sys.getallocatedblocks()
+        handled = loop.handle()
+        total += sys.getallocatedblocks() - before
+        loop.release(handled)
+        del handled
+    return total / number
+
+
+def peak_bytes(loop, number: int) -> float:
+    """Average peak of the memory allocated while a request is handled, bytes"""
+    total = 0
+    tracemalloc.start()
+    try:
+        for _ in range(number):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            loop.release(loop.handle())
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return total / number
+
+
+def request_time(loop, number: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(number):
+        loop.release(loop.handle())
+    return (time.perf_counter() - started_at) / number
+
+
+def main(number: int = 20_000) -> None:
+    print(f"{'parse + response loop':24}{'held blocks':>14}{'peak memory':>14}{'time':>12}")
+    for loop_class in (FreshObjects, ReusedObjects):
+        loop = loop_class()
+        for _ in range(100):  # the spare request objects and the receive buffers are created
+            loop.release(loop.handle())
+        gc.collect()
+        gc.disable()
+        try:
+            blocks = held_blocks(loop, number)
+            peak = peak_bytes(loop, number // 10)
+            duration = request_time(loop, number)
+        finally:
+            gc.enable()
+        print(f"{loop_class.__name__:24}{blocks:>14.1f}{peak:>12.0f} B{duration * 1e6:>9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
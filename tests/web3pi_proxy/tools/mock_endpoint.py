@@ -19,13 +19,39 @@ DEFAULT_INSTRUCTIONS = [
 
 DEFAULT_RPC_RESPONSE = b'{"jsonrpc":"2.0","id":0,"result":"THIS IS A MOCKED ENDPOINT"}'
 
+# a log of an ERC-20 transfer, the number of logs in the eth_getLogs responses of the mock sets their size
+LOG_ENTRY = (
+    b'{"address":"0x6b175474e89094c44da98b954eedeac495271d0f",'
+    b'"topics":["0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef",'
+    b'"0x000000000000000000000000a9d1e08c7793af67e9d92fe308d5697fb81d3e43",'
+    b'"0x00000000000000000000000028c6c06298d514db089934071355e5743bf21d60"],'
+    b'"data":"0x00000000000000000000000000000000000000000000000ad78ebc5ac6200000",'
+    b'"blockNumber":"0x12a05f2","transactionHash":"0x3f07a9c83155594c000642e7d60e8a8a00038d03e9849171a05ed0e2d47acbb3",'
+    b'"transactionIndex":"0x3c","blockHash":"0x9d2c2a1d4a3d5f7c5e7e3c0b2b0f8f9f3c1d6e2a7b4c8d9e0f1a2b3c4d5e6f70",'
+    b'"logIndex":"0x9f","removed":false}'
+)
+DEFAULT_NUM_LOGS = 1000
+
+
+def get_logs_payload(num_logs: int) -> bytes:
+    return b'{"jsonrpc":"2.0","id":0,"result":[' + b",".join([LOG_ENTRY] * num_logs) + b"]}"
 
+
+DEFAULT_ADDRESS = "0.0.0.0"
 DEFAULT_PORT = 8545
 
 
 class MockEndpoint:
-    def __init__(self, port=DEFAULT_PORT, instructions=DEFAULT_INSTRUCTIONS):
+    def __init__(
+        self,
+        port=DEFAULT_PORT,
+        instructions=DEFAULT_INSTRUCTIONS,
+        address=DEFAULT_ADDRESS,
+        num_logs=DEFAULT_NUM_LOGS,
+    ):
+        self.address = address
         self.port = port
+        self.logs_response = self.get_http_response(get_logs_payload(num_logs))
         self.request_reader = RequestReader()
         self.clear_state()
         self.request_counter = 0
@@ -40,7 +66,9 @@ class MockEndpoint:
 
     def start_server(self) -> InboundServer:
         print(f"Starting server")
-        self.inbound_srv = InboundServer(self.port, Config.BLOCKING_ACCEPT_TIMEOUT)
+        self.inbound_srv = InboundServer(
+            self.address, self.port, Config.BLOCKING_ACCEPT_TIMEOUT
+        )
         print(f"Server listening at port {self.port}")
 
     def stop_server(self) -> InboundServer:
@@ -116,7 +144,9 @@ class MockEndpoint:
 
     def request_response_roundtrip(self, cs: ClientSocket) -> None:
         req, err = self.read_request(cs)
-        if err is not None:
+        if req is None and err is None:  # the connection is closed
+            self.sockets_to_close.append(cs)
+        elif err is not None:
             self.handle_errors(cs, err)
             self.sockets_to_close.append(cs)
         else:
@@ -132,6 +162,8 @@ class MockEndpoint:
 
     def process_request(self, req: RPCRequest) -> None:
         self.execute_server_freeze_instruction()
+        if b'"eth_getLogs"' in req.content:
+            return self.logs_response
         return self.get_http_response(DEFAULT_RPC_RESPONSE)
 
     def send_response(self, cs: ClientSocket, response: bytearray) -> None:
@@ -0,0 +1,91 @@
+"""
+Compares receiving large eth_getLogs responses of the mock endpoint into fixed DEFAULT_RECV_BUF_SIZE buffers
+with the buffers sized to the learned response sizes.
+Run with: python -m tests.web3pi_proxy.tools.recv_buffer_benchmark
+"""
+
+import json
+import socket
+import time
+from threading import Thread
+
+from web3pi_proxy.config.conf import Config
+from web3pi_proxy.core.rpc.node.endpoint_pool.endpoint_connection_pool import (
+    EndpointConnectionPool,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connectiondescr import (
+    EndpointConnectionDescriptor,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.responsesize import (
+    ResponseSizeEstimator,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.endpointimpl import RPCEndpoint
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from tests.web3pi_proxy.tools.mock_endpoint import LOG_ENTRY, MockEndpoint
+
+NUM_LOGS = [100, 1000, 10_000]
+
+
+def get_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_logs_request() -> RPCRequest:
+    content = json.dumps(
+        {"jsonrpc": "2.0", "id": 0, "method": "eth_getLogs", "params": [{"fromBlock": "0x1", "toBlock": "latest"}]}
+    ).encode()
+    return RPCRequest(
+        method="eth_getLogs",
+        headers=bytearray(b"Content-Type: application/json\r\nContent-Length: %d\r\n" % len(content)),
+        content=bytearray(content),
+        content_len=len(content),
+    )
+
+
+def measure(pool: EndpointConnectionPool, number: int) -> tuple:
+    """Returns the average time of a response and the number of reads of the response"""
+    reads = 0
+
+    def count_read(data) -> None:
+        nonlocal reads
+        reads += 1
+
+    started_at = time.perf_counter()
+    for _ in range(number):
+        handler = pool.get()
+        handler.send(get_logs_request())
+        handler.receive(count_read)
+        handler.release()
+    return (time.perf_counter() - started_at) / number, reads // number
+
+
+def main(number: int = 50) -> None:
+    print(f"{'eth_getLogs response':24}{'fixed buffer':>22}{'adaptive buffer':>22}{'buffer size':>14}")
+    for num_logs in NUM_LOGS:
+        port = get_free_port()
+        endpoint = MockEndpoint(port, [], "127.0.0.1", num_logs)
+        Thread(target=endpoint.run_forever, daemon=True).start()
+        rpc_endpoint = RPCEndpoint("mock", EndpointConnectionDescriptor.from_url(f"http://127.0.0.1:{port}"))
+        pool = EndpointConnectionPool(rpc_endpoint)
+
+        response_sizes = rpc_endpoint.get_connection_stats().response_sizes
+        rpc_endpoint.get_connection_stats().response_sizes = ResponseSizeEstimator(max_size=Config.DEFAULT_RECV_BUF_SIZE)
+        measure(pool, 1)
+        fixed_time, fixed_reads = measure(pool, number)
+        rpc_endpoint.get_connection_stats().response_sizes = response_sizes
+        measure(pool, 1)
+        adaptive_time, adaptive_reads = measure(pool, number)
+        pool.close()
+
+        name = f"{num_logs} logs, {num_logs * len(LOG_ENTRY) // 1024} KiB"
+        print(
+            f"{name:24}{fixed_time * 1000:>9.2f} ms {fixed_reads:>5} reads"
+            f"{adaptive_time * 1000:>9.2f} ms {adaptive_reads:>5} reads"
+            f"{response_sizes.buffer_size('eth_getLogs') // 1024:>10} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Compares the compiled params schemas with the regex traversal of all the params values.
+Run with: python -m tests.web3pi_proxy.tools.validators_benchmark
+"""
+
+import timeit
+
+from web3pi_proxy.core.rpc.request.middleware.jsonrpcmiddlewares.validation.validators import (
+    JSONRPCContentValidator,
+    JSONRPCMethodValidator,
+)
+
+ADDRESS = "0x6b175474e89094c44da98b954eedeac495271d0f"
+HASH = "0x3f07a9c83155594c000642e7d60e8a8a00038d03e9849171a05ed0e2d47acbb3"
+
+PAYLOADS = {
+    "eth_blockNumber": [],
+    "eth_getBalance": [ADDRESS, "latest"],
+    "eth_call": [{"to": ADDRESS, "data": "0x70a08231" + "00" * 12 + ADDRESS[2:]}, "latest"],
+    "eth_call 10 kB data": [{"to": ADDRESS, "data": "0x" + "ab" * 10_000}, "latest"],
+    "eth_getLogs 50 addresses": [
+        {"address": [ADDRESS] * 50, "topics": [HASH, None, [HASH] * 4], "fromBlock": "0x1", "toBlock": "latest"}
+    ],
+    "eth_sendRawTransaction 100 kB": ["0x" + "cd" * 100_000],
+}
+
+
+def regex_traversal(content: dict) -> None:
+    JSONRPCContentValidator.validate(content)
+    JSONRPCMethodValidator.COMPILED_METHOD_PARAMS[content["method"]][0].validate(len(content["params"]))
+
+
+def compiled_schemas(content: dict) -> None:
+    JSONRPCMethodValidator.validate(content)
+
+
+def main(number: int = 2000) -> None:
+    print(f"{'payload':32}{'regex traversal':>18}{'compiled schemas':>18}")
+    for name, params in PAYLOADS.items():
+        content = {"jsonrpc": "2.0", "id": 0, "method": name.split()[0], "params": params}
+        timings = [
+            timeit.timeit(lambda: validate(content), number=number) / number * 1e6
+            for validate in (regex_traversal, compiled_schemas)
+        ]
+        print(f"{name:32}{timings[0]:>15.1f} us{timings[1]:>15.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ import pytest
 from web3pi_proxy.core.rpc.node.endpoint_pool.endpoint_connection_pool import (
     EndpointConnectionPool,
 )
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connectiondescr import (
+    EndpointConnectionDescriptor,
+)
 from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpoint_connection_handler import (
     BrokenConnectionError,
     BrokenFreshConnectionError,
@@ -16,9 +19,12 @@ from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpointconnection import
     EndpointConnection,
 )
 from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import (
+    ClientWriteError,
+    ConnectionClosedError,
     ResponseReceiver,
 )
 from web3pi_proxy.core.rpc.node.rpcendpoint.connection.sender import RequestSender
+from web3pi_proxy.core.rpc.node.rpcendpoint.endpointimpl import RPCEndpoint
 from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
 
 
@@ -32,6 +38,7 @@ class EndpointConnectionHandlerTests(TestCase):
         self.response_receiver_mock.recv_response.return_value = self.response_mock
         self.connection_mock = Mock(
             EndpointConnection,
+            endpoint=RPCEndpoint("node", Mock(EndpointConnectionDescriptor)),
             req_sender=self.request_sender_mock,
             res_receiver=self.response_receiver_mock,
         )
@@ -130,6 +137,30 @@ class EndpointConnectionHandlerTests(TestCase):
     def test_close_should_close_connection(self):
         self.endpoint_connection_handler.close()
         self.connection_mock.close.assert_called()
+        self.connection_pool_mock.handle_broken_connection.assert_called_once_with(self.connection_mock, False)
+        self.endpoint_connection_handler.release()
+        self.connection_pool_mock.put.assert_not_called()
+
+    def test_receive_failure_should_report_broken_connection(self):
+        self.response_receiver_mock.recv_response.side_effect = ConnectionClosedError
+
+        with self.assertRaises(BrokenConnectionError):
+            self.endpoint_connection_handler.receive(Mock())
+
+        self.connection_pool_mock.handle_broken_connection.assert_called_once_with(self.connection_mock, False)
+        self.assertIsNone(self.endpoint_connection_handler.connection)
+        self.endpoint_connection_handler.release()
+        self.connection_pool_mock.put.assert_not_called()
+
+    def test_client_failure_should_discard_connection_without_error(self):
+        self.response_receiver_mock.recv_response.side_effect = lambda callback, buf_size: callback(b"part")
+
+        with self.assertRaises(ClientWriteError):
+            self.endpoint_connection_handler.receive(Mock(side_effect=ConnectionResetError))
+
+        self.connection_pool_mock.discard.assert_called_once_with(self.connection_mock)
+        self.connection_pool_mock.handle_broken_connection.assert_not_called()
+        self.assertIsNone(self.endpoint_connection_handler.connection)
 
     def test_close_should_do_nothing_after_release(self):
         self.endpoint_connection_handler.release()
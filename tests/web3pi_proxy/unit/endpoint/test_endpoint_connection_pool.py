@@ -1,8 +1,13 @@
+import socket
+import time
+from threading import Event, Thread
+
 import pytest
 from unittest import TestCase
 from unittest.mock import Mock, patch
 
 from web3pi_proxy.core.rpc.node.endpoint_pool.endpoint_connection_pool import (
+    ConnectTimeoutError,
     EndpointConnectionPool,
 )
 from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connectiondescr import (
@@ -12,6 +17,7 @@ from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpointconnection import
     EndpointConnection,
 )
 from web3pi_proxy.core.rpc.node.rpcendpoint.endpointimpl import RPCEndpoint
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
 from web3pi_proxy.interfaces.servicestate import StateUpdater
 
 
@@ -98,3 +104,259 @@ class EndpointConnectionPoolTests(TestCase):
 
         connection.close.assert_called()
         other_connection.close.assert_called()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met")
+        time.sleep(0.005)
+
+
+@patch(
+    "web3pi_proxy.core.rpc.node.endpoint_pool.endpoint_connection_pool.EndpointConnection"
+)
+class EndpointConnectionPoolFillingTests(TestCase):
+    def create_pool(self, min_idle=2, max_idle=3):
+        endpoint = RPCEndpoint(
+            "node", EndpointConnectionDescriptor.from_url("http://localhost:8545", min_idle, max_idle)
+        )
+        connection_pool = EndpointConnectionPool(endpoint)
+        self.addCleanup(connection_pool.close)
+        return connection_pool
+
+    def test_opens_min_idle_connections_in_background(self, connection_mock):
+        connection_mock.side_effect = lambda endpoint: Mock(EndpointConnection)
+        connection_pool = self.create_pool()
+
+        wait_for(lambda: connection_pool.connections.qsize() == 2)
+
+        handler = connection_pool.get()
+        self.assertFalse(handler.is_new_connection)
+        wait_for(lambda: connection_pool.connections.qsize() == 2)
+        self.assertEqual(connection_mock.call_count, 3)
+        self.assertEqual(connection_pool.endpoint.get_connection_stats().no_pool_hits, 1)
+
+    def test_keeps_at_most_max_idle_connections(self, connection_mock):
+        connection_mock.side_effect = lambda endpoint: Mock(EndpointConnection)
+        connection_pool = self.create_pool(min_idle=0, max_idle=1)
+        handlers = [connection_pool.get(), connection_pool.get()]
+
+        for handler in handlers:
+            handler.release()
+
+        self.assertEqual(connection_pool.connections.qsize(), 1)
+        self.assertEqual(connection_pool.endpoint.get_connection_stats().no_pool_misses, 2)
+
+    def test_fills_pool_again_after_activation(self, connection_mock):
+        connection_mock.side_effect = lambda endpoint: Mock(EndpointConnection)
+        connection_pool = self.create_pool()
+        wait_for(lambda: connection_pool.connections.qsize() == 2)
+
+        connection_pool.disable()
+        self.assertEqual(connection_pool.connections.qsize(), 0)
+        time.sleep(0.05)
+        self.assertEqual(connection_pool.connections.qsize(), 0)
+
+        connection_pool.activate()
+        wait_for(lambda: connection_pool.connections.qsize() == 2)
+
+    def test_returned_connection_is_used_before_slow_connect_completes(self, connection_mock):
+        connecting = Event()
+        connected = Event()
+        slow_connections = []
+
+        def slow_connect(endpoint):
+            connecting.set()
+            connected.wait()
+            slow_connections.append(Mock(EndpointConnection))
+            return slow_connections[-1]
+
+        connection_mock.side_effect = lambda endpoint: Mock(EndpointConnection)
+        connection_pool = self.create_pool(min_idle=0)
+        first_handler = connection_pool.get()
+        connection_mock.side_effect = slow_connect
+
+        handlers = []
+        getter = Thread(target=lambda: handlers.append(connection_pool.get()))
+        getter.start()
+        self.assertTrue(connecting.wait(2))
+        returned_connection = first_handler.connection
+        first_handler.release()
+        getter.join(2)
+
+        self.assertIs(handlers[0].connection, returned_connection)
+        self.assertFalse(handlers[0].is_new_connection)
+
+        connected.set()  # the connect lost the race, its connection is parked
+        wait_for(lambda: connection_pool.connections.qsize() == 1)
+        self.assertIs(connection_pool.get().connection, slow_connections[0])
+
+    def test_connect_error_is_raised_to_waiting_get(self, connection_mock):
+        connection_mock.side_effect = ConnectionRefusedError
+        connection_pool = self.create_pool(min_idle=0)
+
+        with self.assertRaises(ConnectionRefusedError):
+            connection_pool.get()
+        self.assertEqual(len(connection_pool.waiters), 0)
+
+    def test_waiting_get_times_out_when_connecting_hangs(self, connection_mock):
+        connected = Event()
+        self.addCleanup(connected.set)
+        connection_mock.side_effect = lambda endpoint: (connected.wait(), Mock(EndpointConnection))[1]
+        connection_pool = self.create_pool(min_idle=0)
+        connection_pool.CONNECT_WAIT_TIMEOUT = 0.05
+
+        with self.assertRaises(ConnectTimeoutError):
+            connection_pool.get()
+        self.assertEqual(len(connection_pool.waiters), 0)
+
+        connected.set()  # the late connection is parked for the next get
+        wait_for(lambda: connection_pool.connections.qsize() == 1)
+
+    def test_connects_with_bounded_number_of_threads(self, connection_mock):
+        connected = Event()
+        self.addCleanup(connected.set)
+        connecting = []
+
+        def slow_connect(endpoint):
+            connecting.append(endpoint)
+            connected.wait()
+            return Mock(EndpointConnection)
+
+        connection_mock.side_effect = slow_connect
+        connection_pool = self.create_pool(min_idle=0)
+        connection_pool.CONNECT_WAIT_TIMEOUT = 0.05
+        errors = []
+
+        def get():
+            try:
+                connection_pool.get()
+            except Exception as error:
+                errors.append(error)
+
+        getters = [Thread(target=get) for _ in range(connection_pool.MAX_CONNECTIONS + 2)]
+        for getter in getters:
+            getter.start()
+        for getter in getters:
+            getter.join(2)
+
+        self.assertEqual(len(connecting), connection_pool.MAX_CONNECTIONS)
+        self.assertEqual(len(errors), len(getters))
+        self.assertTrue(all(isinstance(error, ConnectTimeoutError) for error in errors))
+
+
+class HttpEndpointStandIn:
+    """Answers each request with a small JSON-RPC response with the given extra headers, it can close the idle
+    connections after responding"""
+
+    def __init__(self, headers: bytes = b"", close_idle: bool = False) -> None:
+        self.headers = headers
+        self.close_idle = close_idle
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        self.connections = 0
+        Thread(target=self.serve, daemon=True).start()
+
+    def serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn: socket.socket) -> None:
+        body = b'{"jsonrpc":"2.0","id":1,"result":"0x1"}'
+        with conn:
+            while True:
+                data = b""
+                while b"\r\n\r\n" not in data:
+                    part = conn.recv(4096)
+                    if not part:
+                        return
+                    data += part
+                conn.sendall(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n" + self.headers
+                    + b"Content-Length: %d\r\n\r\n" % len(body) + body
+                )
+                if self.close_idle:
+                    return
+
+    def close(self) -> None:
+        self.listener.close()
+
+
+class EndpointConnectionPoolLivenessTests(TestCase):
+    def create_pool(self, server: HttpEndpointStandIn) -> EndpointConnectionPool:
+        self.addCleanup(server.close)
+        endpoint = RPCEndpoint(
+            "node", EndpointConnectionDescriptor.from_url(f"http://127.0.0.1:{server.port}", 0, 2)
+        )
+        connection_pool = EndpointConnectionPool(endpoint)
+        self.addCleanup(connection_pool.close)
+        return connection_pool
+
+    @staticmethod
+    def forward(connection_pool: EndpointConnectionPool) -> EndpointConnection:
+        req = RPCRequest(
+            headers=bytearray(b"Content-Length: 2\r\n"), content=bytearray(b"{}"), content_len=2
+        )
+        handler = connection_pool.get()
+        connection = handler.connection
+        handler.send(req)
+        handler.receive(lambda data: None)
+        handler.release()
+        return connection
+
+    def test_discards_connection_closed_while_idle(self):
+        connection_pool = self.create_pool(HttpEndpointStandIn(close_idle=True))
+        connection = self.forward(connection_pool)
+        wait_for(lambda: not connection.socket.is_alive())
+
+        self.assertIsNot(self.forward(connection_pool), connection)
+        stats = connection_pool.endpoint.get_connection_stats()
+        self.assertEqual(stats.no_stale_connections, 1)
+        self.assertEqual(connection_pool.stats.error_timestamps, [])
+        self.assertEqual(connection_pool.stats.new_connection_error_timestamps, [])
+
+    def test_discards_all_stale_connections_in_one_get(self):
+        connection_pool = self.create_pool(HttpEndpointStandIn(close_idle=True))
+        handlers = [connection_pool.get() for _ in range(2)]  # max_idle connections
+        connections = [handler.connection for handler in handlers]
+        for handler in handlers:
+            handler.send(
+                RPCRequest(headers=bytearray(b"Content-Length: 2\r\n"), content=bytearray(b"{}"), content_len=2)
+            )
+            handler.receive(lambda data: None)
+            handler.release()
+        wait_for(lambda: not any(connection.socket.is_alive() for connection in connections))
+
+        self.assertNotIn(self.forward(connection_pool), connections)
+        self.assertEqual(connection_pool.endpoint.get_connection_stats().no_stale_connections, 2)
+
+    def test_reuses_live_connection(self):
+        server = HttpEndpointStandIn()
+        connection_pool = self.create_pool(server)
+
+        self.assertIs(self.forward(connection_pool), self.forward(connection_pool))
+        self.assertEqual(server.connections, 1)
+
+    def test_closes_connection_after_connection_close_response(self):
+        connection_pool = self.create_pool(HttpEndpointStandIn(b"Connection: close\r\n"))
+
+        self.forward(connection_pool)
+
+        self.assertEqual(connection_pool.connections.qsize(), 0)
+
+    def test_does_not_reuse_connection_past_keep_alive_timeout(self):
+        server = HttpEndpointStandIn(b"Keep-Alive: timeout=1, max=100\r\n")
+        connection_pool = self.create_pool(server)
+
+        connection = self.forward(connection_pool)  # within the margin of the timeout right away
+
+        self.assertEqual(connection.res_receiver.keep_alive_timeout, 1.0)
+        self.assertIsNot(self.forward(connection_pool), connection)
+        self.assertEqual(server.connections, 2)
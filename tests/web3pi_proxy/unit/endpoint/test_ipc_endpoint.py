@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import socket
+import tempfile
+from threading import Thread
+from unittest import TestCase
+
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connectiondescr import (
+    EndpointConnectionDescriptor,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpointconnection import (
+    EndpointConnection,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import (
+    ResponseBodyCollector,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.endpointimpl import RPCEndpoint
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+
+
+class IPCEndpointStandIn:
+    """Answers JSON-RPC requests on a Unix socket with JSON lines, like the IPC endpoint of geth"""
+
+    def __init__(self, path: str) -> None:
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        self.listener.listen()
+        Thread(target=self.serve, daemon=True).start()
+
+    def serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    @staticmethod
+    def handle(conn: socket.socket) -> None:
+        decoder = json.JSONDecoder()
+        buffer = ""
+        with conn:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    return
+                buffer += data.decode()
+                try:
+                    request, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    continue
+                buffer = buffer[end:]
+                result = request["params"][0] if request["params"] else request["method"]
+                response = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": result}) + "\n"
+                conn.sendall(response.encode())
+
+    def close(self) -> None:
+        self.listener.close()
+
+
+class IPCEndpointTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "geth.ipc")
+        self.server = IPCEndpointStandIn(self.path)
+        self.addCleanup(self.server.close)
+        self.endpoint = RPCEndpoint("node", EndpointConnectionDescriptor.from_url(f"unix://{self.path}"))
+
+    @staticmethod
+    def request(params: list) -> RPCRequest:
+        req = RPCRequest()
+        req.content = json.dumps({"jsonrpc": "2.0", "method": "eth_call", "params": params, "id": 7}).encode()
+        req.headers = b"Content-Length: %d\r\n" % len(req.content)
+        return req
+
+    def test_parses_unix_url(self):
+        conn_descr = EndpointConnectionDescriptor.from_url("unix:///home/ethereum/geth.ipc")
+
+        self.assertEqual(conn_descr.unix_path, "/home/ethereum/geth.ipc")
+        self.assertIsNone(EndpointConnectionDescriptor.from_url("unix://geth.ipc"))
+
+    def test_exchanges_requests_over_unix_socket(self):
+        connection = EndpointConnection(self.endpoint)
+        self.addCleanup(connection.close)
+
+        for result in ["0x1", "0x" + "ab" * 50000]:  # the large response is received in many parts
+            collector = ResponseBodyCollector()
+            connection.req_sender.send_request(self.request([result]))
+            connection.res_receiver.recv_response(collector.feed_data)
+
+            self.assertEqual(json.loads(collector.get_body()), {"jsonrpc": "2.0", "id": 7, "result": result})
+
+    def test_exchanges_requests_over_unix_socket_async(self):
+        connection = EndpointConnection(self.endpoint)
+        self.addCleanup(connection.close)
+        collector = ResponseBodyCollector()
+
+        async def exchange():
+            async def callback(data):
+                collector.feed_data(data)
+
+            await connection.req_sender.send_request_async(self.request(["0x2"]))
+            await connection.res_receiver.recv_response_async(callback)
+
+        asyncio.run(exchange())
+
+        self.assertEqual(json.loads(collector.get_body()), {"jsonrpc": "2.0", "id": 7, "result": "0x2"})
@@ -0,0 +1,41 @@
+import json
+import threading
+from unittest import TestCase
+from unittest.mock import Mock
+
+from web3pi_proxy.core.rpc.node.endpoint_pool.load_balancers import LoadBalancer
+from web3pi_proxy.core.rpc.node.endpoint_pool.pool_manager import (
+    EndpointConnectionPoolManager,
+)
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.rpc.response.batchresponse import BatchResponses
+
+
+class EndpointConnectionPoolManagerBatchTests(TestCase):
+    def setUp(self):
+        self.pool_manager = EndpointConnectionPoolManager([], Mock(LoadBalancer))
+        self.addCleanup(self.pool_manager.close)
+
+    def test_batch_calls_are_forwarded_in_parallel(self):
+        calls = [RPCRequest(method=f"call_{i}", id=i) for i in range(4)]
+        all_started = threading.Barrier(len(calls), timeout=5)
+
+        def forward(req: RPCRequest) -> bytes:
+            all_started.wait()  # every call waits for the others, so they must run concurrently
+            if req.id == 2:
+                raise ConnectionError
+            return b'{"jsonrpc":"2.0","id":%d,"result":"%s"}' % (req.id, req.method.encode())
+
+        self.pool_manager.forward = forward
+
+        answered = self.pool_manager.forward_batch(calls)
+
+        self.assertEqual([req.id for req in answered], [0, 1, 3])
+        response = BatchResponses.batch_response(RPCRequest(batch=calls), b"Keep-Alive: timeout=60\r\n")
+        head, body = response.split(b"\r\n\r\n", 1)
+        self.assertIn(b"Content-Length: %d" % len(body), head)
+        self.assertIn(b"Keep-Alive: timeout=60", head)
+        results = json.loads(body)
+        self.assertEqual([result["id"] for result in results], [0, 1, 2, 3])
+        self.assertEqual(results[1]["result"], "call_1")
+        self.assertEqual(results[2]["error"]["code"], -32603)
@@ -1,25 +1,48 @@
-from unittest import TestCase
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+from unittest import TestCase, skipUnless
 from unittest.mock import Mock, call
 
 from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import (
+    ConnectionClosedError,
+    ResponseBodyCollector,
     ResponseReceiverGeth,
 )
 from web3pi_proxy.core.sockets.basesocket import BaseSocket
 
 
+def recv_into_from(parts):
+    """recv_into of a socket receiving the parts one after another"""
+    parts = iter(parts)
+
+    def recv_into(buffer, flags=0):
+        part = next(parts)
+        buffer[:len(part)] = part
+        return len(part)
+
+    return recv_into
+
+
+def copying(callback):
+    """The receiver passes views of a reused buffer, the callback gets their copies"""
+    return lambda data: callback(bytes(data))
+
+
 class ResponseReceiverGethTests(TestCase):
     def setUp(self):
         self.socket_mock = Mock(BaseSocket)
 
     def test_receive_chunked_response(self):
         sock = self.socket_mock()
-        sock.recv.side_effect = [
+        sock.recv_into.side_effect = recv_into_from([
             b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\nContent-Type: application/json\r\nDate: Wed, 03 Apr 2024 22:45:33 GMT\r\n\r\n5\r\n",
             b'{"Hel\r\nA\r\nlo":',
             b'"World\r\n2\r',
             b'\n"}\r\n',
             b"0\r\n\r\n",
-        ]
+        ])
         receiver = ResponseReceiverGeth(sock)
         callback = Mock()
 
@@ -33,19 +56,19 @@ class ResponseReceiverGethTests(TestCase):
             call(b"0\r\n\r\n"),
         ]
 
-        receiver.recv_response(callback)
+        receiver.recv_response(copying(callback))
         callback.assert_has_calls(expected_callback_calls)
 
     def test_receive_regular_response(self):
         sock = self.socket_mock()
-        sock.recv.side_effect = [
+        sock.recv_into.side_effect = recv_into_from([
             b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nDate: Wed, 03 Apr 2024 22:41:40 GMT\r\nContent-Length: 38\r\n\r\n{"jsonrpc":"2.0","id"',
             b':0,"result":"1"}\n',
-        ]
+        ])
         receiver = ResponseReceiverGeth(sock)
         callback = Mock()
 
-        receiver.recv_response(callback)
+        receiver.recv_response(copying(callback))
 
         callback.assert_has_calls(
             [
@@ -58,14 +81,14 @@ class ResponseReceiverGethTests(TestCase):
 
     def test_receive_compressed_response(self):
         sock = self.socket_mock()
-        sock.recv.side_effect = [
+        sock.recv_into.side_effect = recv_into_from([
             b"HTTP/1.1 200 OK\r\nContent-Encoding: gzip\r\nContent-Type: application/json\r\nDate: Wed, 03 Apr 2024 22:45:33 GMT\r\nContent-Length: 62\r\n\r\n\x1f\x8b\x08\x00",
             b"\x00\x00\x00\x00\x00\xff\xaaV\xca*\xce\xcf+*HV\xb2R2\xd23P\xd2Q\xcaLQ\xb22\xd0Q*J-.\xcd)Q\xb2R2T\xaa\xe5\x02\x04\x00\x00\xff\xff\xbaeLj&\x00\x00\x00",
-        ]
+        ])
         receiver = ResponseReceiverGeth(sock)
         callback = Mock()
 
-        receiver.recv_response(callback)
+        receiver.recv_response(copying(callback))
 
         callback.assert_has_calls(
             [
@@ -80,14 +103,14 @@ class ResponseReceiverGethTests(TestCase):
 
     def test_receive_rpc_error_response(self):
         sock = self.socket_mock()
-        sock.recv.side_effect = [
+        sock.recv_into.side_effect = recv_into_from([
             b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nDate: Wed, 03 Apr 2024 22:41:40 GMT\r\nContent-Length: 77\r\n\r\n{"jsonrpc":"2.0",',
             b'"id":0,"error":{"code":35000,"message":"An error occurred"}}',
-        ]
+        ])
         receiver = ResponseReceiverGeth(sock)
         callback = Mock()
 
-        receiver.recv_response(callback)
+        receiver.recv_response(copying(callback))
 
         callback.assert_has_calls(
             [
@@ -97,3 +120,121 @@ class ResponseReceiverGethTests(TestCase):
                 call(b'"id":0,"error":{"code":35000,"message":"An error occurred"}}'),
             ]
         )
+
+    def test_parser_is_kept_for_consecutive_responses(self):
+        response = b'HTTP/1.1 200 OK\r\nContent-Length: 38\r\n\r\n{"jsonrpc":"2.0","id":0,"result":"1"}\n'
+        sock = self.socket_mock()
+        sock.recv_into.side_effect = recv_into_from([response, response[:20], b"", response])
+        receiver = ResponseReceiverGeth(sock)
+        parser = receiver.response_parser
+
+        receiver.recv_response(Mock())
+        self.assertIs(receiver.response_parser, parser)
+
+        with self.assertRaises(ConnectionClosedError):  # the parser is replaced after an incomplete response
+            receiver.recv_response(Mock())
+        self.assertIsNot(receiver.response_parser, parser)
+
+        callback = Mock()
+        receiver.recv_response(copying(callback))
+        callback.assert_called_once_with(response)
+
+    def test_keeps_connection_management_of_endpoint(self):
+        cases = [
+            (b"HTTP/1.1 200 OK\r\n", True, None),
+            (b"HTTP/1.1 200 OK\r\nConnection: close\r\n", False, None),
+            (b"HTTP/1.1 200 OK\r\nKeep-Alive: timeout=5, max=1000\r\n", True, 5.0),
+            (b"HTTP/1.0 200 OK\r\n", False, None),
+            (b"HTTP/1.0 200 OK\r\nConnection: Keep-Alive\r\n", True, None),
+        ]
+        for head, keep_alive, keep_alive_timeout in cases:
+            with self.subTest(head=head):
+                sock = self.socket_mock()
+                sock.recv_into.side_effect = recv_into_from([head + b"Content-Length: 2\r\n\r\n{}"])
+                receiver = ResponseReceiverGeth(sock)
+
+                receiver.recv_response(Mock())
+
+                self.assertEqual(receiver.keep_alive, keep_alive)
+                self.assertEqual(receiver.keep_alive_timeout, keep_alive_timeout)
+
+    def test_receives_into_buffer_of_given_size(self):
+        response = b'HTTP/1.1 200 OK\r\nContent-Length: 38\r\n\r\n{"jsonrpc":"2.0","id":0,"result":"1"}\n'
+        sock = self.socket_mock()
+        buffer_sizes = []
+
+        def recv_into(buffer, flags=0):
+            buffer_sizes.append(len(buffer))
+            buffer[:len(response)] = response
+            return len(response)
+
+        sock.recv_into.side_effect = recv_into
+        receiver = ResponseReceiverGeth(sock)
+
+        self.assertEqual(receiver.recv_response(Mock(), 65536), len(response))
+        self.assertEqual(buffer_sizes, [65536])
+
+
+@skipUnless(hasattr(os, "splice"), "splice is not supported")
+class ResponseRelayTests(TestCase):
+    BODY = b'{"jsonrpc":"2.0","id":0,"result":"0x' + b"ab" * 500_000 + b'"}'
+    RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%b" % (len(BODY), BODY)
+
+    def setUp(self):
+        self.endpoint, endpoint_peer = socket.socketpair()
+        self.client, self.client_peer = socket.socketpair()
+        for sock in [self.endpoint, endpoint_peer, self.client, self.client_peer]:
+            self.addCleanup(sock.close)
+        self.receiver = ResponseReceiverGeth(BaseSocket(endpoint_peer))
+        self.addCleanup(self.receiver.close)
+
+    def respond(self) -> None:
+        Thread(target=self.endpoint.sendall, args=(self.RESPONSE,), daemon=True).start()
+
+    def read_client(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            data += self.client_peer.recv(size - len(data))
+        return data
+
+    def test_relays_response_to_client(self):
+        for _ in range(2):  # the pipe is reused by the next response
+            self.respond()
+            received = []
+            relayed = []
+            reader = ThreadPoolExecutor(1).submit(self.read_client, len(self.RESPONSE))
+
+            self.receiver.relay_response(
+                lambda data: (received.append(bytes(data)), self.client.sendall(data)),
+                BaseSocket(self.client),
+                lambda data: relayed.append(len(data)),
+            )
+
+            self.assertEqual(reader.result(5), self.RESPONSE)
+            self.assertEqual(len(received), 1)  # only the head passes through the process
+            self.assertTrue(self.RESPONSE.startswith(received[0]))
+            self.assertEqual(len(received[0]) + sum(relayed), len(self.RESPONSE))
+
+    def test_consumes_response_when_client_is_gone(self):
+        self.client_peer.close()
+        self.respond()
+
+        self.receiver.relay_response(lambda data: None, BaseSocket(self.client), lambda data: None)
+
+        self.respond()  # the connection is still usable
+        collector = ResponseBodyCollector()
+        self.receiver.recv_response(collector.feed_data)
+        self.assertEqual(collector.get_body(), self.BODY)
+
+    def test_aborts_relay_when_client_does_not_read(self):
+        self.receiver.RELAY_SEND_TIMEOUT = 0.2
+        self.respond()
+
+        self.receiver.relay_response(lambda data: None, BaseSocket(self.client), lambda data: None)
+
+        while self.client_peer.recv(65536):  # the client connection is shut down after the truncated part
+            pass
+        self.respond()  # the connection is still usable
+        collector = ResponseBodyCollector()
+        self.receiver.recv_response(collector.feed_data)
+        self.assertEqual(collector.get_body(), self.BODY)
@@ -0,0 +1,79 @@
+import asyncio
+import socket
+import threading
+from unittest import TestCase
+
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.sender import RequestSender
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.sockets.basesocket import BaseSocket
+
+
+class RequestSenderTests(TestCase):
+    def setUp(self):
+        self.s_src, self.s_dst = socket.socketpair()
+        self.addCleanup(self.s_src.close)
+        self.addCleanup(self.s_dst.close)
+
+    def _recv_all(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            data += self.s_dst.recv(65536)
+        return bytes(data)
+
+    @staticmethod
+    def _request(url_path: bytes, content: bytes) -> RPCRequest:
+        return RPCRequest(
+            url_path=bytearray(url_path),
+            headers=bytearray(b"Content-Type: application/json\r\n"),
+            content=bytearray(content),
+            content_len=len(content),
+        )
+
+    def test_request_line_variants(self):
+        cases = [
+            ("", b"", b"POST / HTTP/1.1\r\n"),
+            ("", b"path", b"POST /path HTTP/1.1\r\n"),
+            ("key", b"", b"POST /key HTTP/1.1\r\n"),
+            ("key", b"path", b"POST /key/path HTTP/1.1\r\n"),
+        ]
+        for api_key, url_path, request_line in cases:
+            with self.subTest(api_key=api_key, url_path=url_path):
+                sender = RequestSender(BaseSocket(self.s_src), "node.local", api_key)
+                req = self._request(url_path, b"{}")
+                expected = request_line + b"Content-Type: application/json\r\nHost: node.local\r\n\r\n{}"
+
+                self.assertEqual(sender.send_request(req), len(expected))
+                self.assertEqual(req.last_queried_size, len(expected))
+                self.assertEqual(self._recv_all(len(expected)), expected)
+
+    def test_large_request_is_sent_in_parts(self):
+        sender = RequestSender(BaseSocket(self.s_src), "node.local")
+        content = bytes(range(256)) * 16 * 1024  # larger than the socket buffer
+        req = self._request(b"", content)
+
+        received = []
+        reader = threading.Thread(target=lambda: received.append(self._recv_all(req.content_len + 69)))
+        reader.start()
+        size = sender.send_request(req)
+        reader.join()
+
+        self.assertEqual(size, req.content_len + 69)
+        self.assertTrue(received[0].endswith(b"\r\n\r\n" + content))
+
+    def test_send_request_async(self):
+        sender = RequestSender(BaseSocket(self.s_src), "node.local", "key")
+        content = bytes(4 * 1024 * 1024)
+        req = self._request(b"path", content)
+
+        async def send_and_recv():
+            loop = asyncio.get_running_loop()
+            recv = loop.run_in_executor(None, self._recv_all, req.content_len + 77)
+            size = await sender.send_request_async(req)
+            return size, await recv
+
+        size, received = asyncio.run(send_and_recv())
+
+        self.assertEqual(size, len(received))
+        self.assertTrue(received.startswith(b"POST /key/path HTTP/1.1\r\n"))
+        self.assertTrue(received.endswith(content))
+        self.assertTrue(self.s_src.getblocking())
@@ -0,0 +1,69 @@
+from unittest import TestCase
+
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpointconnectionstats import (
+    EndpointConnectionStats,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.responsesize import (
+    ResponseSizeEstimator,
+)
+from web3pi_proxy.core.sockets.bufferpool import BufferPool
+
+
+class ResponseSizeEstimatorTests(TestCase):
+    def setUp(self):
+        self.estimator = ResponseSizeEstimator(8192, 1024 * 1024)
+
+    def test_unknown_and_small_responses_use_min_size(self):
+        self.assertEqual(self.estimator.buffer_size("eth_getLogs"), 8192)
+
+        self.estimator.update("eth_blockNumber", 100)
+        self.assertEqual(self.estimator.buffer_size("eth_blockNumber"), 8192)
+
+    def test_buffer_fits_average_response(self):
+        self.estimator.update("eth_getBlockByNumber", 100_000)
+        self.assertEqual(self.estimator.buffer_size("eth_getBlockByNumber"), 131072)
+
+        self.estimator.update("eth_getLogs", 40 * 1024 * 1024)
+        self.assertEqual(self.estimator.buffer_size("eth_getLogs"), 1024 * 1024)
+
+    def test_average_follows_responses(self):
+        self.estimator.update("eth_getLogs", 1024 * 1024)
+        for _ in range(20):
+            self.estimator.update("eth_getLogs", 1000)
+
+        self.assertEqual(self.estimator.buffer_size("eth_getLogs"), 16384)
+
+    def test_number_of_methods_is_limited(self):
+        for i in range(ResponseSizeEstimator.MAX_METHODS + 10):
+            self.estimator.update(f"method_{i}", 100_000)
+
+        self.assertEqual(len(self.estimator.averages), ResponseSizeEstimator.MAX_METHODS)
+        self.assertEqual(self.estimator.buffer_size("method_300"), 8192)
+
+    def test_sizes_are_reported_in_endpoint_stats(self):
+        stats = EndpointConnectionStats()
+        stats.response_sizes.update("eth_getLogs", 300_000)
+        stats.response_sizes.update("eth_chainId", 50)
+
+        self.assertEqual(stats.to_dict()["recv_buf_sizes"], {"eth_getLogs": 524288, "eth_chainId": 8192})
+
+
+class BufferPoolTests(TestCase):
+    def test_buffers_are_reused_by_size(self):
+        pool = BufferPool(8192, 4)
+        small, large = pool.acquire(), pool.acquire(65536)
+        self.assertEqual((len(small), len(large)), (8192, 65536))
+
+        pool.release(small)
+        pool.release(large)
+
+        self.assertIs(pool.acquire(65536), large)
+        self.assertIs(pool.acquire(), small)
+
+    def test_fewer_large_buffers_are_kept(self):
+        pool = BufferPool(8192, 4)
+        buffers = [pool.acquire(16384) for _ in range(4)]
+        for buffer in buffers:
+            pool.release(buffer)
+
+        self.assertEqual(pool.buffers[16384].qsize(), 2)
@@ -0,0 +1,144 @@
+import socket
+import time
+from threading import Thread
+from unittest import TestCase
+from unittest.mock import Mock
+
+from web3pi_proxy.core.rpc.node.endpoint_pool.endpoint_connection_pool import (
+    ConnectTimeoutError,
+)
+from web3pi_proxy.core.rpc.node.endpoint_pool.load_balancers import LoadBalancer
+from web3pi_proxy.core.rpc.node.endpoint_pool.pool_manager import (
+    EndpointConnectionPoolManager,
+)
+from web3pi_proxy.core.rpc.node.endpoint_pool.retry import RetryBudget
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connectiondescr import (
+    EndpointConnectionDescriptor,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpoint_connection_handler import (
+    BrokenConnectionError,
+)
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+
+BODY = b'{"jsonrpc":"2.0","id":1,"result":"0x1"}'
+
+
+class HttpEndpointStandIn:
+    """Answers each request with BODY, a broken one closes the connection instead of responding"""
+
+    def __init__(self, broken: bool = False) -> None:
+        self.broken = broken
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        self.requests = 0
+        Thread(target=self.serve, daemon=True).start()
+
+    def serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn: socket.socket) -> None:
+        with conn:
+            while True:
+                data = b""
+                while b"\r\n\r\n" not in data:
+                    part = conn.recv(4096)
+                    if not part:
+                        return
+                    data += part
+                self.requests += 1
+                if self.broken:
+                    return
+                conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(BODY) + BODY)
+
+    def close(self) -> None:
+        self.listener.close()
+
+
+def request(method: str) -> RPCRequest:
+    content = b'{"jsonrpc":"2.0","method":"%s","params":[],"id":1}' % method.encode()
+    return RPCRequest(
+        headers=bytearray(b"Content-Length: %d\r\n" % len(content)),
+        content=bytearray(content),
+        content_len=len(content),
+        method=method,
+    )
+
+
+class RetryBudgetTests(TestCase):
+    def test_limits_retries_to_burst(self):
+        budget = RetryBudget(0, 3)
+
+        self.assertEqual([budget.try_acquire() for _ in range(4)], [True, True, True, False])
+
+    def test_refills_tokens(self):
+        budget = RetryBudget(1000, 1)
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+
+        time.sleep(0.01)
+
+        self.assertTrue(budget.try_acquire())
+
+
+class EndpointConnectionPoolManagerRetryTests(TestCase):
+    def setUp(self):
+        self.broken_server = HttpEndpointStandIn(broken=True)
+        self.addCleanup(self.broken_server.close)
+        self.server = HttpEndpointStandIn()
+        self.addCleanup(self.server.close)
+
+        load_balancer = Mock(LoadBalancer)
+        load_balancer.pick_pool.side_effect = lambda req, pools: pools[0]
+        self.pool_manager = EndpointConnectionPoolManager(
+            [
+                ("broken", EndpointConnectionDescriptor.from_url(f"http://127.0.0.1:{self.broken_server.port}", min_idle=0)),
+                ("node", EndpointConnectionDescriptor.from_url(f"http://127.0.0.1:{self.server.port}", min_idle=0)),
+            ],
+            load_balancer,
+            sync_control=False,
+        )
+        self.addCleanup(self.pool_manager.close)
+
+    def test_may_retry_idempotent_methods(self):
+        deadline = time.monotonic() + 10
+
+        self.assertTrue(self.pool_manager.may_retry(request("eth_call"), 0, deadline))
+        self.assertTrue(self.pool_manager.may_retry(request("eth_getBalance"), 1, deadline))
+        self.assertFalse(self.pool_manager.may_retry(request("eth_sendRawTransaction"), 0, deadline))
+        self.assertFalse(self.pool_manager.may_retry(request("eth_newFilter"), 0, deadline))
+        self.assertFalse(self.pool_manager.may_retry(request("eth_call"), self.pool_manager.max_retries, deadline))
+        self.assertFalse(self.pool_manager.may_retry(request("eth_call"), 0, time.monotonic()))
+
+    def test_may_not_retry_without_budget(self):
+        self.pool_manager.retry_budget = RetryBudget(0, 1)
+        deadline = time.monotonic() + 10
+
+        self.assertTrue(self.pool_manager.may_retry(request("eth_call"), 0, deadline))
+        self.assertFalse(self.pool_manager.may_retry(request("eth_call"), 0, deadline))
+
+    def test_fails_over_to_another_endpoint(self):
+        self.assertEqual(self.pool_manager.forward(request("eth_call")), BODY)
+
+        self.assertEqual((self.broken_server.requests, self.server.requests), (1, 1))
+        stats = self.pool_manager.get_pool("node").endpoint.get_connection_stats()
+        self.assertEqual((stats.no_retries, stats.no_failovers), (1, 1))
+        self.assertEqual(self.pool_manager.get_pool("broken").stats.count_all_errors(10**10), 1)
+
+    def test_fails_over_when_no_connection_is_available_in_time(self):
+        self.pool_manager.get_pool("broken").get = Mock(side_effect=ConnectTimeoutError)
+
+        handler = self.pool_manager.get_connection(request("eth_call"))
+        self.addCleanup(handler.release)
+
+        self.assertIs(handler.connection_pool, self.pool_manager.get_pool("node"))
+
+    def test_does_not_retry_unsafe_methods(self):
+        with self.assertRaises(BrokenConnectionError):
+            self.pool_manager.forward(request("eth_sendRawTransaction"))
+
+        self.assertEqual((self.broken_server.requests, self.server.requests), (1, 0))
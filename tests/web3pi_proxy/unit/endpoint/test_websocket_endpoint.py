@@ -0,0 +1,303 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import socket
+import ssl
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
+from unittest import TestCase
+
+from web3pi_proxy.core.rpc.node.endpoint_pool.websocket_connection_pool import (
+    WebSocketConnectionPool,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connectiondescr import (
+    EndpointConnectionDescriptor,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpoint_connection_handler import (
+    BrokenConnectionError,
+    InvalidRequestError,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import (
+    ResponseBodyCollector,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.websocketconnection import (
+    OP_CONTINUATION,
+    OP_PING,
+    OP_TEXT,
+    FrameReader,
+    WebSocketConnection,
+    encode_frame,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.endpointimpl import RPCEndpoint
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.sockets.basesocket import BaseSocket
+from web3pi_proxy.core.sockets.tlsclient import TLSClient
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+CERT_FILE = os.path.join(DATA_DIR, "tls_cert.pem")  # self-signed for localhost
+KEY_FILE = os.path.join(DATA_DIR, "tls_key.pem")
+
+
+class WebSocketEndpointStandIn:
+    """
+    Answers JSON-RPC requests over WebSocket like geth. The result of a call is its first param, the second param
+    delays the response in seconds, so the responses can be sent in another order than the requests.
+    """
+
+    GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+    def __init__(self, fragment_size: int = 0) -> None:
+        self.fragment_size = fragment_size
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        self.connections = 0
+        self.received_ids = []
+        self.paths = []
+        Thread(target=self.serve, daemon=True).start()
+
+    def serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn: socket.socket) -> None:
+        head = b""
+        while b"\r\n\r\n" not in head:
+            head += conn.recv(4096)
+        lines = head.split(b"\r\n")
+        self.paths.append(lines[0].split()[1].decode())
+        key = next(line.split(b":")[1].strip() for line in lines if line.lower().startswith(b"sec-websocket-key"))
+        accept = base64.b64encode(hashlib.sha1(key + self.GUID).digest())
+        conn.sendall(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+            + encode_frame(b"hello", OP_PING, masked=False)  # sent right after the handshake response
+        )
+        send_lock = Lock()
+        frame_reader = FrameReader(1 << 24)
+        with conn:
+            while True:
+                try:
+                    data = conn.recv(65536)
+                except OSError:
+                    return
+                if not data:
+                    return
+                for opcode, payload in frame_reader.feed(data):
+                    if opcode == OP_TEXT:
+                        Thread(target=self.respond, args=(conn, send_lock, json.loads(payload)), daemon=True).start()
+
+    def respond(self, conn: socket.socket, send_lock: Lock, request: dict) -> None:
+        self.received_ids.append(request["id"])
+        result, delay = request["params"]
+        time.sleep(delay)
+        payload = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": result}).encode()
+        if self.fragment_size:
+            fragments = [payload[i:i + self.fragment_size] for i in range(0, len(payload), self.fragment_size)]
+            frames = [
+                struct.pack("!BB", (0x80 if i == len(fragments) - 1 else 0) | (OP_CONTINUATION if i else OP_TEXT),
+                            len(fragment)) + fragment
+                for i, fragment in enumerate(fragments)
+            ]
+        else:
+            frames = [encode_frame(payload, masked=False)]
+        with send_lock:
+            try:
+                for frame in frames:
+                    conn.sendall(frame)
+            except OSError:  # the connection is closed by the test
+                pass
+
+    def close(self) -> None:
+        self.listener.close()
+
+
+class PartialRecordEndpointStandIn:
+    """
+    Completes the TLS and WebSocket handshakes, then sends only the first bytes of a TLS record and holds the rest back,
+    so the client socket is readable while there is no application data to read.
+    """
+
+    def __init__(self, hold_time: float) -> None:
+        self.hold_time = hold_time
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(CERT_FILE, KEY_FILE)
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        Thread(target=self.serve, daemon=True).start()
+
+    def serve(self) -> None:
+        conn, _ = self.listener.accept()
+        incoming, outgoing = ssl.MemoryBIO(), ssl.MemoryBIO()
+        tls = self.context.wrap_bio(incoming, outgoing, server_side=True)
+        with conn:
+            while True:
+                try:
+                    tls.do_handshake()
+                    break
+                except ssl.SSLWantReadError:
+                    conn.sendall(outgoing.read())
+                    incoming.write(conn.recv(65536))
+            conn.sendall(outgoing.read())
+            head = b""
+            while b"\r\n\r\n" not in head:
+                try:
+                    head += tls.read(4096)
+                except ssl.SSLWantReadError:
+                    incoming.write(conn.recv(65536))
+            key = next(line.split(b":")[1].strip() for line in head.split(b"\r\n")
+                       if line.lower().startswith(b"sec-websocket-key"))
+            accept = base64.b64encode(hashlib.sha1(key + WebSocketEndpointStandIn.GUID).digest())
+            tls.write(
+                b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+            )
+            conn.sendall(outgoing.read())
+            time.sleep(0.2)  # the client reader thread is waiting for data
+            tls.write(encode_frame(b"hello", OP_PING, masked=False))
+            record = outgoing.read()
+            conn.sendall(record[:5])
+            time.sleep(self.hold_time)
+            conn.sendall(record[5:])
+            time.sleep(self.hold_time)
+
+    def close(self) -> None:
+        self.listener.close()
+
+
+def request(result: str, delay: float = 0, request_id="client-id") -> RPCRequest:
+    req = RPCRequest()
+    req.content = json.dumps({"jsonrpc": "2.0", "method": "eth_call", "params": [result, delay], "id": request_id})
+    req.content = req.content.encode()
+    return req
+
+
+class WebSocketEndpointTests(TestCase):
+    def setUp(self):
+        self.server = WebSocketEndpointStandIn()
+        self.addCleanup(self.server.close)
+        self.conn_descr = EndpointConnectionDescriptor.from_url(f"ws://127.0.0.1:{self.server.port}/ws")
+        self.pool = WebSocketConnectionPool(RPCEndpoint("node", self.conn_descr))
+        self.addCleanup(self.pool.close)
+
+    def forward(self, req: RPCRequest) -> dict:
+        handler = self.pool.get()
+        collector = ResponseBodyCollector()
+        try:
+            handler.send(req)
+            handler.receive(collector.feed_data)
+        finally:
+            handler.release()
+        return json.loads(collector.get_body())
+
+    def test_parses_websocket_urls(self):
+        conn_descr = EndpointConnectionDescriptor.from_url("wss://node.example.com/ws")
+
+        self.assertTrue(conn_descr.is_websocket)
+        self.assertTrue(conn_descr.is_ssl)
+        self.assertEqual(conn_descr.port, 443)
+        self.assertTrue(self.conn_descr.is_websocket)
+        self.assertFalse(self.conn_descr.is_ssl)
+        self.assertFalse(EndpointConnectionDescriptor.from_url("http://node.local:8545").is_websocket)
+
+    def test_restores_ids_of_requests(self):
+        for request_id in ["client-id", 7, None, {"nested": [1]}]:
+            response = self.forward(request("0x1", request_id=request_id))
+
+            self.assertEqual(response, {"jsonrpc": "2.0", "id": request_id, "result": "0x1"})
+        self.assertEqual(set(self.server.paths), {"/ws"})
+        self.assertEqual(len(set(self.server.received_ids)), 4)  # the endpoint sees proxy-unique ids
+
+    def test_demultiplexes_concurrent_calls(self):
+        self.forward(request("0x0"))  # the first call connects, the second connection is opened in the background
+        time.sleep(0.1)
+
+        # the earlier calls are answered last
+        calls = [(f"0x{i}", 0.05 * (10 - i)) for i in range(10)]
+        with ThreadPoolExecutor(len(calls)) as executor:
+            responses = list(executor.map(lambda call: self.forward(request(*call, request_id=call[0])), calls))
+
+        for (result, _), response in zip(calls, responses):
+            self.assertEqual(response, {"jsonrpc": "2.0", "id": result, "result": result})
+        self.assertEqual(self.server.connections, WebSocketConnectionPool.NUM_CONNECTIONS)
+        self.assertEqual(len(self.pool.busy_connections), 0)
+
+    def test_joins_fragmented_responses(self):
+        server = WebSocketEndpointStandIn(fragment_size=16)
+        self.addCleanup(server.close)
+        connection = WebSocketConnection(EndpointConnectionDescriptor.from_url(f"ws://127.0.0.1:{server.port}"))
+        self.addCleanup(connection.close)
+
+        _, future, _ = connection.call(request("0x" + "ab" * 100, request_id=3).content)
+
+        self.assertEqual(json.loads(future.result(1)), {"jsonrpc": "2.0", "id": 3, "result": "0x" + "ab" * 100})
+
+    def test_exchanges_requests_async(self):
+        async def forward(req: RPCRequest) -> dict:
+            handler = self.pool.get()
+            collector = ResponseBodyCollector()
+
+            async def callback(data):
+                collector.feed_data(data)
+
+            try:
+                await handler.send_async(req)
+                await handler.receive_async(callback)
+            finally:
+                handler.release()
+            return json.loads(collector.get_body())
+
+        async def exchange():
+            return await asyncio.gather(forward(request("0x1", 0.1, 1)), forward(request("0x2", 0, 2)))
+
+        self.assertEqual(
+            asyncio.run(exchange()),
+            [{"jsonrpc": "2.0", "id": 1, "result": "0x1"}, {"jsonrpc": "2.0", "id": 2, "result": "0x2"}],
+        )
+
+    def test_pending_calls_fail_when_connection_breaks(self):
+        handler = self.pool.get()
+        handler.send(request("0x1", 0.2))
+        handler.connection.close()
+
+        with self.assertRaises(BrokenConnectionError):
+            handler.receive(lambda data: None)
+        self.assertEqual(len(self.pool.busy_connections), 0)
+        self.assertEqual(self.forward(request("0x2"))["result"], "0x2")  # a new connection is opened
+
+    def test_rejects_request_which_is_not_json_object(self):
+        for content in [b"not json", b'"eth_call"']:
+            handler = self.pool.get()
+            req = RPCRequest()
+            req.content = content
+
+            with self.assertRaises(InvalidRequestError):
+                handler.send(req)
+            self.assertIsNone(handler.connection)  # released, the connection is not broken
+            self.assertEqual(len(self.pool.busy_connections), 0)
+        self.assertEqual(self.forward(request("0x2"))["result"], "0x2")
+        self.assertEqual(self.pool.stats.error_timestamps, [])
+
+    def test_wss_reader_does_not_block_senders_on_partial_record(self):
+        server = PartialRecordEndpointStandIn(hold_time=2)
+        self.addCleanup(server.close)
+        BaseSocket.TLS_CLIENTS[("localhost", server.port)] = TLSClient(
+            "localhost", ssl.create_default_context(cafile=CERT_FILE)
+        )
+        self.addCleanup(BaseSocket.TLS_CLIENTS.pop, ("localhost", server.port))
+        connection = WebSocketConnection(EndpointConnectionDescriptor.from_url(f"wss://localhost:{server.port}"))
+        self.addCleanup(connection.close)
+        time.sleep(0.5)  # the partial record is received
+
+        start = time.monotonic()
+        connection.call(request("0x1").content)
+
+        self.assertLess(time.monotonic() - start, 1)
@@ -0,0 +1,223 @@
+import asyncio
+import threading
+from unittest import TestCase
+from unittest.mock import Mock
+
+from web3pi_proxy.config.conf import Config
+from web3pi_proxy.core.interfaces.rpcrequest import RequestReaderMiddleware
+from web3pi_proxy.core.asyncproxy import AsyncWeb3RPCProxy
+from web3pi_proxy.core.rpc.node.endpoint_pool.pool_manager import (
+    EndpointConnectionPoolManager,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpoint_connection_handler import (
+    BrokenConnectionError,
+    EndpointConnectionHandler,
+    InvalidRequestError,
+)
+from web3pi_proxy.core.rpc.request.middleware.defaultmiddlewares.authenticator import (
+    AuthRequestReader,
+)
+from web3pi_proxy.core.rpc.request.middleware.defaultmiddlewares.requestreader import (
+    RequestReader,
+)
+from web3pi_proxy.core.rpc.request.middleware.requestmiddlewaredescr import (
+    RequestMiddlewareDescr,
+)
+from web3pi_proxy.interfaces.permissions import ClientPermissions
+from web3pi_proxy.interfaces.servicestate import StateUpdater
+
+REQUEST = (
+    b"POST /aaa HTTP/1.1\r\n"
+    b"Host: localhost:6512\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: 59\r\n"
+    b"\r\n"
+    b'{"jsonrpc":"2.0","method":"net_version","params":[],"id":0}'
+)
+
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 38\r\n\r\n"
+    b'{"jsonrpc":"2.0","id":0,"result":"1"}\n'
+)
+
+
+class AcceptingReader(RequestReaderMiddleware):
+    def __init__(self, next_reader: RequestReaderMiddleware = None):
+        self.next_reader = next_reader
+
+    def read_request(self, cs, req):
+        return self.success(req)
+
+
+class FakeStreamWriter:
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def is_closing(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+class AsyncWeb3RPCProxyTests(TestCase):
+    def setUp(self):
+        self.endpoint_connection_handler = Mock(EndpointConnectionHandler)
+
+        async def receive_async(callback):
+            await callback(RESPONSE)
+
+        self.endpoint_connection_handler.receive_async.side_effect = receive_async
+        self.endpoint_connection_handler.connection_pool = Mock()
+        self.connection_pool = Mock(EndpointConnectionPoolManager, endpoints=[])
+        self.connection_pool.may_retry.return_value = False
+        self.connection_pool.get_connection.return_value = self.endpoint_connection_handler
+        self.state_updater = Mock(StateUpdater)
+
+        middlewares = RequestMiddlewareDescr()
+        middlewares.append(RequestReader)
+        self.proxy = AsyncWeb3RPCProxy(
+            "127.0.0.1", 0, 1, middlewares, self.connection_pool, self.state_updater
+        )
+
+    @staticmethod
+    def _make_reader(data: bytes) -> asyncio.StreamReader:
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return reader
+
+    def _handle_client(self, data: bytes) -> FakeStreamWriter:
+        writer = FakeStreamWriter()
+
+        async def run():
+            await self.proxy.handle_client(self._make_reader(data), writer)
+
+        asyncio.run(run())
+        return writer
+
+    def test_forwards_request_and_relays_response(self):
+        writer = self._handle_client(REQUEST)
+
+        self.assertEqual(
+            bytes(writer.data),
+            RESPONSE.replace(b"\r\n", b"\r\nKeep-Alive: timeout=%d\r\n" % Config.CLIENT_IDLE_TIMEOUT, 1),
+        )
+        self.assertTrue(writer.closed)
+        self.endpoint_connection_handler.send_async.assert_called_once()
+        self.endpoint_connection_handler.release.assert_called_once()
+        self.state_updater.record_rpc_request.assert_called_once()
+        self.state_updater.record_rpc_response.assert_called_once()
+
+    def test_state_is_updated_off_the_event_loop(self):
+        threads = []
+        self.state_updater.record_rpc_request.side_effect = lambda req: threads.append(threading.current_thread())
+        self.state_updater.record_rpc_response.side_effect = (
+            lambda req, res: threads.append(threading.current_thread())
+        )
+
+        self._handle_client(REQUEST)
+
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_request_heads_are_authorized_off_the_event_loop(self):
+        threads = []
+        client_permissions = Mock(ClientPermissions)
+        client_permissions.is_authorized.side_effect = lambda key: (
+            threads.append(threading.current_thread()), key == "aaa"
+        )[1]
+        middlewares = RequestMiddlewareDescr()
+        middlewares.append(RequestReader)
+        middlewares.append(AuthRequestReader, client_permissions)
+        middlewares.append(AcceptingReader)
+        self.proxy = AsyncWeb3RPCProxy(
+            "127.0.0.1", 0, 1, middlewares, self.connection_pool, self.state_updater
+        )
+
+        writer = self._handle_client(REQUEST + REQUEST.replace(b"/aaa", b"/zzz"))
+
+        self.assertIn(b'"result":"1"', writer.data)
+        self.assertIn(b"401", writer.data)
+        self.assertEqual(self.endpoint_connection_handler.send_async.call_count, 1)
+        self.assertEqual(client_permissions.is_authorized.call_count, 2)  # once per request, at the head
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_endpoint_failure_is_answered_with_connection_error(self):
+        self.connection_pool.get_connection.side_effect = Exception("no pools")
+
+        writer = self._handle_client(REQUEST)
+
+        self.assertIn(b"Could not reach server", writer.data)
+        self.state_updater.record_rpc_request.assert_not_called()
+
+    def test_invalid_request_is_answered_with_json_rpc_error(self):
+        self.endpoint_connection_handler.send_async.side_effect = InvalidRequestError
+
+        writer = self._handle_client(REQUEST)
+
+        self.assertIn(b'"code":-32600', writer.data)
+        self.connection_pool.may_retry.assert_not_called()
+        self.state_updater.record_rpc_request.assert_not_called()
+
+    def test_bad_request_is_answered_without_endpoint_connection(self):
+        writer = self._handle_client(b"GET /aaa HTTP/1.1\r\nHost: localhost\r\n\r\n")
+
+        self.assertIn(b"405", writer.data)
+        self.connection_pool.get_connection.assert_not_called()
+
+    def test_pipelined_requests_are_answered_in_order(self):
+        responses = iter([RESPONSE, RESPONSE.replace(b'"result":"1"', b'"result":"2"')])
+
+        async def receive_async(callback):
+            await callback(next(responses))
+
+        sent_ids = []  # the request objects are recycled, so the content is recorded when sent
+
+        async def send_async(req):
+            sent_ids.append(req.content)
+
+        self.endpoint_connection_handler.receive_async.side_effect = receive_async
+        self.endpoint_connection_handler.send_async.side_effect = send_async
+
+        writer = self._handle_client(REQUEST + REQUEST.replace(b'"id":0', b'"id":1'))
+
+        self.assertEqual(self.endpoint_connection_handler.send_async.call_count, 2)
+        self.assertIn(b'"id":0', sent_ids[0])
+        self.assertIn(b'"id":1', sent_ids[1])
+        self.assertLess(writer.data.index(b'"result":"1"'), writer.data.index(b'"result":"2"'))
+
+    def test_broken_call_is_retried(self):
+        self.connection_pool.may_retry.return_value = True
+        self.endpoint_connection_handler.send_async.side_effect = [BrokenConnectionError, None]
+
+        writer = self._handle_client(REQUEST)
+
+        self.assertIn(b'"result":"1"', writer.data)
+        self.assertNotIn(b"Could not reach server", writer.data)
+        self.assertEqual(self.connection_pool.get_connection.call_count, 2)
+        self.assertIs(
+            self.connection_pool.get_connection.call_args.kwargs["failed_pool"],
+            self.endpoint_connection_handler.connection_pool,
+        )
+
+    def test_call_is_not_retried_after_response_is_started(self):
+        self.connection_pool.may_retry.return_value = True
+
+        async def receive_async(callback):
+            await callback(RESPONSE[:20])
+            raise BrokenConnectionError
+
+        self.endpoint_connection_handler.receive_async.side_effect = receive_async
+
+        writer = self._handle_client(REQUEST)
+
+        self.assertIn(b"Could not reach server", writer.data)
+        self.connection_pool.get_connection.assert_called_once()
@@ -0,0 +1,122 @@
+import sys
+import time
+from unittest import TestCase
+from unittest.mock import Mock
+
+from web3pi_proxy.core.rpc.node.client_socket_pool import ClientSocketPool
+from web3pi_proxy.core.rpc.node.timer_wheel import TimerWheel
+from web3pi_proxy.core.sockets.clientsocket import ClientSocket
+
+
+class TimerWheelTests(TestCase):
+    def test_expires_keys_in_deadline_order(self):
+        wheel = TimerWheel(10)
+        wheel.schedule("a", 100.5)
+        wheel.schedule("b", 102.0)
+        wheel.schedule("c", 100.9)
+
+        self.assertEqual(wheel.advance(100.0), [])
+        self.assertEqual(sorted(wheel.advance(100.6)), ["a"])
+        self.assertEqual(sorted(wheel.advance(101.0)), ["c"])
+        self.assertEqual(sorted(wheel.advance(150.0)), ["b"])
+        self.assertEqual(len(wheel), 0)
+
+    def test_rescheduled_and_cancelled_keys(self):
+        wheel = TimerWheel(10)
+        wheel.schedule("a", 100.0)
+        wheel.schedule("b", 100.0)
+        wheel.schedule("a", 105.0)
+        wheel.cancel("b")
+
+        self.assertEqual(wheel.advance(101.0), [])
+        self.assertEqual(wheel.advance(105.0), ["a"])
+
+
+class ClientSocketPoolTests(TestCase):
+    @staticmethod
+    def _cs(fd: int) -> ClientSocket:
+        cs = Mock(ClientSocket)()
+        cs.fd = fd
+        return cs
+
+    def test_idle_pending_sockets_expire(self):
+        pool = ClientSocketPool(idle_timeout=60)
+        sockets = [self._cs(fd) for fd in range(10, 15)]
+        for cs in sockets:
+            pool.add_cs_pending(cs)
+
+        pool.get_cs_and_set_in_use(11)  # in use sockets do not expire
+        pool.get_cs_and_set_in_use(12)
+        pool.set_cs_pending(12)
+
+        self.assertEqual(pool.pop_cs_expired(time.monotonic()), [])
+
+        expired = pool.pop_cs_expired(time.monotonic() + 61)
+
+        self.assertEqual(sorted(cs.fd for cs in expired), [10, 12, 13, 14])
+        self.assertEqual(pool.get_size(), 0)
+        self.assertTrue(pool.is_in_use(11))
+        self.assertEqual([fd for fd in range(10, 15) if pool.sockets[fd] is not None], [11])
+        self.assertEqual(list(pool.iterate_cs_pending()), [])
+
+    def test_timer_of_removed_socket_does_not_expire_socket_reusing_fd(self):
+        pool = ClientSocketPool(idle_timeout=60)
+        pool.add_cs_pending(self._cs(10))
+        old_generation = pool.get_generation(10)
+        pool.pop_cs_pending_from_tail()
+        cs = self._cs(10)
+        pool.add_cs_pending(cs)
+        pool.idle_timers.schedule((10, old_generation), time.monotonic())  # a timer left behind
+
+        self.assertEqual(pool.pop_cs_expired(time.monotonic() + 1), [])
+        self.assertEqual(list(pool.iterate_cs_pending()), [cs])
+        self.assertEqual(pool.pop_cs_expired(time.monotonic() + 61), [cs])
+
+    def test_pending_list_order_is_kept(self):
+        pool = ClientSocketPool(idle_timeout=0)
+        for fd in range(10, 14):
+            pool.add_cs_pending(self._cs(fd))
+
+        pool.get_cs_and_set_in_use(13)
+        pool.get_cs_and_set_in_use(11)
+        pool.set_cs_pending(13)
+
+        self.assertEqual([cs.fd for cs in pool.iterate_cs_pending()], [10, 12, 13])
+        self.assertEqual(pool.pop_cs_pending_from_tail().fd, 10)
+        self.assertEqual(pool.pop_cs_expired(), [])
+        self.assertEqual(pool.get_size(), 2)
+
+
+class FakeClientSocket:
+    __slots__ = ("fd",)
+
+    def __init__(self, fd: int):
+        self.fd = fd
+
+
+class ClientSocketPoolSoakTests(TestCase):
+    NUM_CYCLES = 1_000_000
+    NUM_FDS = 1000
+
+    def _run_cycles(self, pool: ClientSocketPool, num_cycles: int) -> None:
+        for i in range(num_cycles):
+            cs = FakeClientSocket(3 + (i * 7919) % self.NUM_FDS)  # short-lived client, fd numbers are reused
+            pool.add_cs_pending(cs)
+            pool.try_acquire(cs.fd)
+            if i % 4 == 0:  # keep-alive client sends one more request
+                pool.set_cs_pending(cs.fd)
+                pool.try_acquire(cs.fd)
+            pool.del_cs_in_use(cs.fd)
+
+    def test_memory_is_flat_over_connection_cycles(self):
+        pool = ClientSocketPool(idle_timeout=60)
+        self._run_cycles(pool, 10_000)  # warm up
+        capacity = pool.capacity
+        blocks_before = sys.getallocatedblocks()
+
+        self._run_cycles(pool, self.NUM_CYCLES)
+
+        self.assertLess(sys.getallocatedblocks() - blocks_before, 1000)
+        self.assertEqual(pool.capacity, capacity)
+        self.assertEqual(pool.get_size(), 0)
+        self.assertEqual(len(pool.idle_timers), 0)
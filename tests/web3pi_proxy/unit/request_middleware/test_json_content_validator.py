@@ -21,6 +21,7 @@ class AcceptJSONRPCContentReaderTests(TestCase):
         with patch(
             "web3pi_proxy.core.rpc.request.middleware.jsonrpcmiddlewares.jsoncontentvalidator.Config",
             JSON_RPC_REQUEST_PARSER_ENABLED=True,
+            MAX_BATCH_SIZE=100,
         ):
             return json_reader.read_request(Mock(ClientSocket), request)
 
@@ -163,3 +164,65 @@ class AcceptJSONRPCContentReaderTests(TestCase):
                         Mock(ClientSocket), self._make_request(payload)
                     )
                     self.assertIn(b"Missing method field", response.raw)
+
+    def test_reads_method_and_id_with_commas_in_params_when_disabled(self):
+        json_reader = AcceptJSONRPCContentReader()
+        request = RPCRequest(
+            content=b'{"params": ["a, \\"method\\": \\"x\\"", 1], "method": "eth_call", "id": "1, 2"}'
+        )
+        with patch(
+            "web3pi_proxy.core.rpc.request.middleware.jsonrpcmiddlewares.jsoncontentvalidator.Config",
+            JSON_RPC_REQUEST_PARSER_ENABLED=False,
+        ):
+            result, _ = json_reader.read_request(Mock(ClientSocket), request)
+        self.assertEqual(result.method, "eth_call")
+        self.assertEqual(result.id, "1, 2")
+
+    def test_batch_calls_are_validated_individually(self):
+        json_reader = AcceptJSONRPCContentReader()
+        payload = [
+            {"method": "net_version", "id": 0, "params": [], "jsonrpc": "2.0"},
+            {"method": "no_such_method", "id": "a", "params": [], "jsonrpc": "2.0"},
+            {"method": "eth_chainId", "id": 2, "jsonrpc": "2.0"},
+            7,
+        ]
+
+        result, _ = self._pass_request(json_reader, self._make_request(payload))
+
+        self.assertEqual([element.method for element in result.batch], ["net_version", "", "eth_chainId", ""])
+        self.assertEqual([element.id for element in result.batch], [0, "a", 2, None])
+        self.assertEqual(json.loads(result.batch[0].content), payload[0])
+        self.assertIn(b"Content-Length: %d\r\n" % result.batch[0].content_len, result.batch[0].headers)
+        self.assertEqual(
+            [element.response is None for element in result.batch], [True, False, True, False]
+        )
+        self.assertEqual(json.loads(result.batch[1].response)["error"]["code"], -32601)
+        self.assertEqual(json.loads(result.batch[1].response)["id"], "a")
+
+    def test_empty_batch_should_fail(self):
+        json_reader = AcceptJSONRPCContentReader()
+
+        _, response = self._pass_request(json_reader, self._make_request([]))
+
+        self.assertIn(b"Empty batch", response.raw)
+
+    def test_batch_calls_are_validated_like_requests_when_disabled(self):
+        json_reader = AcceptJSONRPCContentReader()
+        payload = [
+            {"method": "no_such_method", "id": 0, "params": ["a, b"]},
+            {"id": 1, "params": []},
+            7,
+        ]
+
+        with patch(
+            "web3pi_proxy.core.rpc.request.middleware.jsonrpcmiddlewares.jsoncontentvalidator.Config",
+            JSON_RPC_REQUEST_PARSER_ENABLED=False,
+            MAX_BATCH_SIZE=100,
+        ):
+            result, _ = json_reader.read_request(Mock(ClientSocket), self._make_request(payload))
+
+        self.assertEqual([element.method for element in result.batch], ["no_such_method", "", ""])
+        self.assertIsNone(result.batch[0].response)
+        self.assertEqual(json.loads(result.batch[0].content), payload[0])
+        for element in result.batch[1:]:
+            self.assertEqual(json.loads(element.response)["error"]["message"], "Missing method field")
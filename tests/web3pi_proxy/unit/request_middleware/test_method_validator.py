@@ -0,0 +1,49 @@
+import json
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from web3pi_proxy.config.conf import ProxyMode
+from web3pi_proxy.core.rpc.request.middleware.defaultmiddlewares.methodvalidator import (
+    AcceptMethodRequestReader,
+)
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.sockets.clientsocket import ClientSocket
+from web3pi_proxy.interfaces.permissions import CallPermissions
+
+
+class AcceptMethodRequestReaderTests(TestCase):
+    def setUp(self):
+        self.call_permissions = Mock(CallPermissions)
+        self.call_permissions.is_allowed.side_effect = lambda user_api_key, method: method != "eth_call"
+        self.call_permissions.get_call_priority.return_value = 1
+        self.call_permissions.get_user_constant_pool.return_value = None
+        self.method_reader = AcceptMethodRequestReader(None, self.call_permissions)
+
+    def _pass_request(self, request):
+        with patch(
+            "web3pi_proxy.core.rpc.request.middleware.defaultmiddlewares.methodvalidator.Config",
+            MODE=ProxyMode.PROD,
+        ):
+            return self.method_reader.read_request(Mock(ClientSocket), request)
+
+    def test_call_not_allowed_should_fail(self):
+        _, response = self._pass_request(RPCRequest(user_api_key="aaa", method="eth_call", id=1))
+
+        self.assertIn(b"You exceeded the limit of calls", response.raw)
+
+    def test_batch_calls_are_accepted_individually(self):
+        rejected_by_validation = RPCRequest(response=b'{"jsonrpc":"2.0","id":1,"error":{}}')
+        batch = [
+            RPCRequest(user_api_key="aaa", method="eth_chainId", id=0),
+            rejected_by_validation,
+            RPCRequest(user_api_key="aaa", method="eth_call", id=2),
+        ]
+
+        result, _ = self._pass_request(RPCRequest(user_api_key="aaa", batch=batch))
+
+        self.assertIs(result.batch, batch)
+        self.assertIsNone(batch[0].response)
+        self.assertEqual(batch[0].priority, 1)
+        self.assertIs(batch[1], rejected_by_validation)
+        self.assertEqual(json.loads(batch[2].response)["id"], 2)
+        self.assertEqual(self.call_permissions.is_allowed.call_count, 2)
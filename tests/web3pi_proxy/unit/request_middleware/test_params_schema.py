@@ -0,0 +1,79 @@
+from unittest import TestCase
+
+from tests.web3pi_proxy.data.json_rpc import RPCCalls
+from web3pi_proxy.core.rpc.request.middleware.jsonrpcmiddlewares.validation.errors import (
+    InvalidParamsError,
+)
+from web3pi_proxy.core.rpc.request.middleware.jsonrpcmiddlewares.validation.validators import (
+    JSONRPCMethodValidator,
+)
+
+ADDRESS = "0x6b175474e89094c44da98b954eedeac495271d0f"
+HASH = "0x3f07a9c83155594c000642e7d60e8a8a00038d03e9849171a05ed0e2d47acbb3"
+
+
+class JSONRPCMethodValidatorTests(TestCase):
+    @staticmethod
+    def _validate(method, params):
+        JSONRPCMethodValidator.validate(RPCCalls.create_json_payload(method, params))
+
+    def test_all_supported_methods_have_compiled_params(self):
+        self.assertEqual(
+            JSONRPCMethodValidator.METHOD_PARAMS.keys(),
+            JSONRPCMethodValidator.COMPILED_METHOD_PARAMS.keys(),
+        )
+        for payload in RPCCalls.generate_valid_calls():
+            with self.subTest(payload=payload):
+                JSONRPCMethodValidator.validate(payload)
+
+    def test_valid_params(self):
+        test_data = [
+            ["eth_call", [{"to": ADDRESS, "data": "0x", "gas": None}, {"blockHash": HASH, "requireCanonical": True}]],
+            ["eth_call", [{"to": ADDRESS, "accessList": [{"address": ADDRESS, "storageKeys": [HASH]}]}, HASH]],
+            ["eth_call", [{"to": ADDRESS, "customField": "0x1"}, "finalized"]],
+            ["eth_getLogs", [{"address": [ADDRESS, ADDRESS], "topics": [HASH, None, [HASH, HASH]], "toBlock": "safe"}]],
+            ["eth_feeHistory", ["0x4", "latest", [2.5, 50, 97.5]]],
+            ["eth_getStorageAt", [ADDRESS, "0x0", "0xc5043f"]],
+        ]
+        for method, params in test_data:
+            with self.subTest(method=method, params=params):
+                self._validate(method, params)
+
+    def test_invalid_params(self):
+        test_data = [
+            ["eth_getBalance", [ADDRESS[:-2], "latest"], 0, "address"],
+            ["eth_getBalance", [ADDRESS, "newest"], 1, "block tag, hash or object"],
+            ["eth_getBalance", [ADDRESS, {"requireCanonical": True}], 1, "block tag, hash or object"],
+            ["eth_getBlockByNumber", ["0xc5043f", "true"], 1, "boolean"],
+            ["eth_getBlockByHash", [HASH[:-1], False], 0, "32-byte hash"],
+            ["eth_sendRawTransaction", ["0xabc"], 0, "hex data"],
+            ["eth_getStorageAt", [ADDRESS, 0, "latest"], 1, "hex quantity"],
+            ["eth_call", [{"to": ADDRESS, "value": True}], 0, "call object"],
+            ["eth_call", [[ADDRESS]], 0, "call object"],
+            ["eth_getLogs", [{"topics": [[HASH, [HASH]]]}], 0, "filter object"],
+            ["eth_feeHistory", [4, "latest", [101]], 2, "list of number from 0 to 100"],
+            ["eth_feeHistory", [True, "latest", []], 0, "block count"],
+        ]
+        for method, params, index, expected in test_data:
+            with self.subTest(method=method, params=params):
+                with self.assertRaises(InvalidParamsError) as context:
+                    self._validate(method, params)
+                self.assertEqual(
+                    context.exception.message,
+                    f"Invalid value of parameter {index} for method '{method}', expected {expected}",
+                )
+
+    def test_invalid_characters_are_reported_first(self):
+        for params in [[ADDRESS, "latest;"], [{"to": ADDRESS, "data-": "0x"}]]:
+            with self.subTest(params=params):
+                with self.assertRaises(InvalidParamsError) as context:
+                    self._validate("eth_call" if type(params[0]) is dict else "eth_getBalance", params)
+                self.assertIn("Invalid characters", context.exception.message)
+
+    def test_params_count(self):
+        with self.assertRaises(InvalidParamsError) as context:
+            self._validate("eth_call", [])
+        self.assertEqual(
+            context.exception.message,
+            "Number of parameters for method 'eth_call' is 1 or 2, but 0 were given",
+        )
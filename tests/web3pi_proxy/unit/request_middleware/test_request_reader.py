@@ -1,17 +1,25 @@
+import time
 from unittest import TestCase
 from unittest.mock import Mock
 
+from web3pi_proxy.config.conf import Config
 from web3pi_proxy.core.interfaces.rpcrequest import RequestReaderMiddleware
+from web3pi_proxy.core.rpc.request.middleware.defaultmiddlewares.authenticator import (
+    AuthRequestReader,
+)
 from web3pi_proxy.core.rpc.request.middleware.defaultmiddlewares.requestreader import (
     RequestReader,
+    RequestStream,
 )
 from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
 from web3pi_proxy.core.sockets.clientsocket import ClientSocket
+from web3pi_proxy.interfaces.permissions import ClientPermissions
 
 
 class RequestReaderTests(TestCase):
     def setUp(self):
         self.socket_mock = Mock(ClientSocket)
+        self.socket_mock.return_value.request_stream = None
         self.request_reader_mock = Mock(RequestReaderMiddleware)
 
     def test_parses_request(self):
@@ -124,3 +132,196 @@ class RequestReaderTests(TestCase):
 
         self.assertIn(b"400", response.raw)
         self.assertIn(b"Bad Request", response.raw)
+
+    def test_reads_pipelined_requests_in_order(self):
+        sock = self.socket_mock()
+        sock.recv.side_effect = [
+            b"POST /aaa HTTP/1.1\r\nContent-Length: 59\r\n\r\n"
+            b'{"jsonrpc":"2.0","method":"net_version","params":[],"id":0}'
+            b"POST /aaa HTTP/1.1\r\nContent-Length: 59\r\n\r\n"
+            b'{"jsonrpc":"2.0","method":"eth_chainId","params":[],"id":1}'
+            b"POST /bbb HTTP/1.1\r\nConnection: close\r\nContent-Length: 60\r\n\r\n"
+            b'{"jsonrpc":"2.0",',
+            b'"method":"eth_gasPrice","params":[],"id":2}',
+        ]
+        request_reader = RequestReader()
+
+        first, _ = request_reader.read_request(sock, RPCRequest())
+        second, _ = request_reader.read_request(sock, RPCRequest())
+        third, _ = request_reader.read_request(sock, RPCRequest())
+
+        self.assertIn(b"net_version", first.content)
+        self.assertIn(b"eth_chainId", second.content)
+        self.assertIn(b"eth_gasPrice", third.content)
+        self.assertEqual(third.user_api_key, "bbb")
+        self.assertEqual(
+            [first.keep_alive, second.keep_alive, third.keep_alive], [True, True, False]
+        )
+        self.assertEqual(sock.recv.call_count, 2)
+        self.assertFalse(sock.request_stream.has_completed())
+
+    def test_rejects_too_large_headers(self):
+        sock = self.socket_mock()
+        sock.recv.side_effect = [
+            b"POST /aaa HTTP/1.1\r\n",
+            b"X-Large: " + b"a" * Config.MAX_REQUEST_HEADER_SIZE + b"\r\n",
+            b"\r\n",
+        ]
+
+        _, response = RequestReader().read_request(sock, RPCRequest())
+
+        self.assertIn(b"431", response.raw)
+        self.assertFalse(response.request.keep_alive)
+
+    def test_rejects_too_large_body_before_reading_it(self):
+        sock = self.socket_mock()
+        sock.recv.side_effect = [
+            b"POST /aaa HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (Config.MAX_REQUEST_BODY_SIZE + 1),
+            b"{" * 1024,
+        ]
+
+        _, response = RequestReader().read_request(sock, RPCRequest())
+
+        self.assertIn(b"413", response.raw)
+        self.assertEqual(sock.recv.call_count, 1)
+
+    def test_rejects_unauthorized_request_before_reading_body(self):
+        sock = self.socket_mock()
+        sock.recv.side_effect = [
+            b"POST /zzz HTTP/1.1\r\nContent-Length: 59\r\n\r\n",
+            b'{"jsonrpc":"2.0","method":"net_version","params":[],"id":0}',
+        ]
+        client_permissions = Mock(ClientPermissions)
+        client_permissions.is_authorized.return_value = False
+        request_reader = RequestReader(AuthRequestReader(self.request_reader_mock, client_permissions))
+
+        _, response = request_reader.read_request(sock, RPCRequest())
+
+        self.assertIn(b"401", response.raw)
+        self.assertEqual(sock.recv.call_count, 1)
+        client_permissions.is_authorized.assert_called_once_with("zzz")
+        self.request_reader_mock.read_request.assert_not_called()
+
+    def test_authorized_request_is_checked_once(self):
+        sock = self.socket_mock()
+        sock.recv.side_effect = [
+            b"POST /aaa HTTP/1.1\r\nContent-Length: 59\r\n\r\n",
+            b'{"jsonrpc":"2.0","method":"net_version","params":[],"id":0}',
+        ]
+        client_permissions = Mock(ClientPermissions)
+        client_permissions.is_authorized.return_value = True
+        self.request_reader_mock.validate_head.return_value = None
+        self.request_reader_mock.read_request.side_effect = lambda cs, req: (req, None)
+        request_reader = RequestReader(AuthRequestReader(self.request_reader_mock, client_permissions))
+
+        req, _ = request_reader.read_request(sock, RPCRequest())
+
+        self.assertEqual(req.user_api_key, "aaa")
+        client_permissions.is_authorized.assert_called_once_with("aaa")
+
+    def test_cors_preflight_is_not_authorized(self):
+        sock = self.socket_mock()
+        sock.recv.side_effect = [
+            b"OPTIONS / HTTP/1.1\r\nOrigin: http://example.com\r\nAccess-Control-Request-Method: POST\r\n\r\n",
+        ]
+        client_permissions = Mock(ClientPermissions)
+        request_reader = RequestReader(AuthRequestReader(self.request_reader_mock, client_permissions))
+
+        req, response = request_reader.read_request(sock, RPCRequest())
+
+        self.assertIsNone(response)
+        self.assertEqual(req.http_method, b"OPTIONS")
+        client_permissions.is_authorized.assert_not_called()
+        self.request_reader_mock.read_request.assert_not_called()
+
+    def test_drops_trickling_request_after_header_deadline(self):
+        sock = self.socket_mock()
+
+        chunks = iter([b"POST /aaa HTTP/1.1\r\nX-Slow: "])
+
+        def trickle(_buf_size):
+            time.sleep(0.02)
+            return next(chunks, b"X")
+
+        sock.recv.side_effect = trickle
+        sock.request_stream = RequestStream(header_timeout=0.1)
+
+        req, response = RequestReader().read_request(sock, RPCRequest())
+
+        self.assertIsNone(req)
+        self.assertIsNone(response)
+        self.assertLess(sock.recv.call_count, 20)
+
+    def test_joins_body_fragments(self):
+        content = b'{"jsonrpc":"2.0","method":"eth_sendRawTransaction","params":["0x' + b"ab" * 8192 + b'"],"id":0}'
+        sock = self.socket_mock()
+        sock.recv.side_effect = [b"POST /aaa HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(content)] + [
+            content[i:i + 1000] for i in range(0, len(content), 1000)
+        ]
+
+        req, _ = RequestReader().read_request(sock, RPCRequest())
+
+        self.assertEqual(req.content, content)
+        self.assertEqual(req.content_len, len(content))
+
+    def test_forwards_chunked_body_with_content_length(self):
+        sock = self.socket_mock()
+        sock.recv.side_effect = [
+            b"POST /aaa HTTP/1.1\r\nContent-Type: application/json\r\nTransfer-Encoding: chunked\r\n\r\n",
+            b'11\r\n{"jsonrpc":"2.0",\r\n',
+            b'2a\r\n"method":"net_version","params":[],"id":0}\r\n0\r\n\r\n',
+        ]
+
+        req, _ = RequestReader().read_request(sock, RPCRequest())
+
+        self.assertEqual(req.content, b'{"jsonrpc":"2.0","method":"net_version","params":[],"id":0}')
+        self.assertEqual(req.headers, b"Content-Type: application/json\r\nContent-Length: 59\r\n")
+
+    def test_forwards_only_allowed_headers(self):
+        sock = self.socket_mock()
+        sock.recv.side_effect = [
+            b"POST /aaa HTTP/1.1\r\n"
+            b"User-Agent: curl/8.0.1\r\nAccept: */*\r\nCookie: a=b\r\nContent-Type: application/json\r\n"
+            b"Content-Length: 59\r\n\r\n"
+            b'{"jsonrpc":"2.0","method":"net_version","params":[],"id":0}',
+        ]
+        sock.request_stream = RequestStream(forwarded_headers="accept, User-Agent")
+
+        req, _ = RequestReader().read_request(sock, RPCRequest())
+
+        self.assertEqual(
+            req.headers,
+            b"User-Agent: curl/8.0.1\r\nAccept: */*\r\nContent-Type: application/json\r\nContent-Length: 59\r\n",
+        )
+
+    def test_request_objects_are_reused_on_connection(self):
+        request = (
+            b"POST /aaa HTTP/1.1\r\nContent-Length: 59\r\n\r\n"
+            b'{"jsonrpc":"2.0","method":"net_version","params":[],"id":0}'
+        )
+        sock = self.socket_mock()
+        sock.recv.return_value = request
+        request_reader = RequestReader()
+
+        handled = set()
+        for _ in range(10):
+            stream = sock.request_stream
+            req, _ = request_reader.read_request(sock, stream.take_spare_request() if stream else RPCRequest())
+            self.assertEqual(req.content_len, 59)
+            handled.add(id(req))
+            sock.request_stream.recycle(req)
+            self.assertIsNone(req.content)
+
+        self.assertEqual(len(handled), 1)
+
+    def test_negotiates_response_encoding_without_forwarding_it(self):
+        sock = self.socket_mock()
+        sock.recv.side_effect = [
+            b"POST /aaa HTTP/1.1\r\nAccept-Encoding: gzip, deflate\r\nContent-Length: 59\r\n\r\n"
+            b'{"jsonrpc":"2.0","method":"net_version","params":[],"id":0}',
+        ]
+
+        req, _ = RequestReader().read_request(sock, RPCRequest())
+
+        self.assertEqual(req.response_encoding, b"gzip")
+        self.assertEqual(req.headers, b"Content-Length: 59\r\n")
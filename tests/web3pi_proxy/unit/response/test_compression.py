@@ -0,0 +1,126 @@
+import gzip
+import zlib
+from unittest import TestCase
+from unittest.mock import patch
+
+from httptools import HttpResponseParser
+
+from web3pi_proxy.core.rpc.cache.responsecacheservice import ResponseCacheService
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.rpc.response.batchresponse import BatchResponses
+from web3pi_proxy.core.utilhttp import compression
+from web3pi_proxy.core.utilhttp.compression import (
+    DEFLATE,
+    GZIP,
+    ResponseCompressor,
+    negotiate_encoding,
+)
+
+
+class ParsedResponse:
+    def __init__(self, raw: bytes) -> None:
+        self.headers = {}
+        self.body = b""
+        self.complete = False
+        parser = HttpResponseParser(self)
+        parser.feed_data(raw)
+        self.status_code = parser.get_status_code()
+
+    def on_header(self, name: bytes, value: bytes) -> None:
+        self.headers[name.lower()] = value
+
+    def on_body(self, body: bytes) -> None:
+        self.body += body
+
+    def on_message_complete(self) -> None:
+        self.complete = True
+
+
+class NegotiateEncodingTests(TestCase):
+    def test_prefers_gzip(self):
+        self.assertEqual(negotiate_encoding(b"deflate, gzip;q=0.5"), GZIP)
+        self.assertEqual(negotiate_encoding(b"br, deflate"), DEFLATE)
+        self.assertEqual(negotiate_encoding(b"*"), GZIP)
+
+    def test_identity_when_nothing_supported_is_accepted(self):
+        self.assertIsNone(negotiate_encoding(b"br, identity"))
+        self.assertIsNone(negotiate_encoding(b"gzip;q=0, deflate;q=0.0"))
+        self.assertIsNone(negotiate_encoding(b""))
+
+
+class ResponseCompressorTests(TestCase):
+    BODY = b'{"jsonrpc":"2.0","id":0,"result":"0x' + b"00ab" * 4096 + b'"}'
+
+    @staticmethod
+    def feed(compressor: ResponseCompressor, raw: bytes, part_size: int) -> bytes:
+        return b"".join(compressor.feed_data(raw[i:i + part_size]) for i in range(0, len(raw), part_size))
+
+    def test_passes_small_response_untouched(self):
+        raw = b'HTTP/1.1 200 OK\r\nContent-Length: 38\r\n\r\n{"jsonrpc":"2.0","id":0,"result":"1"}\n'
+
+        self.assertEqual(self.feed(ResponseCompressor(GZIP, min_size=1024), raw, 10), raw)
+
+    def test_compresses_large_response_in_chunks(self):
+        raw = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%b" % (
+            len(self.BODY),
+            self.BODY,
+        )
+
+        for encoding, decompress in ((GZIP, gzip.decompress), (DEFLATE, zlib.decompress)):
+            output = self.feed(ResponseCompressor(encoding, min_size=1024), raw, 1000)
+
+            response = ParsedResponse(output)
+            self.assertTrue(response.complete)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers[b"content-encoding"], encoding)
+            self.assertEqual(response.headers[b"transfer-encoding"], b"chunked")
+            self.assertEqual(response.headers[b"content-type"], b"application/json")
+            self.assertNotIn(b"content-length", response.headers)
+            self.assertEqual(decompress(response.body), self.BODY)
+            self.assertLess(len(response.body), len(self.BODY))
+
+    def test_compresses_chunked_response_once_it_reaches_min_size(self):
+        chunks = b"".join(b"%x\r\n%b\r\n" % (len(part), part) for part in (self.BODY[:500], self.BODY[500:]))
+        raw = b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n" + chunks + b"0\r\n\r\n"
+
+        response = ParsedResponse(self.feed(ResponseCompressor(GZIP, min_size=1024), raw, 300))
+
+        self.assertEqual(response.headers[b"content-encoding"], GZIP)
+        self.assertEqual(gzip.decompress(response.body), self.BODY)
+
+    def test_passes_small_chunked_response_untouched(self):
+        raw = b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n5\r\n{"Hel\r\nC\r\nlo":"World"}\r\n0\r\n\r\n'
+
+        self.assertEqual(self.feed(ResponseCompressor(GZIP, min_size=1024), raw, 7), raw)
+
+    def test_passes_encoded_response_untouched(self):
+        body = gzip.compress(self.BODY)
+        raw = b"HTTP/1.1 200 OK\r\nContent-Encoding: gzip\r\nContent-Length: %d\r\n\r\n%b" % (len(body), body)
+
+        self.assertEqual(self.feed(ResponseCompressor(GZIP, min_size=16), raw, 100), raw)
+
+
+class CompressedResponsesTests(TestCase):
+    def test_compresses_large_batch_response(self):
+        req = RPCRequest(response_encoding=GZIP)
+        req.batch = [RPCRequest() for _ in range(20)]
+        for element in req.batch:
+            element.response = b'{"jsonrpc":"2.0","id":0,"result":"0x0000000000000000"}'
+
+        response = ParsedResponse(BatchResponses.batch_response(req, min_compressed_size=256))
+
+        self.assertEqual(response.headers[b"content-encoding"], GZIP)
+        self.assertEqual(gzip.decompress(response.body), b"[" + b",".join([req.batch[0].response] * 20) + b"]")
+
+    def test_cached_response_is_compressed_once(self):
+        cache = ResponseCacheService(10000)
+        cache.store("eth_chainId", b'{"jsonrpc":"2.0","id":0,"result":"0x1"}')
+
+        with patch("web3pi_proxy.core.rpc.cache.responsecacheservice.compress", wraps=compression.compress) as mock:
+            first = cache.get_compressed("eth_chainId", GZIP)
+            second = cache.get_compressed("eth_chainId", GZIP)
+
+        self.assertEqual(mock.call_count, 1)
+        self.assertIs(first, second)
+        self.assertEqual(gzip.decompress(first), b'{"jsonrpc":"2.0","id":0,"result":"0x1"}')
+        self.assertIsNone(cache.get_compressed("eth_blockNumber", GZIP))
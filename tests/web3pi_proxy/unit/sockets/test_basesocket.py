@@ -0,0 +1,60 @@
+import resource
+import socket
+from unittest import TestCase, skipIf
+
+from web3pi_proxy.core.sockets.basesocket import BaseSocket
+from web3pi_proxy.core.sockets.poller import POLLIN, poll_ready
+
+NUM_SOCKET_PAIRS = 600  # 1200 sockets, fd numbers above FD_SETSIZE (1024)
+REQUIRED_FDS = 2 * NUM_SOCKET_PAIRS + 100
+
+
+def _raise_fd_limit() -> bool:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft >= REQUIRED_FDS:
+        return True
+    if hard != resource.RLIM_INFINITY and hard < REQUIRED_FDS:
+        return False
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (REQUIRED_FDS, hard))
+    except (ValueError, OSError):
+        return False
+    return True
+
+
+@skipIf(not _raise_fd_limit(), "cannot open enough file descriptors")
+class BaseSocketReadinessTests(TestCase):
+    def setUp(self):
+        self.pairs = [socket.socketpair() for _ in range(NUM_SOCKET_PAIRS)]
+        self.addCleanup(self._close_pairs)
+
+    def _close_pairs(self):
+        for s1, s2 in self.pairs:
+            s1.close()
+            s2.close()
+
+    def test_sockets_with_high_fd_numbers(self):
+        s_src, s_dst = self.pairs[-1]
+        self.assertGreater(s_dst.fileno(), 1024)
+        bs = BaseSocket(s_dst)
+
+        self.assertFalse(bs.is_ready_read(0))
+        self.assertTrue(bs.is_ready_write(0))
+
+        s_src.sendall(b"data")
+        self.assertTrue(bs.is_ready_read(1))
+        self.assertEqual(bs.recv(), b"data")
+        self.assertFalse(bs.is_ready_read(0))
+
+        s_src.close()
+        self.assertTrue(bs.is_ready_read(1))  # hang up is reported as readable, like select does
+        self.assertEqual(bs.recv(), b"")
+
+    def test_poll_ready_for_all_sockets(self):
+        for s_src, _ in self.pairs[::2]:
+            s_src.sendall(b"data")
+
+        fds = [s_dst.fileno() for _, s_dst in self.pairs]
+        ready = poll_ready(fds, POLLIN, 1)
+
+        self.assertEqual(sorted(ready), sorted(fds[::2]))
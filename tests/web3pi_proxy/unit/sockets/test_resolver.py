@@ -0,0 +1,102 @@
+import socket
+import time
+from unittest import TestCase
+
+from web3pi_proxy.core.sockets.resolver import Resolver
+
+V4_1 = (socket.AF_INET, ("10.0.0.1", 0))
+V4_2 = (socket.AF_INET, ("10.0.0.2", 0))
+V6 = (socket.AF_INET6, ("fd00::1", 0, 0, 0))
+
+
+class StubLookup:
+    """Local stand-in of the DNS, the records of the hosts can be changed by the tests"""
+
+    def __init__(self, records, ttl=60.0):
+        self.records = records
+        self.ttl = ttl
+        self.lookups = []
+
+    def __call__(self, host):
+        self.lookups.append(host)
+        if host not in self.records:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return list(self.records[host]), self.ttl
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met")
+        time.sleep(0.005)
+
+
+class ResolverTests(TestCase):
+    def test_caches_addresses_and_rotates_them(self):
+        lookup = StubLookup({"node.local": [V4_1, V4_2, V6]})
+        resolver = Resolver(lookup)
+
+        self.assertEqual(resolver.resolve("node.local"), [V4_1, V4_2, V6])
+        self.assertEqual(resolver.resolve("node.local"), [V4_2, V6, V4_1])
+        self.assertEqual(resolver.resolve("node.local"), [V6, V4_1, V4_2])
+        self.assertEqual(lookup.lookups, ["node.local"])
+
+    def test_ip_literals_are_not_looked_up(self):
+        lookup = StubLookup({})
+        resolver = Resolver(lookup)
+
+        self.assertEqual(resolver.resolve("127.0.0.1"), [(socket.AF_INET, ("127.0.0.1", 0))])
+        self.assertEqual(resolver.resolve("::1"), [(socket.AF_INET6, ("::1", 0, 0, 0))])
+        self.assertEqual(lookup.lookups, [])
+
+    def test_unknown_host_raises(self):
+        resolver = Resolver(StubLookup({}))
+
+        with self.assertRaises(OSError):
+            resolver.resolve("unknown.local")
+
+    def test_failed_addresses_are_tried_last(self):
+        resolver = Resolver(StubLookup({"node.local": [V4_1, V4_2]}), failure_backoff=60)
+
+        resolver.report_failure(V4_1)
+        self.assertEqual(resolver.resolve("node.local"), [V4_2, V4_1])
+        self.assertEqual(resolver.resolve("node.local"), [V4_2, V4_1])
+
+        resolver.report_success(V4_1)
+        self.assertEqual(resolver.resolve("node.local"), [V4_1, V4_2])
+
+    def test_expired_record_is_served_while_refreshed(self):
+        lookup = StubLookup({"node.local": [V4_1]}, ttl=0.05)
+        resolver = Resolver(lookup)
+        resolver.resolve("node.local")
+
+        lookup.records["node.local"] = [V4_2]
+        time.sleep(0.06)
+        self.assertEqual(resolver.resolve("node.local"), [V4_1])  # the refresh is not awaited
+
+        wait_for(lambda: resolver.resolve("node.local") == [V4_2])
+
+    def test_keeps_addresses_when_refresh_fails(self):
+        lookup = StubLookup({"node.local": [V4_1]}, ttl=0.05)
+        resolver = Resolver(lookup, failure_backoff=60)
+        resolver.resolve("node.local")
+
+        del lookup.records["node.local"]
+        time.sleep(0.06)
+        resolver.resolve("node.local")
+        wait_for(lambda: len(lookup.lookups) == 2)
+
+        self.assertEqual(resolver.resolve("node.local"), [V4_1])
+        time.sleep(0.05)
+        self.assertEqual(len(lookup.lookups), 2)  # the next refresh waits for the backoff
+
+    def test_prefetch_resolves_in_background(self):
+        lookup = StubLookup({"node.local": [V4_1]})
+        resolver = Resolver(lookup)
+
+        resolver.prefetch("node.local")
+        wait_for(lambda: lookup.lookups == ["node.local"])
+
+        self.assertEqual(resolver.resolve("node.local"), [V4_1])
+        self.assertEqual(lookup.lookups, ["node.local"])
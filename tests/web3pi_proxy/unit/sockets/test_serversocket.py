@@ -0,0 +1,55 @@
+import socket
+from unittest import TestCase
+
+from web3pi_proxy.core.sockets.serversocket import ServerSocket
+from web3pi_proxy.core.utilhttp.errors import ErrorResponses
+
+
+class ServerSocketAcceptTests(TestCase):
+    def setUp(self):
+        self.srv_socket = ServerSocket.create("127.0.0.1", 0, timeout=5)
+        self.addCleanup(self.srv_socket.socket.close)
+        self.address = self.srv_socket.socket.getsockname()
+
+    def _connect(self, num_connections: int):
+        connections = [socket.create_connection(self.address) for _ in range(num_connections)]
+        for conn in connections:
+            self.addCleanup(conn.close)
+        return connections
+
+    def _accept(self, max_connections: int):
+        accepted = self.srv_socket.accept_awaiting_connections(max_connections)
+        for cs in accepted:
+            self.addCleanup(cs.close)
+        return accepted
+
+    def test_backlog_is_drained_in_batches(self):
+        self._connect(5)
+
+        self.assertEqual(len(self._accept(3)), 3)
+        self.assertEqual(len(self._accept(3)), 2)
+        self.assertEqual(self._accept(3), [])
+        self.assertEqual(self.srv_socket.socket.gettimeout(), 5)
+
+    def test_accepted_connections_have_nagle_disabled(self):
+        self._connect(1)
+        cs, = self._accept(1)
+
+        self.assertTrue(cs.socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+
+    def test_shed_connection_gets_service_unavailable(self):
+        conn, = self._connect(1)
+        cs, = self._accept(1)
+
+        cs.send_all(ErrorResponses.service_unavailable())
+        cs.close()
+
+        conn.settimeout(5)
+        response = b""
+        while data := conn.recv(1024):
+            response += data
+        head, body = response.split(b"\r\n\r\n", 1)
+        self.assertTrue(head.startswith(b"HTTP/1.1 503 Service Unavailable\r\n"))
+        self.assertIn(b"\r\nConnection: close", head)
+        self.assertIn(f"\r\nContent-Length: {len(body)}".encode(), head)
+        self.assertIs(ErrorResponses.service_unavailable(), ErrorResponses.service_unavailable())
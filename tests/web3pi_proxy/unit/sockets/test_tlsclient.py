@@ -0,0 +1,99 @@
+import os
+import socket
+import ssl
+import time
+from threading import Thread
+from unittest import TestCase
+
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpointconnectionstats import (
+    EndpointConnectionStats,
+)
+from web3pi_proxy.core.sockets.basesocket import BaseSocket
+from web3pi_proxy.core.sockets.tlsclient import TLSClient
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+CERT_FILE = os.path.join(DATA_DIR, "tls_cert.pem")  # self-signed for localhost
+KEY_FILE = os.path.join(DATA_DIR, "tls_key.pem")
+
+
+class TLSEndpointStandIn:
+    """Local TLS server answering each connection with a single pong"""
+
+    def __init__(self) -> None:
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(CERT_FILE, KEY_FILE)
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        Thread(target=self.serve, daemon=True).start()
+
+    def serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            try:
+                with self.context.wrap_socket(conn, server_side=True) as tls_conn:
+                    tls_conn.recv(1024)
+                    tls_conn.sendall(b"pong")
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        self.listener.close()
+
+
+class TLSClientTests(TestCase):
+    def setUp(self):
+        self.server = TLSEndpointStandIn()
+        self.addCleanup(self.server.close)
+        self.tls_client = TLSClient("localhost", ssl.create_default_context(cafile=CERT_FILE))
+        BaseSocket.TLS_CLIENTS[("localhost", self.server.port)] = self.tls_client
+        self.addCleanup(BaseSocket.TLS_CLIENTS.pop, ("localhost", self.server.port))
+
+    def exchange(self) -> BaseSocket:
+        sock = BaseSocket.create_socket("localhost", self.server.port, True)
+        sock.send_all(b"ping")
+        self.assertEqual(sock.recv(), b"pong")
+        sock.close()
+        return sock
+
+    def test_resumes_session_of_previous_connection(self):
+        first = self.exchange()
+        self.assertFalse(first.session_reused)
+        self.assertIsNotNone(self.tls_client.session)
+
+        for _ in range(3):
+            sock = self.exchange()
+            self.assertTrue(sock.session_reused)
+            self.assertGreater(sock.handshake_time, 0)
+
+    def test_shares_context_of_endpoint(self):
+        self.assertIs(BaseSocket.get_tls_client("localhost", self.server.port), self.tls_client)
+        self.assertIsNot(BaseSocket.get_tls_client("localhost", self.server.port + 1), self.tls_client)
+        BaseSocket.TLS_CLIENTS.pop(("localhost", self.server.port + 1))
+
+    def test_handshakes_are_counted_in_endpoint_stats(self):
+        stats = EndpointConnectionStats()
+
+        stats.update_tls_handshake(0.004, False)
+        stats.update_tls_handshake(0.002, True)
+
+        self.assertEqual(stats.to_dict()["tls_handshakes"], 2)
+        self.assertEqual(stats.to_dict()["tls_resumed_handshakes"], 1)
+        self.assertEqual(stats.to_dict()["avg_tls_handshake_ms"], 3.0)
+
+    def test_handshake_is_bounded_by_connect_deadline(self):
+        silent = socket.create_server(("127.0.0.1", 0))  # accepts by the backlog, never answers the handshake
+        self.addCleanup(silent.close)
+        port = silent.getsockname()[1]
+        BaseSocket.TLS_CLIENTS[("localhost", port)] = self.tls_client
+        self.addCleanup(BaseSocket.TLS_CLIENTS.pop, ("localhost", port))
+        self.addCleanup(setattr, BaseSocket, "CONNECT_DEADLINE", BaseSocket.CONNECT_DEADLINE)
+        BaseSocket.CONNECT_DEADLINE = 0.3
+
+        start = time.monotonic()
+        with self.assertRaises(OSError):
+            BaseSocket.create_socket("localhost", port, True)
+
+        self.assertLess(time.monotonic() - start, 1)
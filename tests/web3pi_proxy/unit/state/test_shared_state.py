@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+from threading import Thread
+from unittest import TestCase
+from unittest.mock import Mock
+
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.interfaces.permissions import CallPermissions, ClientPermissions
+from web3pi_proxy.service.ledger.activityledger import SimpleActivityLedger
+from web3pi_proxy.state.sharedstate import (
+    ActivityAggregator,
+    ForwardingStateUpdater,
+    SharedStateManager,
+)
+
+
+class SharedStateTests(TestCase):
+    @staticmethod
+    def _request(user_api_key, method="eth_blockNumber") -> RPCRequest:
+        req = RPCRequest()
+        req.user_api_key = user_api_key
+        req.method = method
+        req.last_queried_size = 100
+        return req
+
+    def test_forwarded_activity_is_applied_to_ledger(self):
+        ctx = multiprocessing.get_context("fork")
+        records = ctx.Queue()
+        ledger = SimpleActivityLedger()
+        aggregator = ActivityAggregator(ledger, records)
+        aggregator.start()
+
+        def run_worker():
+            updater = ForwardingStateUpdater(records)
+
+            def record():
+                for _ in range(25):
+                    req = self._request("aaa")
+                    updater.record_rpc_request(req)
+                    updater.record_rpc_response(req, bytearray(10))
+                updater.record_rpc_request(self._request(None))
+
+            proxy_threads = [Thread(target=record) for _ in range(2)]
+            for thread in proxy_threads:
+                thread.start()
+            for thread in proxy_threads:
+                thread.join()
+
+            updater.close()
+
+        workers = [ctx.Process(target=run_worker) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+        aggregator.stop()
+
+        total_stats = ledger.get_all_time_user_summary("aaa").total_stats
+        self.assertEqual(total_stats.num_calls, 100)
+        self.assertEqual(total_stats.total_bytes, 100 * 110)
+        self.assertEqual(
+            ledger.get_active_state_sample().get_user_activity_summary("aaa").total_stats.num_calls, 100
+        )
+        self.assertIsNone(ledger.get_all_time_user_summary(None))
+
+    def test_permissions_are_served_to_workers(self):
+        client_permissions = Mock(ClientPermissions)
+        client_permissions.is_authorized.side_effect = lambda key: key == "aaa"
+        call_permissions = Mock(CallPermissions)
+        call_permissions.is_allowed.return_value = False
+        call_permissions.get_user_constant_pool.return_value = "pool"
+
+        SharedStateManager.register_permissions(client_permissions, call_permissions)
+        authkey = os.urandom(32)
+        server = SharedStateManager(authkey=authkey).get_server()
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        worker_state = SharedStateManager(address=server.address, authkey=authkey)
+        worker_state.connect()
+
+        self.assertTrue(worker_state.client_permissions().is_authorized("aaa"))
+        self.assertFalse(worker_state.client_permissions().is_authorized("bbb"))
+        self.assertFalse(worker_state.call_permissions().is_allowed("aaa", "eth_blockNumber"))
+        self.assertEqual(worker_state.call_permissions().get_user_constant_pool("aaa"), "pool")
+        call_permissions.is_allowed.assert_called_once_with("aaa", "eth_blockNumber")
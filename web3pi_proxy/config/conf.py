@@ -41,17 +41,71 @@ class AppConfig:
     # iow, the address that the clients should use to connect to the proxy
     PROXY_CONNECTION_ADDRESS: Optional[str] = None
     PROXY_LISTEN_PORT: int = 6512
+    # proxy engine: "threads" (epoll + thread pool) or "asyncio" (coroutine per client connection)
+    PROXY_ENGINE: str = "threads"
+    # number of proxy processes sharing the listen port (SO_REUSEPORT), the main process keeps the billing state
+    NUM_PROCESSES: int = 1
     NUM_PROXY_WORKERS: int = 150
     MAX_PENDING_CLIENT_SOCKETS: int = 10_000
+    # requests being handled or waiting for a worker, new connections over the limit are refused with 503
+    MAX_IN_USE_CLIENT_SOCKETS: int = 1500
+    # max number of connections accepted at once, when the server socket is signalled by the poller
+    ACCEPT_BATCH_SIZE: int = 64
     MAX_CONCURRENT_CONNECTIONS: int = 21
     MAX_SATURATED_ITERATIONS_LISTEN_PARAM: int = 2
+    # idle connections kept by each endpoint pool, connections are opened in the background to keep MIN_IDLE_CONNECTIONS
+    # the values can be set for a single endpoint with "min_idle" and "max_idle" of its ETH_ENDPOINTS entry
+    MIN_IDLE_CONNECTIONS: int = 2
+    MAX_IDLE_CONNECTIONS: int = NUM_PROXY_WORKERS
     # unused conn to eth rpc node is closed between IDLE_CONNECTION_TIMEOUT and 2*IDLE_CONNECTION_TIMEOUT, seconds
     IDLE_CONNECTION_TIMEOUT: int = 300
+    # limits of reading a single client request: the request line and headers, then the body, seconds
+    REQUEST_HEADER_TIMEOUT: float = 5.0
+    REQUEST_BODY_TIMEOUT: float = 10.0
+    # requests exceeding the limits are rejected with 431 and 413, bytes
+    MAX_REQUEST_HEADER_SIZE: int = 16 * 1024
+    MAX_REQUEST_BODY_SIZE: int = 5 * 1024 * 1024
+    # max number of calls in a JSON-RPC batch request, the calls are forwarded in parallel by NUM_BATCH_WORKERS
+    MAX_BATCH_SIZE: int = 100
+    NUM_BATCH_WORKERS: int = 32
+    # comma separated names of client request headers forwarded to the endpoints, empty means all the headers
+    FORWARDED_REQUEST_HEADERS: str = ""
+    # responses of at least RESPONSE_COMPRESSION_MIN_SIZE bytes are compressed with gzip or deflate accepted by a client
+    # at RESPONSE_COMPRESSION_LEVEL 1-9, UPSTREAM_COMPRESSION_ENABLED requests gzip from the endpoints and passes it through
+    RESPONSE_COMPRESSION_ENABLED: bool = True
+    RESPONSE_COMPRESSION_MIN_SIZE: int = 4096
+    RESPONSE_COMPRESSION_LEVEL: int = 6
+    UPSTREAM_COMPRESSION_ENABLED: bool = False
+    # resolved endpoint addresses are cached for DNS_CACHE_TTL seconds, the system resolver does not report the TTLs
+    # an address failing to connect is tried after the other addresses of its host for DNS_FAILURE_BACKOFF seconds
+    DNS_CACHE_TTL: int = 60
+    DNS_FAILURE_BACKOFF: float = 30.0
+    # ws:// and wss:// endpoints share WEBSOCKET_CONNECTIONS connections among all the requests
+    # a request fails if its response is not received in WEBSOCKET_RESPONSE_TIMEOUT seconds, messages are limited in bytes
+    WEBSOCKET_CONNECTIONS: int = 2
+    WEBSOCKET_RESPONSE_TIMEOUT: float = 30.0
+    WEBSOCKET_MAX_MESSAGE_SIZE: int = 64 * 1024 * 1024
+    # endpoint responses are received into RECV_BUFFER_POOL_SIZE reused buffers of DEFAULT_RECV_BUF_SIZE bytes
+    # RESPONSE_SPLICE_ENABLED moves plain TCP response bodies from the endpoints to the clients in the kernel (Linux)
+    RECV_BUFFER_POOL_SIZE: int = 64
+    RESPONSE_SPLICE_ENABLED: bool = True
+    # the receive buffers grow with the average response size of the method and endpoint, up to MAX_RECV_BUF_SIZE bytes
+    # RECV_SOCKET_BUF_ADAPTIVE raises SO_RCVBUF of the endpoint sockets along, it disables the Linux receive autotuning
+    MAX_RECV_BUF_SIZE: int = 1024 * 1024
+    RECV_SOCKET_BUF_ADAPTIVE: bool = False
+    # calls of read-only methods broken by an endpoint connection failure are retried, on another endpoint if there is one
+    # up to RETRY_MAX_ATTEMPTS times within RETRY_DEADLINE seconds, RETRY_BUDGET_RATE retries per second with bursts
+    RETRY_MAX_ATTEMPTS: int = 2
+    RETRY_DEADLINE: float = 10.0
+    RETRY_BUDGET_RATE: float = 5.0
+    RETRY_BUDGET_BURST: int = 10
+    # idle keep-alive client connections are closed after CLIENT_IDLE_TIMEOUT seconds, 0 disables, seconds
+    CLIENT_IDLE_TIMEOUT: int = 60
     SSL_ENABLED: bool = False
     SSL_CERT_FILE: str = "cert.pem"
     SSL_KEY_FILE: str = "key.pem"
 
-    LISTEN_BACKLOG_PARAM: int = 21
+    LISTEN_BACKLOG_PARAM: int = 1024
     BLOCKING_ACCEPT_TIMEOUT: int = 5
 
     QOS_BASE_FREQUENCY: int = 200
@@ -132,6 +186,12 @@ class AppConfig:
                 except ValueError:
                     print("Unrecognized MODE", env_value, "available modes: DEV, SIM, PROD")
                     raise Exception("Unrecognized MODE")
+            elif field == "PROXY_ENGINE":
+                if env_value.lower() in ["threads", "asyncio"]:
+                    value = env_value.lower()
+                else:
+                    print("Unrecognized PROXY_ENGINE", env_value, "available engines: threads, asyncio")
+                    raise Exception("Unrecognized PROXY_ENGINE")
             elif field == "LOADBALANCER":
                 if env_value in ["RandomLoadBalancer", "LeastBusyLoadBalancer", "ConstantLoadBalancer"]:
                     value = env_value
@@ -0,0 +1,347 @@
+import asyncio
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional, Tuple
+
+from web3pi_proxy.config.conf import Config
+from web3pi_proxy.core.interfaces.rpcrequest import RequestReaderMiddleware
+from web3pi_proxy.core.rpc.node.endpoint_pool.endpoint_connection_pool import (
+    EndpointConnectionPool,
+)
+from web3pi_proxy.core.rpc.node.endpoint_pool.pool_manager import (
+    EndpointConnectionPoolManager,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpoint_connection_handler import (
+    BrokenConnectionError,
+    EndpointConnectionHandler,
+    InvalidRequestError,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import ClientWriteError
+from web3pi_proxy.core.rpc.request.middleware.defaultmiddlewares.requestreader import (
+    RequestReader,
+    RequestStream,
+)
+from web3pi_proxy.core.rpc.request.middleware.requestmiddlewaredescr import (
+    RequestMiddlewareDescr,
+)
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.rpc.response.batchresponse import BatchResponses
+from web3pi_proxy.core.rpc.response.optionsresponse import OptionsResponses
+from web3pi_proxy.core.rpc.response.rpcresponse import RPCResponse
+from web3pi_proxy.core.sockets.serversocket import ServerSocket
+from web3pi_proxy.core.utilhttp.compression import ResponseCompressor
+from web3pi_proxy.core.utilhttp.errors import ErrorResponses
+from web3pi_proxy.core.utilhttp.headers import ResponseHeaders
+from web3pi_proxy.interfaces.servicestate import StateUpdater
+from web3pi_proxy.utils.logger import get_logger
+
+
+class AsyncWeb3RPCProxy:
+    """
+    Proxy engine based on asyncio, an alternative to the epoll + thread pool loop of Web3RPCProxy.
+    Every client connection is served by a coroutine, both client and endpoint sockets are non-blocking.
+    Threads of the default executor are used only for blocking operations: establishing endpoint connections,
+    ssl endpoint I/O, the request middlewares and the state updater, which may query a database or another process.
+    """
+
+    __logger = get_logger("AsyncWeb3RPCProxy")
+
+    def __init__(
+        self,
+        proxy_listen_address: str,
+        proxy_listen_port: int,
+        num_proxy_workers: int,
+        middlewares: RequestMiddlewareDescr,
+        connection_pool: EndpointConnectionPoolManager,
+        state_updater: StateUpdater,
+        reuse_port: bool = False,
+    ) -> None:
+
+        self.request_reader = middlewares.instantiate()
+        if not isinstance(self.request_reader, RequestReader):
+            raise Exception("asyncio engine requires RequestReader to be the first request middleware")
+
+        self.__print_pre_init_info(self.request_reader, connection_pool)
+
+        self.proxy_listen_address = proxy_listen_address
+        self.proxy_listen_port = proxy_listen_port
+        self.connection_pool = connection_pool
+        self.state_updater = state_updater
+        self.reuse_port = reuse_port
+
+        self.num_workers = num_proxy_workers
+
+    @classmethod
+    def __print_pre_init_info(
+        cls, rr: RequestReaderMiddleware, cp: EndpointConnectionPoolManager
+    ) -> None:
+
+        print(f"Starting {Config.PROXY_NAME}, version {Config.PROXY_VER} (asyncio engine)")
+        print(f"Provided request middleware chain: {rr}")
+
+        endpoints = cp.endpoints
+        print(
+            f'Connected to {len(endpoints)} endpoint{"s" if len(endpoints) > 1 else ""}:',
+            end="",
+        )
+        for i in range(len(endpoints)):
+            print(
+                f'{"" if i == 0 else ","} "{endpoints[i].get_name()}" @ {endpoints[i].get_endpoint_addr()}',
+                end="",
+            )
+
+        print("\nInitializing proxy...")
+
+    async def read_request(
+        self, reader: asyncio.StreamReader, request_stream: RequestStream, req: RPCRequest
+    ) -> RequestReaderMiddleware.ReturnType:
+        buf_size = Config.DEFAULT_RECV_BUF_SIZE
+
+        request_stream.spare = req
+
+        idle_timeout = Config.CLIENT_IDLE_TIMEOUT or None
+        try:
+            while not request_stream.has_completed():
+                if request_stream.error is not None:
+                    req.keep_alive = False  # the rest of the request is not read
+                    return self.request_reader.failure(request_stream.error, req)
+                idle = not request_stream.is_reading()
+                timeout = idle_timeout if idle else request_stream.read_timeout(0.1)  # TODO parametrization
+                if timeout is not None and timeout <= 0:
+                    self.__logger.warning("client request read deadline exceeded")
+                    req.keep_alive = False
+                    return None, None
+                try:
+                    data = await asyncio.wait_for(reader.read(buf_size), timeout)
+                except asyncio.TimeoutError:
+                    if idle:
+                        self.__logger.debug("idle client connection expired")
+                    else:
+                        self.__logger.warning("client socket read timeout")
+                    req.keep_alive = False
+                    return None, None
+                if not data:
+                    self.__logger.debug("client socket closed")
+                    req.keep_alive = False
+                    return None, None
+                request_stream.feed_data(data)
+                if request_stream.unvalidated:  # the middlewares may query a database or another process
+                    await self.__run_blocking(request_stream.validate_unvalidated)
+        except IOError:
+            self.__logger.error("IOError")
+            req.keep_alive = False
+            return None, None
+
+        # the rest of the middleware chain does not touch the client socket
+        return await self.__run_blocking(
+            self.request_reader.accept_request, None, request_stream.completed.popleft()
+        )
+
+    @staticmethod
+    async def __run_blocking(func: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def __create_response_handler(
+        self,
+        endpoint_connection_handler: EndpointConnectionHandler,
+        writer: asyncio.StreamWriter,
+        req: RPCRequest,
+    ) -> Tuple[Callable[[bytes], Awaitable[None]], Callable[[], bool]]:
+        """Returns the response handler and a function telling whether the handler has been called,
+        a call is not retried once a part of its response went to the client"""
+        extra_headers = ResponseHeaders.extra_headers(req)
+        compressor = ResponseCompressor(req.response_encoding) if req.response_encoding is not None else None
+        started = False
+
+        async def response_handler(res: bytes):
+            nonlocal extra_headers, started
+            started = True
+            if writer.is_closing():
+                return
+            data = compressor.feed_data(res) if compressor is not None else res
+            if data:
+                if extra_headers:
+                    data = data.replace(b"\r\n", b"\r\n" + extra_headers, 1)
+                    extra_headers = None
+                writer.write(data)
+                try:
+                    await writer.drain()
+                except ConnectionError:  # client is gone, the response is still consumed to keep the endpoint connection
+                    writer.close()
+                    return
+            endpoint_connection_handler.update_response_stats(res)
+            await self.__run_blocking(self.state_updater.record_rpc_response, req, res)
+
+        return response_handler, lambda: started
+
+    async def __get_endpoint_connection(
+        self, req: RPCRequest, failed_pool: Optional[EndpointConnectionPool] = None
+    ) -> EndpointConnectionHandler:
+        endpoint_connection_handler = self.connection_pool.get_connection(
+            req, establish=False, failed_pool=failed_pool
+        )
+        if endpoint_connection_handler is None:
+            endpoint_connection_handler = await asyncio.get_running_loop().run_in_executor(
+                None, self.connection_pool.get_connection, req, True, failed_pool
+            )
+        return endpoint_connection_handler
+
+    async def __send_to_client(self, writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(data)
+        await writer.drain()
+
+    async def __handle_batch(self, req: RPCRequest) -> bytes:
+        """Forwards the calls of a batch request concurrently and returns the response array"""
+        forwarded = [element for element in req.batch if element.response is None]  # the rest was rejected
+        if forwarded:
+            elements = await self.connection_pool.forward_batch_async(forwarded)
+
+            def record_batch() -> None:
+                for element in elements:
+                    self.state_updater.record_rpc_request(element)
+                    self.state_updater.record_rpc_response(element, element.response)
+
+            await self.__run_blocking(record_batch)
+        return BatchResponses.batch_response(req, ResponseHeaders.extra_headers(req))
+
+    async def handle_request(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request_stream: RequestStream
+    ) -> bool:
+        """Handles a single request, returns whether the client connection should be kept alive"""
+        req, err = await self.read_request(reader, request_stream, request_stream.take_spare_request())
+
+        if req is None and err is None:
+            return False
+
+        try:
+            return await self.__handle_read_request(writer, req, err)
+        finally:
+            request_stream.recycle(req if req is not None else err.request)
+
+    async def __handle_read_request(
+        self, writer: asyncio.StreamWriter, req: Optional[RPCRequest], err: Optional[RPCResponse]
+    ) -> bool:
+        if err is not None:
+            await self.__send_to_client(writer, err.raw)
+            return err.request.keep_alive
+
+        if req.http_method == b"OPTIONS":  # TODO CORS are always included, is that right?
+            await self.__send_to_client(writer, OptionsResponses.options_response(req))
+            return req.keep_alive
+
+        if req.batch is not None:
+            await self.__send_to_client(writer, await self.__handle_batch(req))
+            return req.keep_alive
+
+        # a call broken by a connection failure is retried with another connection, of another endpoint if possible
+        deadline = time.monotonic() + Config.RETRY_DEADLINE
+        failed_pool = None
+        attempt = 0
+        while True:
+            try:
+                endpoint_connection_handler = await self.__get_endpoint_connection(req, failed_pool)
+            except Exception as error:
+                self.__logger.error("%s: %s", error.__class__, error)
+                self.__logger.error("Failed to establish endpoint connection")
+                await self.__send_to_client(writer, ErrorResponses.connection_error(req.id))
+                return req.keep_alive
+
+            try:
+                try:
+                    await endpoint_connection_handler.send_async(req)
+                except InvalidRequestError:
+                    await self.__send_to_client(writer, ErrorResponses.invalid_request(req.id))
+                    return req.keep_alive
+                except BrokenConnectionError:
+                    self.__logger.error(
+                        f"Failed to send request with {endpoint_connection_handler}"
+                    )
+                    endpoint_connection_handler.close()
+                    if self.connection_pool.may_retry(req, attempt, deadline):
+                        failed_pool = endpoint_connection_handler.connection_pool
+                        attempt += 1
+                        continue
+                    await self.__send_to_client(writer, ErrorResponses.connection_error(req.id))
+                    return req.keep_alive
+
+                response_handler, response_started = self.__create_response_handler(
+                    endpoint_connection_handler, writer, req
+                )
+                try:
+                    await endpoint_connection_handler.receive_async(response_handler)
+                except ClientWriteError:
+                    self.__logger.warning("Client connection broke while sending the response")
+                    return False
+                except BrokenConnectionError:
+                    self.__logger.error(
+                        f"Failed to receive response with {endpoint_connection_handler}"
+                    )
+                    endpoint_connection_handler.close()
+                    if not response_started() and self.connection_pool.may_retry(req, attempt, deadline):
+                        failed_pool = endpoint_connection_handler.connection_pool
+                        attempt += 1
+                        continue
+                    await self.__send_to_client(writer, ErrorResponses.connection_error(req.id))
+                    return req.keep_alive
+
+                endpoint_connection_handler.update_request_stats(req)
+                await self.__run_blocking(self.state_updater.record_rpc_request, req)
+            finally:
+                endpoint_connection_handler.release()
+
+            return req.keep_alive
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        # pipelined requests are queued by the stream and handled one by one, so the responses keep their order
+        request_stream = RequestStream(self.request_reader.validate_head, defer_head_validation=True)
+        try:
+            while await self.handle_request(reader, writer, request_stream):
+                pass
+        except Exception as e:
+            traceback.print_exc()
+            self.__logger.error(e)
+            print(f"Error while handling the client request {e}")
+        finally:
+            writer.close()
+
+    @classmethod
+    def __print_post_init_info(cls, proxy_listen_address, proxy_listen_port: int) -> None:
+        print(
+            "Proxy initialized and listening on {}".format(
+                f"{proxy_listen_address}:{proxy_listen_port}"
+            )
+        )
+
+    async def main_loop(self) -> None:
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(self.num_workers)
+        )
+        server = await asyncio.start_server(
+            self.handle_client,
+            self.proxy_listen_address,
+            self.proxy_listen_port,
+            backlog=Config.LISTEN_BACKLOG_PARAM,
+            ssl=ServerSocket.create_ssl_context() if Config.SSL_ENABLED else None,
+            reuse_address=True,
+            reuse_port=self.reuse_port,
+        )
+        self.__print_post_init_info(self.proxy_listen_address, self.proxy_listen_port)
+        async with server:
+            await server.serve_forever()
+
+    def cleanup(self) -> None:
+        print()
+
+        print("Proxy interrupted - closing node connections")
+        self.connection_pool.close()
+
+    def run_forever(self) -> None:
+        try:
+            asyncio.run(self.main_loop())
+        except KeyboardInterrupt:
+            self.cleanup()
+        except Exception:
+            raise
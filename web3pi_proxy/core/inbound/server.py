@@ -1,8 +1,8 @@
-import select
 from typing import Iterable, List, Set
 
 from web3pi_proxy.config.conf import Config
 from web3pi_proxy.core.sockets.clientsocket import ClientSocket
+from web3pi_proxy.core.sockets.poller import POLLIN, poll_ready
 from web3pi_proxy.core.sockets.serversocket import ServerSocket
 from web3pi_proxy.core.utilhttp.errors import ErrorResponses
 
@@ -16,6 +16,7 @@ class InboundServer:
         blocking_accept_timeout: int,
         max_concurrent_conn: int = Config.MAX_CONCURRENT_CONNECTIONS,
         qos_frequency: float = Config.QOS_BASE_FREQUENCY,
+        reuse_port: bool = False,
     ) -> None:
 
         self.accepted_connections = set()
@@ -26,7 +27,7 @@ class InboundServer:
 
         self.no_saturated_iterations = 0
 
-        self.server_s = ServerSocket.create(listen_address, listen_port)
+        self.server_s = ServerSocket.create(listen_address, listen_port, reuse_port=reuse_port)
 
     @classmethod
     def _receive_dev_null(cls, rejected: Iterable[ClientSocket]) -> None:
@@ -118,13 +119,13 @@ class InboundServer:
 
         res = {}
         for cs in self.active_connections:
-            res[cs.socket] = cs
+            res[cs.fd] = cs
 
-        s_read, _, _ = select.select(res.keys(), [], [], self.qos_timeout)
+        fds_read = poll_ready(res.keys(), POLLIN, self.qos_timeout)
 
         ret_list = []
-        for s in s_read:
-            cs = res[s]
+        for fd in fds_read:
+            cs = res[fd]
             ret_list.append(cs)
             self.active_connections.remove(cs)
 
@@ -23,6 +23,16 @@ class RequestReaderMiddleware(ABC):
     def success(req: RPCRequest) -> ReturnType:
         return req, None
 
+    def validate_head(self, req: RPCRequest) -> Optional[bytes]:
+        """
+        Called when the request line and headers are parsed, before the body is read.
+        :return: None to continue reading the request, error response to reject it early
+        """
+        next_reader = getattr(self, "next_reader", None)
+        if next_reader:
+            return next_reader.validate_head(req)
+        return None
+
     @abstractmethod
     def read_request(self, cs: ClientSocket, req: RPCRequest) -> ReturnType:
         """
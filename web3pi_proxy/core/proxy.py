@@ -1,10 +1,10 @@
 import queue
 import select
 import threading
+import time
 import traceback
-from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
-from typing import Callable
+from typing import Callable, Tuple
 
 from web3pi_proxy.config.conf import Config
 from web3pi_proxy.core.inbound.server import InboundServer
@@ -21,14 +21,19 @@ from web3pi_proxy.core.rpc.node.endpoint_pool.pool_manager import (
 from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpoint_connection_handler import (
     BrokenConnectionError,
     EndpointConnectionHandler,
+    InvalidRequestError,
 )
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import ClientWriteError
 from web3pi_proxy.core.rpc.request.middleware.requestmiddlewaredescr import (
     RequestMiddlewareDescr,
 )
 from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.rpc.response.batchresponse import BatchResponses
 from web3pi_proxy.core.rpc.response.optionsresponse import OptionsResponses
 from web3pi_proxy.core.sockets.clientsocket import ClientSocket
+from web3pi_proxy.core.utilhttp.compression import ResponseCompressor
 from web3pi_proxy.core.utilhttp.errors import ErrorResponses
+from web3pi_proxy.core.utilhttp.headers import ResponseHeaders
 from web3pi_proxy.interfaces.servicestate import StateUpdater
 from web3pi_proxy.utils.logger import get_logger
 
@@ -44,6 +49,7 @@ class Web3RPCProxy:
         middlewares: RequestMiddlewareDescr,
         connection_pool: EndpointConnectionPoolManager,
         state_updater: StateUpdater,
+        reuse_port: bool = False,
     ) -> None:
 
         self.request_reader = middlewares.instantiate()
@@ -51,10 +57,14 @@ class Web3RPCProxy:
         self.__print_pre_init_info(self.request_reader, connection_pool)
 
         self.inbound_srv = InboundServer(
-            proxy_listen_address, proxy_listen_port, Config.BLOCKING_ACCEPT_TIMEOUT
+            proxy_listen_address,
+            proxy_listen_port,
+            Config.BLOCKING_ACCEPT_TIMEOUT,
+            reuse_port=reuse_port,
         )
         self.connection_pool = connection_pool
         self.state_updater = state_updater
+        self.splice_enabled = Config.RESPONSE_SPLICE_ENABLED
 
         self.__print_post_init_info(proxy_listen_address, proxy_listen_port)
 
@@ -89,6 +99,15 @@ class Web3RPCProxy:
             self.__logger.error(error)
             self.__logger.error(f"Error on closing socket {cs}")
 
+    def __shed_client_socket(self, cs: ClientSocket) -> None:
+        """Refuses a new connection when the proxy is over capacity"""
+        self.__logger.warning("Proxy over capacity, refusing a client connection")
+        try:
+            cs.send_all(ErrorResponses.service_unavailable())  # fits in the empty socket buffer, does not block
+        except OSError:
+            pass
+        self.__close_client_socket(cs)
+
     def __close_client_connection(
         self,
         cs: ClientSocket,
@@ -120,105 +139,157 @@ class Web3RPCProxy:
         endpoint_connection_handler: EndpointConnectionHandler,
         cs: ClientSocket,
         req: RPCRequest,
-    ) -> Callable:
-        add_cors = req.cors_origin is not None  # TODO CORS support here is very crude, needs improvement
+    ) -> Tuple[Callable, Callable[[], bool]]:
+        """Returns the response handler and a function telling whether the handler has been called,
+        a call is not retried once a part of its response went to the client"""
+        extra_headers = ResponseHeaders.extra_headers(req)
+        compressor = ResponseCompressor(req.response_encoding) if req.response_encoding is not None else None
+        started = False
 
         def response_handler(res: bytes):
+            nonlocal extra_headers, started
+            started = True
             if cs.socket.fileno() < 0:
                 return
-            nonlocal add_cors
-            if add_cors:
-                add_cors = False
-                res = res.replace(b"\r\n", b"\r\nAccess-Control-Allow-Origin: " + req.cors_origin + b"\r\n", 1)
-            cs.send_all(res)
+            data = compressor.feed_data(res) if compressor is not None else res
+            if data:
+                if extra_headers:
+                    data = bytes(data).replace(b"\r\n", b"\r\n" + extra_headers, 1)
+                    extra_headers = None
+                cs.send_all(data)
             endpoint_connection_handler.update_response_stats(res)  # TODO do we need bytearray here?
             self.state_updater.record_rpc_response(req, res)
 
-        return response_handler
+        return response_handler, lambda: started
 
-    def handle_client(
+    def __create_relayed_handler(
+        self,
+        endpoint_connection_handler: EndpointConnectionHandler,
+        req: RPCRequest,
+    ) -> Callable:
+        """Accounts the response data moved to the client by the kernel"""
+
+        def relayed_handler(res: bytes):
+            endpoint_connection_handler.update_response_stats(res)
+            self.state_updater.record_rpc_response(req, res)
+
+        return relayed_handler
+
+    def __can_relay(
         self,
+        endpoint_connection_handler: EndpointConnectionHandler,
         cs: ClientSocket,
-        client_poller: Poller,
-        active_client_connections: ClientSocketPool,
-    ) -> None:
+        req: RPCRequest,
+    ) -> bool:
+        return (
+            self.splice_enabled
+            and req.response_encoding is None
+            and not cs.is_ssl()
+            and endpoint_connection_handler.can_relay()
+        )
+
+    def __handle_batch(self, req: RPCRequest) -> bytes:
+        """Forwards the calls of a batch request in parallel and returns the response array"""
+        forwarded = [element for element in req.batch if element.response is None]  # the rest was rejected
+        if forwarded:
+            for element in self.connection_pool.forward_batch(forwarded):
+                self.state_updater.record_rpc_request(element)
+                self.state_updater.record_rpc_response(element, element.response)
+        return BatchResponses.batch_response(req, ResponseHeaders.extra_headers(req))
+
+    def handle_request(self, cs: ClientSocket) -> bool:
+        """Handles a single request of the client, returns whether the client connection should be kept alive"""
         endpoint_connection_handler = None
+        # the request objects are reused on the connection, the stream exists after the first request is read
+        request_stream = cs.request_stream
+        req, err = self.request_reader.read_request(
+            cs, request_stream.take_spare_request() if request_stream else RPCRequest()
+        )
         try:
-            req, err = self.request_reader.read_request(cs, RPCRequest())
-
             if req is None and err is None:
-                self.__manage_client_connection(
-                    False, cs, client_poller, active_client_connections
-                )
-                return
+                return False
 
             if err is not None:
                 cs.send_all(err.raw)  # TODO: detect whether client connection is closed
-                self.__manage_client_connection(
-                    err.request.keep_alive, cs, client_poller, active_client_connections
-                )
-                return
+                return err.request.keep_alive
 
             if req.http_method == b"OPTIONS":  # TODO CORS are always included, is that right?
                 cs.send_all(
                     OptionsResponses.options_response(req)
                 )
-                self.__manage_client_connection(
-                    req.keep_alive, cs, client_poller, active_client_connections
-                )
-                return
+                return req.keep_alive
+
+            if req.batch is not None:
+                cs.send_all(self.__handle_batch(req))
+                return req.keep_alive
 
             # if self.is_cache_available:  # TODO cache
             #     self.read_cache()
-            try:
-                endpoint_connection_handler = self.connection_pool.get_connection(req)
-            except Exception as error:
-                self.__logger.error("%s: %s", error.__class__, error)
-                self.__logger.error("Failed to establish endpoint connection")
-                cs.send_all(
-                    ErrorResponses.connection_error(req.id)
-                )  # TODO: detect wether client connection is closed
-                self.__manage_client_connection(
-                    req.keep_alive, cs, client_poller, active_client_connections
-                )
-                return
-
-            try:
-                endpoint_connection_handler.send(req)
-            except (
-                BrokenConnectionError
-            ):  # TODO: Pick up new connection from pool if fresh connection failed
-                self.__logger.error(
-                    f"Failed to send request with {endpoint_connection_handler}"
-                )
-                cs.send_all(
-                    ErrorResponses.connection_error(req.id)
-                )  # TODO: detect wether client connection is closed
-                self.__manage_client_connection(
-                    req.keep_alive, cs, client_poller, active_client_connections
-                )
-                endpoint_connection_handler.close()
-                return
-
-            response_handler = self.__create_response_handler(
-                endpoint_connection_handler, cs, req
-            )
-            try:
-                endpoint_connection_handler.receive(response_handler)
-            except (
-                BrokenConnectionError
-            ):  # TODO: Pick up new connection from pool if fresh connection failed
-                self.__logger.error(
-                    f"Failed to receive response with {endpoint_connection_handler}"
-                )
-                cs.send_all(
-                    ErrorResponses.connection_error(req.id)
-                )  # TODO: detect whether client connection is closed
-                self.__manage_client_connection(
-                    req.keep_alive, cs, client_poller, active_client_connections
+            # a call broken by a connection failure is retried with another connection, of another endpoint if possible
+            deadline = time.monotonic() + Config.RETRY_DEADLINE
+            failed_pool = None
+            attempt = 0
+            while True:
+                try:
+                    endpoint_connection_handler = self.connection_pool.get_connection(req, failed_pool=failed_pool)
+                except Exception as error:
+                    self.__logger.error("%s: %s", error.__class__, error)
+                    self.__logger.error("Failed to establish endpoint connection")
+                    cs.send_all(
+                        ErrorResponses.connection_error(req.id)
+                    )  # TODO: detect wether client connection is closed
+                    return req.keep_alive
+
+                try:
+                    endpoint_connection_handler.send(req)
+                except InvalidRequestError:
+                    endpoint_connection_handler = None  # released by the handler
+                    cs.send_all(ErrorResponses.invalid_request(req.id))
+                    return req.keep_alive
+                except BrokenConnectionError:
+                    self.__logger.error(
+                        f"Failed to send request with {endpoint_connection_handler}"
+                    )
+                    endpoint_connection_handler.close()
+                    if self.connection_pool.may_retry(req, attempt, deadline):
+                        failed_pool = endpoint_connection_handler.connection_pool
+                        endpoint_connection_handler = None
+                        attempt += 1
+                        continue
+                    cs.send_all(
+                        ErrorResponses.connection_error(req.id)
+                    )  # TODO: detect wether client connection is closed
+                    return req.keep_alive
+
+                response_handler, response_started = self.__create_response_handler(
+                    endpoint_connection_handler, cs, req
                 )
-                endpoint_connection_handler.close()
-                return
+                try:
+                    if self.__can_relay(endpoint_connection_handler, cs, req):
+                        endpoint_connection_handler.relay(
+                            response_handler, cs, self.__create_relayed_handler(endpoint_connection_handler, req)
+                        )
+                    else:
+                        endpoint_connection_handler.receive(response_handler)
+                except ClientWriteError:
+                    self.__logger.warning("Client connection broke while sending the response")
+                    endpoint_connection_handler = None  # discarded by the handler
+                    return False
+                except BrokenConnectionError:
+                    self.__logger.error(
+                        f"Failed to receive response with {endpoint_connection_handler}"
+                    )
+                    endpoint_connection_handler.close()
+                    if not response_started() and self.connection_pool.may_retry(req, attempt, deadline):
+                        failed_pool = endpoint_connection_handler.connection_pool
+                        endpoint_connection_handler = None
+                        attempt += 1
+                        continue
+                    cs.send_all(
+                        ErrorResponses.connection_error(req.id)
+                    )  # TODO: detect whether client connection is closed
+                    return req.keep_alive
+                break
 
             # if self.is_cache_available and \  # TODO cache
             #         self.response_cache.is_writeable(response.request) and \
@@ -226,11 +297,35 @@ class Web3RPCProxy:
             #     self.response_cache.store(response.request.method, response)
             endpoint_connection_handler.update_request_stats(req)
             self.state_updater.record_rpc_request(req)
-            self.__manage_client_connection(
-                req.keep_alive, cs, client_poller, active_client_connections
-            )
             endpoint_connection_handler.release()
+            return req.keep_alive
+
+        except Exception:
+            if endpoint_connection_handler:
+                endpoint_connection_handler.release()
+            raise
+        finally:
+            if cs.request_stream is not None and (req is not None or err is not None):
+                cs.request_stream.recycle(req if req is not None else err.request)
 
+    @staticmethod
+    def __has_pipelined_request(cs: ClientSocket) -> bool:
+        return cs.request_stream is not None and cs.request_stream.has_completed()
+
+    def handle_client(
+        self,
+        cs: ClientSocket,
+        client_poller: Poller,
+        active_client_connections: ClientSocketPool,
+    ) -> None:
+        try:
+            keep_alive = self.handle_request(cs)
+            # requests already read from the socket are not signalled by the poller, they are served in order here
+            while keep_alive and self.__has_pipelined_request(cs):
+                keep_alive = self.handle_request(cs)
+            self.__manage_client_connection(
+                keep_alive, cs, client_poller, active_client_connections
+            )
         except Exception as e:
             traceback.print_exc()
             self.__logger.error(e)
@@ -238,8 +333,6 @@ class Web3RPCProxy:
                 f"Error while handling the client request {e}"
             )  # TODO is this a good error handling?
             self.__close_client_connection(cs, client_poller, active_client_connections)
-            if endpoint_connection_handler:
-                endpoint_connection_handler.release()
 
     @classmethod
     def __print_post_init_info(cls, proxy_listen_address, proxy_listen_port: int) -> None:
@@ -261,10 +354,7 @@ class Web3RPCProxy:
         client_poller.register(
             srv_socket.socket, POLLIN
         )  # TODO EPOLLHUP? EPOLLERR? EPOLLRDHUP?
-        # TODO Implement Keep-Alive http header
-        active_client_connections = ClientSocketPool()  # TODO close stale connections
-
-        fd_lock = defaultdict(threading.Lock)
+        active_client_connections = ClientSocketPool()
 
         queue_cs_for_close = queue.Queue()
         t = threading.Thread(
@@ -282,27 +372,28 @@ class Web3RPCProxy:
                     queue_cs_for_close.put(cs)
                     pending_cs_size = pending_cs_size - 1
 
+                for cs in active_client_connections.pop_cs_expired():
+                    queue_cs_for_close.put(cs)
+
                 events = client_poller.poll(Config.BLOCKING_ACCEPT_TIMEOUT)
                 for fd, ev in events:
                     if fd == srv_socket.socket.fileno():
-                        cs = srv_socket.accept_awaiting_connection()  # TODO connection hang up? errors?
-                        active_client_connections.add_cs_pending(cs)
-                        try:
-                            client_poller.register(
-                                cs.socket, POLLIN | select.EPOLLONESHOT
-                            )  # TODO hangup? errors?
-                        except AttributeError:
-                            client_poller.register(cs.socket, POLLIN)
-                    else:
-                        with fd_lock[fd]:
+                        # drain the backlog in bounded batches, so a connection storm does not starve the clients
+                        for cs in srv_socket.accept_awaiting_connections(Config.ACCEPT_BATCH_SIZE):
+                            if active_client_connections.get_in_use_size() >= Config.MAX_IN_USE_CLIENT_SOCKETS:
+                                self.__shed_client_socket(cs)
+                                continue
+                            active_client_connections.add_cs_pending(cs)
                             try:
-                                if active_client_connections.is_in_use(fd):
-                                    break
-                            except KeyError:
-                                break
-                            cs = active_client_connections.get_cs_and_set_in_use(
-                                fd
-                            )
+                                client_poller.register(
+                                    cs.socket, POLLIN | select.EPOLLONESHOT
+                                )  # TODO hangup? errors?
+                            except AttributeError:
+                                client_poller.register(cs.socket, POLLIN)
+                    else:
+                        cs = active_client_connections.try_acquire(fd)
+                        if cs is None:  # already in use or closed in the meantime, e.g. expired
+                            continue
                         # TODO connection hang up?
                         executor.submit(
                             self.handle_client,
@@ -1,16 +1,35 @@
 from abc import ABC
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
-from web3pi_proxy.core.rpc.cache.cacheservice import ExpirableCacheService
+from web3pi_proxy.core.rpc.cache.cacheservice import ExpirableCacheRecord, ExpirableCacheService
 from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.utilhttp.compression import compress
+
+
+@dataclass
+class ResponseCacheRecord(ExpirableCacheRecord):
+    # compressed forms of the value by content coding, each is compressed once for all the hits
+    compressed: Dict[bytes, bytes] = field(default_factory=dict)
 
 
 class ResponseCacheService(ExpirableCacheService, ABC):
     def __init__(self, expiry_milis: int) -> None:
-        super().__init__(expiry_milis)
+        super().__init__(expiry_milis, ResponseCacheRecord)
 
     def is_writeable(self, request: RPCRequest) -> bool:
         pass
 
+    def get_compressed(self, key: str, encoding: bytes) -> Optional[bytes]:
+        """Returns the cached response body compressed with the content coding"""
+        value = self.get(key)
+        if value is None:
+            return None
+        compressed = self._cache.get(key).compressed
+        if encoding not in compressed:
+            compressed[encoding] = compress(value, encoding)
+        return compressed[encoding]
+
 
 class StaticRequestResponseCacheService(ResponseCacheService):
     _WRITEABLE_METHODS = [
@@ -1,115 +1,194 @@
+import time
+from array import array
 from threading import Lock
+from typing import Iterator, List, Optional
 
+from web3pi_proxy.config.conf import Config
+from web3pi_proxy.core.rpc.node.timer_wheel import TimerWheel
 from web3pi_proxy.core.sockets.clientsocket import ClientSocket
 
+FREE = 0
+PENDING = 1
+IN_USE = 2
 
-class ClientSocketPoolEntry:
-    def __init__(self, cs: ClientSocket):
-        self.cs = cs
-        self.prev = None
-        self.next = None
-        self.in_use = False
+NIL = -1
 
 
 class ClientSocketPool:
     """
     Lightweight pool.
     Does not open or close client sockets, only bookkeeping.
-    The pool has the structure of dict: file descriptor -> client socket (ClientSocketPoolEntry).
-    Client sockets statuses are in_use or pending (in_use == False).
+    The pool is a table indexed by file descriptor, kept in preallocated arrays (grown on demand), so client socket
+    churn does not allocate per-socket objects: client socket, state (free, pending or in_use), generation
+    (incremented every time the fd is added) and last activity time.
     Pending client sockets are additionally kept in linked list ordered by last usage starting from recent:
-    head, tail and size are the attributes for the linked list.
-    Thread-safe.
+    prev and next arrays hold the links, head, tail and size are the attributes for the linked list.
+    Pending client sockets idle longer than idle_timeout are expired by the timer wheel, see pop_cs_expired.
+    The timers are keyed by fd and generation, a timer left from a closed client socket never expires a new client
+    socket reusing its fd.
+    The number of in_use client sockets is tracked as well (in_use_size).
+    Thread-safe, a single lock is held only for the table updates.
     But a caller must ensure conditions for each call.
     """
 
-    def __init__(self):
-        self.all_client_connections = {}
-        self.head = None
-        self.tail = None
+    def __init__(
+        self,
+        idle_timeout: float = Config.CLIENT_IDLE_TIMEOUT,
+        initial_capacity: int = 1024,
+    ):
+        self.capacity = 0
+        self.sockets: List[Optional[ClientSocket]] = []
+        self.state = bytearray()
+        self.generation = array("L")
+        self.last_activity = array("d")
+        self.prev = array("l")
+        self.next = array("l")
+        self.__grow(initial_capacity)
+
+        self.head = NIL
+        self.tail = NIL
         self.size = 0
+        self.in_use_size = 0
         self.lock = Lock()
+        self.idle_timeout = idle_timeout
+        self.idle_timers = TimerWheel(idle_timeout) if idle_timeout > 0 else None
+
+    def __grow(self, min_capacity: int) -> None:
+        new_capacity = max(min_capacity, 2 * self.capacity)
+        extension = new_capacity - self.capacity
+        self.sockets.extend([None] * extension)
+        self.state.extend(bytes(extension))
+        self.generation.extend([0] * extension)
+        self.last_activity.extend([0.0] * extension)
+        self.prev.extend([NIL] * extension)
+        self.next.extend([NIL] * extension)
+        self.capacity = new_capacity
+
+    def __schedule_idle_timer(self, fd: int) -> None:
+        now = time.monotonic()
+        self.last_activity[fd] = now
+        if self.idle_timers is not None:
+            self.idle_timers.schedule((fd, self.generation[fd]), now + self.idle_timeout)
+
+    def __cancel_idle_timer(self, fd: int) -> None:
+        if self.idle_timers is not None:
+            self.idle_timers.cancel((fd, self.generation[fd]))
+
+    def __link_pending(self, fd: int) -> None:
+        self.state[fd] = PENDING
+        self.prev[fd] = NIL
+        self.next[fd] = self.head
+        if self.head == NIL:  # and self.tail == NIL
+            self.tail = fd
+        else:
+            self.prev[self.head] = fd
+        self.head = fd
+        self.size = self.size + 1
+        self.__schedule_idle_timer(fd)
+
+    def __unlink_pending(self, fd: int) -> None:
+        prev_fd = self.prev[fd]
+        next_fd = self.next[fd]
+        if prev_fd == NIL:
+            self.head = next_fd
+        else:
+            self.next[prev_fd] = next_fd
+        if next_fd == NIL:
+            self.tail = prev_fd
+        else:
+            self.prev[next_fd] = prev_fd
+        self.prev[fd] = NIL
+        self.next[fd] = NIL
+        self.size = self.size - 1
+        self.__cancel_idle_timer(fd)
+
+    def __free(self, fd: int) -> ClientSocket:
+        cs = self.sockets[fd]
+        self.sockets[fd] = None
+        self.state[fd] = FREE
+        return cs
 
     def add_cs_pending(self, cs: ClientSocket):
         """Adds a new client socket to the pool, in pending status"""
-        # assert all_client_connections.get(cs.socket.fileno()) is None
+        # assert self.state[cs.fd] == FREE
         with self.lock:
-            entry = ClientSocketPoolEntry(cs)
-            self.all_client_connections[cs.fd] = entry
-            if self.head is None:  # and self.tail is None
-                self.tail = entry
-            else:
-                self.head.prev = entry
-            self.head = entry
-            self.size = self.size + 1
+            fd = cs.fd
+            if fd >= self.capacity:
+                self.__grow(fd + 1)
+            self.sockets[fd] = cs
+            self.generation[fd] = self.generation[fd] + 1
+            self.__link_pending(fd)
 
     def is_in_use(self, fd: int) -> bool:
+        return fd < self.capacity and self.state[fd] == IN_USE
+
+    def get_generation(self, fd: int) -> int:
+        """Returns the number of times the fd was added, it tells apart client sockets reusing the same fd"""
+        return self.generation[fd] if fd < self.capacity else 0
+
+    def try_acquire(self, fd: int) -> Optional[ClientSocket]:
+        """Changes the status of a pending client socket to in_use and returns it, returns None if not pending"""
         with self.lock:
-            return self.all_client_connections[fd].in_use
+            if fd >= self.capacity or self.state[fd] != PENDING:
+                return None
+            self.state[fd] = IN_USE
+            self.in_use_size = self.in_use_size + 1
+            self.__unlink_pending(fd)
+            return self.sockets[fd]
 
     def get_cs_and_set_in_use(self, fd: int) -> ClientSocket:
         """Searches for a client socket, it must be in pending status, is changed to in_use status and returned"""
-        # assert all_client_connections.get(fd) is not None
-        # assert all_client_connections[fd].in_use == False
-        with self.lock:
-            entry: ClientSocketPoolEntry = self.all_client_connections[fd]
-            entry.in_use = True
-            if entry.prev is None and entry.next is None:
-                self.head = None
-                self.tail = None
-            elif entry.prev is None:  # and entry.next is not None
-                self.head = entry.next
-                self.head.prev = None
-            elif entry.next is None:  # and entry.prev is not None
-                self.tail = entry.prev
-                self.tail.next = None
-            else:
-                entry.prev.next = entry.next
-                entry.next.prev = entry.prev
-            self.size = self.size - 1
-            return entry.cs
+        cs = self.try_acquire(fd)
+        if cs is None:
+            raise KeyError(fd)
+        return cs
 
     def set_cs_pending(self, fd: int):
         """Changes the status of a client socket to pending - it must be in_use beforehand"""
-        # assert all_client_connections.get(fd) is not None
-        # assert all_client_connections[fd].in_use == True
+        # assert self.state[fd] == IN_USE
         with self.lock:
-            entry: ClientSocketPoolEntry = self.all_client_connections[fd]
-            entry.in_use = False
-            entry.prev = None
-            if self.head is None:  # and self.tail is None
-                self.tail = entry
-            else:
-                self.head.prev = entry
-            self.head = entry
-            self.size = self.size + 1
+            self.in_use_size = self.in_use_size - 1
+            self.__link_pending(fd)
 
     def del_cs_in_use(self, fd: int):
         """Removes a client socket from the pool - it must be in_use beforehand"""
-        # assert all_client_connections.get(fd) is not None
-        # assert all_client_connections[fd].in_use == True
+        # assert self.state[fd] == IN_USE
         with self.lock:
-            del self.all_client_connections[fd]
+            self.in_use_size = self.in_use_size - 1
+            self.__free(fd)
 
     def pop_cs_pending_from_tail(self) -> ClientSocket:
         with self.lock:
-            tail_entry = self.tail
-            self.tail = tail_entry.prev
-            self.size = self.size - 1
-            del self.all_client_connections[tail_entry.cs.fd]
-            return tail_entry.cs
+            fd = self.tail
+            self.__unlink_pending(fd)
+            return self.__free(fd)
+
+    def pop_cs_expired(self, now: float = None) -> List[ClientSocket]:
+        """Removes pending client sockets idle longer than idle_timeout from the pool and returns them"""
+        if self.idle_timers is None:
+            return []
+        with self.lock:
+            expired = []
+            for fd, generation in self.idle_timers.advance(time.monotonic() if now is None else now):
+                if generation != self.get_generation(fd) or self.state[fd] != PENDING:
+                    continue  # the timer of a client socket already removed, the fd may be reused
+                self.__unlink_pending(fd)
+                expired.append(self.__free(fd))
+            return expired
 
     def get_size(self) -> int:
         """Returns the size of the list of pending cs"""
         return self.size
 
-    def iterate_cs_pending(self):
+    def get_in_use_size(self) -> int:
+        """Returns the number of in_use cs"""
+        return self.in_use_size
+
+    def iterate_cs_pending(self) -> Iterator[ClientSocket]:
         """Iterates the linked list of pending cs, from the tail to the head - from the last used to recently"""
         with self.lock:
-            next_entry = self.tail
-            while next_entry:
-                entry = next_entry
-                next_entry = (
-                    entry.prev
-                )  # entry.prev may be changed at yield, so there is the helper var next_entry
-                yield entry
+            next_fd = self.tail
+            while next_fd != NIL:
+                fd = next_fd
+                next_fd = self.prev[fd]  # the links of fd may be changed at yield, so there is the helper var next_fd
+                yield self.sockets[fd]
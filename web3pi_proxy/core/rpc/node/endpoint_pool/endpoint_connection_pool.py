@@ -2,14 +2,19 @@ from __future__ import annotations
 
 import enum
 import time
-from typing import Set
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Optional, Set, Tuple
 from queue import SimpleQueue
-from threading import Lock, RLock, Thread
+from threading import Event, Lock, RLock, Thread
 
 from web3pi_proxy.config.conf import Config
 from web3pi_proxy.core.rpc.node.endpoint_pool.connection_pool import (
     ConnectionPool,
 )
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connectiondescr import (
+    EndpointConnectionDescriptor,
+)
 from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpoint_connection_handler import (
     EndpointConnectionHandler,
 )
@@ -18,9 +23,14 @@ from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpointconnection import
 )
 from web3pi_proxy.core.rpc.node.rpcendpoint.endpointimpl import RPCEndpoint
 from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.sockets.basesocket import BaseSocket
 from web3pi_proxy.utils.logger import get_logger
 
 
+class ConnectTimeoutError(Exception):
+    message = "No endpoint connection available in time"
+
+
 # TODO: Remove old timestamps, if time-based checks are still applied
 class PoolStats:
     def __init__(self) -> None:
@@ -90,14 +100,38 @@ class PoolStats:
         return error_count / all_connections if all_connections > 0 else 0.0
 
 
+class ConnectionWaiter:
+    """A get call waiting for a connection, served by a returned connection or by a new one, whichever comes first"""
+
+    __slots__ = ("ready", "connection", "is_new", "error")
+
+    def __init__(self) -> None:
+        self.ready = Event()
+        self.connection: Optional[EndpointConnection] = None
+        self.is_new = False
+        self.error: Optional[Exception] = None
+
+    def serve(self, connection: Optional[EndpointConnection], is_new: bool, error: Optional[Exception] = None) -> None:
+        self.connection = connection
+        self.is_new = is_new
+        self.error = error
+        self.ready.set()
+
+
 class EndpointConnectionPool(ConnectionPool):
-    MAX_CONNECTIONS = Config.NUM_PROXY_WORKERS
+    MAX_CONNECTIONS = Config.MAX_IDLE_CONNECTIONS
+    MIN_CONNECTIONS = Config.MIN_IDLE_CONNECTIONS
+    # delay of filling the pool again after a failed connection attempt, seconds
+    FILL_RETRY_DELAY = 5.0
+    # a get call waiting for a new connection gives up when connecting, with the TLS handshake, is bound to fail, seconds
+    CONNECT_WAIT_TIMEOUT = BaseSocket.CONNECT_DEADLINE
 
     def __init__(
         self,
         endpoint: RPCEndpoint,
     ):
         self.endpoint = endpoint
+        self.min_idle, self.max_idle = self.idle_limits(endpoint.conn_descr)
         self.connections: SimpleQueue[EndpointConnection] = SimpleQueue()
         self.busy_connections: Set[EndpointConnection] = set()
         self.stats = PoolStats()
@@ -105,6 +139,9 @@ class EndpointConnectionPool(ConnectionPool):
         self.__lock = Lock()
         self.__logger = get_logger(f"EndpointConnectionPool.{id(self)}")
         self.connection_close_queue: SimpleQueue[EndpointConnection | None] = SimpleQueue()
+        self.waiters: Deque[ConnectionWaiter] = deque()
+        # the connections for the waiters are opened by at most MAX_CONNECTIONS threads, started on demand
+        self.connector = ThreadPoolExecutor(max(1, self.MAX_CONNECTIONS), thread_name_prefix="connect")
 
         self.closing_thread = Thread(
             target=self.__run_closing_thread,
@@ -118,9 +155,25 @@ class EndpointConnectionPool(ConnectionPool):
         )
         self.cleanup_thread.start()
 
+        # opens connections in the background to keep min_idle idle connections, requested when they are taken
+        self.fill_requested = Event()
+        if self.min_idle > 0:
+            self.filling_thread = Thread(
+                target=self.__run_filling_thread,
+                daemon=True,
+            )
+            self.filling_thread.start()
+            self.fill_requested.set()
+
     def __str__(self):
         return f"{self.__class__.__name__}({self.endpoint})"
 
+    def idle_limits(self, conn_descr: EndpointConnectionDescriptor) -> Tuple[int, int]:
+        """The min and max numbers of idle connections kept by the pool"""
+        max_idle = self.MAX_CONNECTIONS if conn_descr.max_idle is None else conn_descr.max_idle
+        min_idle = self.MIN_CONNECTIONS if conn_descr.min_idle is None else conn_descr.min_idle
+        return min(min_idle, max_idle), max_idle
+
     class PoolStatus(str, enum.Enum):
         ACTIVE = "ACTIVE"
         DISABLED = "DISABLED"
@@ -144,7 +197,7 @@ class EndpointConnectionPool(ConnectionPool):
                 if self.status == self.PoolStatus.CLOSED or self.status == self.PoolStatus.CLOSING:
                     break
                 if self.status == self.PoolStatus.ACTIVE:
-                    excessive_connections = self.connections.qsize() - self.MAX_CONNECTIONS
+                    excessive_connections = self.connections.qsize() - self.max_idle
                     if excessive_connections > 0:
                         for _ in range(excessive_connections):
                             connection = self.__get_connection()  # no need to catch an error, guarded with the lock
@@ -163,8 +216,71 @@ class EndpointConnectionPool(ConnectionPool):
                 self.__logger.debug(f"Scheduled {excessive_connections} excessive connections for removal.")
             if obsolete_connections > 0:
                 self.__logger.debug(f"Scheduled {obsolete_connections} obsolete connections for removal.")
+                self.fill_requested.set()
             time.sleep(Config.IDLE_CONNECTION_TIMEOUT)
 
+    def __run_filling_thread(self) -> None:
+        retry = False
+        while True:
+            self.fill_requested.wait(self.FILL_RETRY_DELAY if retry else None)
+            self.fill_requested.clear()
+            retry = False
+            while True:
+                with self.__lock:
+                    if self.status == self.PoolStatus.CLOSED or self.status == self.PoolStatus.CLOSING:
+                        return
+                    if not self.is_active() or self.connections.qsize() >= self.min_idle:
+                        break
+                try:
+                    connection = EndpointConnection(self.endpoint)
+                except Exception as error:
+                    self.stats.register_error_on_connection_creation()
+                    self.__logger.warning(f"Failed to open an idle connection: {error}")
+                    retry = True
+                    break
+                with self.__lock:
+                    if self.__offer(connection, False):
+                        continue
+                self.connection_close_queue.put(connection)
+                break
+
+    def __offer(self, connection: EndpointConnection, is_new: bool) -> bool:
+        """Hands the connection over to the longest waiting get call, or keeps it idle.
+        Returns False if the connection is not needed. Must be called with the lock held."""
+        if self.waiters:
+            self.waiters.popleft().serve(connection, is_new)
+            return True
+        if self.is_active() and self.connections.qsize() < self.max_idle:
+            connection.last_use_timestamp = time.time_ns()
+            self.connections.put(connection)
+            return True
+        return False
+
+    def __connect_for(self, waiter: ConnectionWaiter) -> None:
+        """Opens a connection for the waiter, if a returned connection is faster the new one serves another waiter
+        or it is parked in the pool"""
+        if waiter.ready.is_set():  # served by a returned connection or timed out while queued
+            return
+        try:
+            connection = EndpointConnection(self.endpoint)
+        except Exception as error:
+            self.stats.register_error_on_connection_creation()
+            with self.__lock:
+                if waiter.ready.is_set():
+                    return
+                self.waiters.remove(waiter)
+            waiter.serve(None, True, error)
+            return
+
+        with self.__lock:
+            if not waiter.ready.is_set():
+                self.waiters.remove(waiter)
+                waiter.serve(connection, True)
+                return
+            if self.__offer(connection, True):
+                return
+        self.connection_close_queue.put(connection)
+
     def __get_connection(self) -> EndpointConnection:
         return self.connections.get_nowait()
 
@@ -172,30 +288,57 @@ class EndpointConnectionPool(ConnectionPool):
         self.status = status
         self.__logger.debug("Changed %s status to %s", str(self), status)
 
-    def get(self, out_of_sync: bool = False) -> EndpointConnectionHandler:
-        self.__lock.acquire()
-        if not out_of_sync and not self.is_active():
-            self.__lock.release()
-            raise Exception("the pool is disabled")  # TODO better exception
-        if out_of_sync and not self.is_out_of_sync() and not self.is_active():
-            self.__lock.release()
-            raise Exception("the pool is disabled")  # TODO better exception
-        if self.connections.empty():
-            self.__lock.release()
-            self.__logger.debug("No existing connections available, establishing new connection")
-            try:
-                connection = EndpointConnection(self.endpoint)
-            except Exception as error:
-                self.stats.register_error_on_connection_creation()
-                raise error
-
-            is_new = True
-        else:
+    def get(self, out_of_sync: bool = False, establish: bool = True) -> EndpointConnectionHandler | None:
+        """Returns a handler for an idle connection, or for a freshly established one if there are no idle connections.
+        A new connection is opened in the background, a connection returned to the pool meanwhile is used if it comes
+        first. With establish set to False, None is returned instead of connecting (connecting is a blocking operation)."""
+        connection = None
+        while True:  # the idle connections closed by the endpoint are discarded until a live one is found
+            self.__lock.acquire()
+            if not out_of_sync and not self.is_active():
+                self.__lock.release()
+                raise Exception("the pool is disabled")  # TODO better exception
+            if out_of_sync and not self.is_out_of_sync() and not self.is_active():
+                self.__lock.release()
+                raise Exception("the pool is disabled")  # TODO better exception
+            if self.connections.empty():
+                break  # with the lock held
             try:
                 connection = self.__get_connection()
-                is_new = False
+                if self.connections.qsize() < self.min_idle:
+                    self.fill_requested.set()
             finally:
                 self.__lock.release()
+            if connection.is_alive():
+                break
+            # closed while idle, it is not an error of the endpoint
+            self.__logger.debug(f"Discarding stale connection {connection}")
+            self.endpoint.get_connection_stats().update_stale_connection()
+            self.connection_close_queue.put(connection)
+            connection = None
+        if connection is not None:
+            is_new = False
+        else:
+            if not establish:
+                self.__lock.release()
+                return None
+            waiter = ConnectionWaiter()
+            self.waiters.append(waiter)
+            self.__lock.release()
+            self.__logger.debug("No existing connections available, establishing new connection")
+            if self.min_idle > 0:
+                self.fill_requested.set()
+            self.connector.submit(self.__connect_for, waiter)
+            if not waiter.ready.wait(self.CONNECT_WAIT_TIMEOUT):
+                with self.__lock:
+                    if not waiter.ready.is_set():
+                        self.waiters.remove(waiter)
+                        waiter.serve(None, True, ConnectTimeoutError())
+            if waiter.error is not None:
+                raise waiter.error
+            connection = waiter.connection
+            is_new = waiter.is_new
+        self.endpoint.get_connection_stats().update_pool_access(not is_new)
 
         self.__logger.debug(f"Return connection {connection}")
         with self.__lock:
@@ -208,8 +351,9 @@ class EndpointConnectionPool(ConnectionPool):
             self.busy_connections.remove(connection)
             if self.is_active():
                 self.stats.register_successful_connection()
-                self.connections.put(connection)
-                connection.last_use_timestamp = time.time_ns()
+                # the connection is closed if the endpoint responded with Connection: close
+                if not connection.is_kept_alive() or not self.__offer(connection, False):
+                    self.connection_close_queue.put(connection)
             else:
                 self.connection_close_queue.put(connection)
                 if self.status == self.PoolStatus.CLOSING:  # cant be CLOSED
@@ -249,6 +393,7 @@ class EndpointConnectionPool(ConnectionPool):
             if self.status == self.PoolStatus.CLOSED or self.status == self.PoolStatus.CLOSING:
                 raise Exception("Tried to activate after close")  # TODO better exception
             self.__update_status(self.PoolStatus.ACTIVE)
+        self.fill_requested.set()  # the idle connections were closed when the pool was suspended
         self.__logger.info("Pool has been activated")
 
     def test_conn(self) -> bool:
@@ -301,6 +446,17 @@ class EndpointConnectionPool(ConnectionPool):
             self.stats.register_error_on_connection()
         self.connection_close_queue.put(connection)
 
+    def discard(self, connection: EndpointConnection) -> None:
+        """Closes a connection given up for a reason other than the endpoint, e.g. the client is gone in the middle
+        of the response. It is not counted as an error of the endpoint."""
+        with self.__lock:
+            self.busy_connections.remove(connection)
+            self.connection_close_queue.put(connection)
+            if self.status == self.PoolStatus.CLOSING and len(self.busy_connections) == 0:
+                self.connection_close_queue.put(None)  # sentinel
+                self.__update_status(self.PoolStatus.CLOSED)
+                self.__logger.info("Pool has been closed")
+
     def close(self) -> None:
         with self.__lock:
             self.__update_status(self.PoolStatus.CLOSING)
@@ -312,4 +468,6 @@ class EndpointConnectionPool(ConnectionPool):
                 self.__logger.info("Pool has been closed")
             else:
                 self.__logger.info("Pool is closing")
+        self.fill_requested.set()  # stops the filling thread
+        self.connector.shutdown(wait=False)
 
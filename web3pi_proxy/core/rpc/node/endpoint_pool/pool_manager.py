@@ -1,25 +1,44 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from threading import RLock, Thread
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from httptools import HttpResponseParser
 
+from web3pi_proxy.config.conf import Config
+
 from web3pi_proxy.core.rpc.node.endpoint_pool.endpoint_connection_pool import (
+    ConnectTimeoutError,
     EndpointConnectionPool,
 )
+from web3pi_proxy.core.rpc.node.endpoint_pool.websocket_connection_pool import (
+    WebSocketConnectionPool,
+)
 from web3pi_proxy.core.rpc.node.endpoint_pool.load_balancers import (
     LoadBalancer,
 )
+from web3pi_proxy.core.rpc.node.endpoint_pool.retry import (
+    RETRYABLE_METHODS,
+    RetryBudget,
+)
 from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connectiondescr import (
     EndpointConnectionDescriptor,
 )
 from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpoint_connection_handler import (
+    BrokenConnectionError,
     EndpointConnectionHandler,
+    InvalidRequestError,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import (
+    ResponseBodyCollector,
 )
 from web3pi_proxy.core.rpc.node.rpcendpoint.endpointimpl import RPCEndpoint
 from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.sockets.basesocket import BaseSocket
+from web3pi_proxy.core.utilhttp.errors import ErrorResponses
 from web3pi_proxy.utils.logger import get_logger
 
 
@@ -204,12 +223,17 @@ class EndpointConnectionPoolManager:
         self,
         descriptors: List[Tuple[str, EndpointConnectionDescriptor]],
         load_balancer: LoadBalancer,
+        sync_control: bool = True,
     ):
         self.load_balancer = load_balancer
         self.damage_controller = DamageController()
         self.sync_controller = SyncController()
         self.pools: dict[str, EndpointConnectionPool] = {}
         self.__lock = RLock()
+        # calls of batch requests are forwarded in parallel, the threads are started on demand
+        self.batch_executor = ThreadPoolExecutor(Config.NUM_BATCH_WORKERS, thread_name_prefix="batch")
+        self.max_retries = Config.RETRY_MAX_ATTEMPTS
+        self.retry_budget = RetryBudget(Config.RETRY_BUDGET_RATE, Config.RETRY_BUDGET_BURST)
 
         for index in range(len(descriptors)):
             name, conn_descr = descriptors[index]
@@ -226,7 +250,8 @@ class EndpointConnectionPoolManager:
             target=self.__sync_control,
             daemon=True,
         )
-        self.sync_controller_thread.start()
+        if sync_control:
+            self.sync_controller_thread.start()
 
     @property
     def endpoints(self) -> List[RPCEndpoint]:
@@ -266,7 +291,12 @@ class EndpointConnectionPoolManager:
                 f"Creating endpoint {name} with connection {conn_descr}"
             )
             endpoint = RPCEndpoint.create(name, conn_descr)
-            connection_pool = EndpointConnectionPool(endpoint)
+            if conn_descr.unix_path is None:
+                BaseSocket.RESOLVER.prefetch(conn_descr.host)
+            if conn_descr.is_websocket:
+                connection_pool = WebSocketConnectionPool(endpoint)
+            else:
+                connection_pool = EndpointConnectionPool(endpoint)
             self.pools[name] = connection_pool
             return endpoint
 
@@ -284,19 +314,159 @@ class EndpointConnectionPoolManager:
         with self.__lock:
             return self.pools.get(name)
 
-    def get_connection(self, req: RPCRequest) -> EndpointConnectionHandler:
-        self.__logger.debug("Selecting endpoint")
+    def __pick_pool(self, req: RPCRequest, failed_pool: Optional[EndpointConnectionPool]) -> EndpointConnectionPool:
         with self.__lock:
             active_pools = self.__get_active_pools()
             if not active_pools:
                 raise NoActivePoolsError()
-            pool = self.load_balancer.pick_pool(req, active_pools)
+            pool = None
+            if failed_pool is not None:
+                other_pools = [active_pool for active_pool in active_pools if active_pool is not failed_pool]
+                if other_pools:
+                    pool = self.load_balancer.pick_pool(req, other_pools)
+            if pool is None:
+                pool = self.load_balancer.pick_pool(req, active_pools)
             if pool is None:
                 raise NoPoolPickedError()
+        return pool
+
+    def get_connection(
+        self, req: RPCRequest, establish: bool = True, failed_pool: Optional[EndpointConnectionPool] = None
+    ) -> EndpointConnectionHandler | None:
+        """Returns a connection of the endpoint picked by the load balancer. A retry of a call failed with failed_pool
+        is sent to another endpoint if the load balancer picks one of the others. If no connection of the picked
+        endpoint is available in time, another endpoint is tried once."""
+        self.__logger.debug("Selecting endpoint")
+        pool = self.__pick_pool(req, failed_pool)
         self.__logger.debug(f"Selected endpoint{pool.endpoint}")
-        return pool.get()
+        try:
+            endpoint_connection_handler = pool.get(establish=establish)
+        except ConnectTimeoutError:
+            other_pool = self.__pick_pool(req, pool)
+            if other_pool is pool:
+                raise
+            self.__logger.warning(f"No connection of endpoint {pool.endpoint} in time, trying {other_pool.endpoint}")
+            pool = other_pool
+            endpoint_connection_handler = pool.get(establish=establish)
+        if failed_pool is not None and endpoint_connection_handler is not None:
+            pool.endpoint.get_connection_stats().update_retry(pool is not failed_pool)
+        return endpoint_connection_handler
+
+    def may_retry(self, req: RPCRequest, attempt: int, deadline: float) -> bool:
+        """Whether a call broken by an endpoint connection failure is sent again, attempt is the number of the retries
+        so far, deadline is the time.monotonic() time of the last retry. A retry takes a token of the retry budget."""
+        return (
+            attempt < self.max_retries
+            and req.method in RETRYABLE_METHODS
+            and time.monotonic() < deadline
+            and self.retry_budget.try_acquire()
+        )
+
+    def forward(self, req: RPCRequest) -> bytes:
+        """Sends the request to an endpoint, waits for the response and returns its body.
+        The call is retried if the connection breaks and may_retry allows it."""
+        deadline = time.monotonic() + Config.RETRY_DEADLINE
+        failed_pool = None
+        attempt = 0
+        while True:
+            endpoint_connection_handler = self.get_connection(req, failed_pool=failed_pool)
+            response = ResponseBodyCollector()
+
+            def response_handler(res: bytes):
+                response.feed_data(res)
+                endpoint_connection_handler.update_response_stats(res)
+
+            try:
+                endpoint_connection_handler.send(req)
+                endpoint_connection_handler.receive(response_handler)
+                endpoint_connection_handler.update_request_stats(req)
+            except BrokenConnectionError:
+                endpoint_connection_handler.close()
+                if not self.may_retry(req, attempt, deadline):
+                    raise
+                failed_pool = endpoint_connection_handler.connection_pool
+                attempt += 1
+                continue
+            finally:
+                endpoint_connection_handler.release()
+
+            return response.get_body()
+
+    async def forward_async(self, req: RPCRequest) -> bytes:
+        """Non-blocking counterpart of forward, intended for the asyncio proxy engine"""
+        deadline = time.monotonic() + Config.RETRY_DEADLINE
+        failed_pool = None
+        attempt = 0
+        while True:
+            endpoint_connection_handler = self.get_connection(req, establish=False, failed_pool=failed_pool)
+            if endpoint_connection_handler is None:
+                endpoint_connection_handler = await asyncio.get_running_loop().run_in_executor(
+                    None, self.get_connection, req, True, failed_pool
+                )
+            response = ResponseBodyCollector()
+
+            async def response_handler(res: bytes):
+                response.feed_data(res)
+                endpoint_connection_handler.update_response_stats(res)
+
+            try:
+                await endpoint_connection_handler.send_async(req)
+                await endpoint_connection_handler.receive_async(response_handler)
+                endpoint_connection_handler.update_request_stats(req)
+            except BrokenConnectionError:
+                endpoint_connection_handler.close()
+                if not self.may_retry(req, attempt, deadline):
+                    raise
+                failed_pool = endpoint_connection_handler.connection_pool
+                attempt += 1
+                continue
+            finally:
+                endpoint_connection_handler.release()
+
+            return response.get_body()
+
+    def __forward_batch_call(self, req: RPCRequest) -> bool:
+        try:
+            req.response = self.forward(req)
+            return True
+        except InvalidRequestError:
+            req.response = ErrorResponses.invalid_request_object(req.id)
+            return False
+        except Exception as error:
+            self.__logger.error("%s: %s", error.__class__, error)
+            req.response = ErrorResponses.connection_error_object(req.id)
+            return False
+
+    async def __forward_batch_call_async(self, req: RPCRequest) -> bool:
+        try:
+            req.response = await self.forward_async(req)
+            return True
+        except InvalidRequestError:
+            req.response = ErrorResponses.invalid_request_object(req.id)
+            return False
+        except Exception as error:
+            self.__logger.error("%s: %s", error.__class__, error)
+            req.response = ErrorResponses.connection_error_object(req.id)
+            return False
+
+    def forward_batch(self, requests: List[RPCRequest]) -> List[RPCRequest]:
+        """
+        Forwards the calls of a batch in parallel, each one to the endpoint picked by the load balancer.
+        Sets the response of every call, an error object if the call failed.
+        :return: the calls answered by the endpoints
+        """
+        futures = [self.batch_executor.submit(self.__forward_batch_call, req) for req in requests[1:]]
+        answered = [self.__forward_batch_call(requests[0])]  # the calling thread forwards one of the calls too
+        answered.extend(future.result() for future in futures)
+        return [req for req, is_answered in zip(requests, answered) if is_answered]
+
+    async def forward_batch_async(self, requests: List[RPCRequest]) -> List[RPCRequest]:
+        """Non-blocking counterpart of forward_batch, the calls are forwarded concurrently"""
+        answered = await asyncio.gather(*(self.__forward_batch_call_async(req) for req in requests))
+        return [req for req, is_answered in zip(requests, answered) if is_answered]
 
     def close(self) -> None:
+        self.batch_executor.shutdown(wait=False)
         with self.__lock:
             for connection_pool in self.pools.values():
                 connection_pool.close()
@@ -0,0 +1,69 @@
+import time
+from threading import Lock
+
+# read-only methods answered alike by every synced endpoint, a call broken by a connection failure is sent again
+# not the transactions and signing, they may have been executed, nor the filters, they exist on a single endpoint
+RETRYABLE_METHODS = frozenset({
+    "net_peerCount",
+    "net_listening",
+    "net_version",
+    "web3_clientVersion",
+    "web3_sha3",
+    "eth_protocolVersion",
+    "eth_accounts",
+    "eth_blockNumber",
+    "eth_call",
+    "eth_chainId",
+    "eth_coinbase",
+    "eth_mining",
+    "eth_hashrate",
+    "eth_createAccessList",
+    "eth_estimateGas",
+    "eth_feeHistory",
+    "eth_gasPrice",
+    "eth_getBalance",
+    "eth_getBlockByHash",
+    "eth_getBlockByNumber",
+    "eth_getBlockReceipts",
+    "eth_getBlockTransactionCountByHash",
+    "eth_getBlockTransactionCountByNumber",
+    "eth_getCode",
+    "eth_getLogs",
+    "eth_getProof",
+    "eth_getStorageAt",
+    "eth_getTransactionByBlockHashAndIndex",
+    "eth_getTransactionByBlockNumberAndIndex",
+    "eth_getTransactionByHash",
+    "eth_getTransactionCount",
+    "eth_getTransactionReceipt",
+    "eth_getUncleCountByBlockHash",
+    "eth_getUncleCountByBlockNumber",
+    "eth_getUncleByBlockNumberAndIndex",
+    "eth_getUncleByBlockHashAndIndex",
+    "eth_maxPriorityFeePerGas",
+    "eth_syncing",
+})
+
+
+class RetryBudget:
+    """
+    Token bucket shared by the retries of all the requests. A retry takes a token, the tokens are refilled at rate
+    per second up to burst, so a failing endpoint does not multiply its load with retries.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.__lock = Lock()
+
+    def try_acquire(self) -> bool:
+        with self.__lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
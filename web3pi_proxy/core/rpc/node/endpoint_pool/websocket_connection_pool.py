@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+from threading import Lock, Thread
+from typing import List, Set, Tuple
+
+from web3pi_proxy.config.conf import Config
+from web3pi_proxy.core.rpc.node.endpoint_pool.endpoint_connection_pool import (
+    EndpointConnectionPool,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connectiondescr import (
+    EndpointConnectionDescriptor,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.multiplexed_connection_handler import (
+    MultiplexedConnectionHandler,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.websocketconnection import (
+    WebSocketConnection,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.endpointimpl import RPCEndpoint
+from web3pi_proxy.utils.logger import get_logger
+
+
+class WebSocketConnectionPool(EndpointConnectionPool):
+    """
+    Pool of a ws:// or wss:// endpoint. All the calls share up to WEBSOCKET_CONNECTIONS connections, a call is sent
+    over the connection with the fewest calls awaiting responses. The handlers of the calls in progress are the busy
+    connections of the pool, so the load balancers see the load of the endpoint.
+    """
+
+    NUM_CONNECTIONS = Config.WEBSOCKET_CONNECTIONS
+
+    def __init__(self, endpoint: RPCEndpoint):
+        self.ws_connections: List[WebSocketConnection] = []
+        self.connecting = 0
+        self.__ws_lock = Lock()
+        self.__logger = get_logger(f"WebSocketConnectionPool.{id(self)}")
+        super().__init__(endpoint)
+        self.busy_connections: Set[MultiplexedConnectionHandler] = set()
+
+    def idle_limits(self, conn_descr: EndpointConnectionDescriptor) -> Tuple[int, int]:
+        return 0, 0  # the connections are shared, none of them is ever idle in the pool
+
+    def __connect_in_background(self) -> None:
+        try:
+            connection = WebSocketConnection(self.endpoint.conn_descr)
+        except Exception as error:
+            self.stats.register_error_on_connection_creation()
+            self.__logger.warning(f"Failed to open a WebSocket connection: {error}")
+            return
+        finally:
+            with self.__ws_lock:
+                self.connecting -= 1
+        self.__add_connection(connection)
+
+    def __add_connection(self, connection: WebSocketConnection) -> None:
+        with self.__ws_lock:
+            if self.is_active() or self.is_out_of_sync():
+                self.ws_connections.append(connection)
+                return
+        connection.close()
+
+    def __pick_connection(self, establish: bool) -> Tuple[WebSocketConnection | None, bool]:
+        """Returns the least loaded live connection, opening the missing connections in the background.
+        Connects synchronously if there are no live connections and establish is set."""
+        with self.__ws_lock:
+            self.ws_connections = [connection for connection in self.ws_connections if not connection.closed]
+            if self.ws_connections:
+                if len(self.ws_connections) + self.connecting < self.NUM_CONNECTIONS:
+                    self.connecting += 1
+                    Thread(target=self.__connect_in_background, daemon=True).start()
+                return min(self.ws_connections, key=lambda connection: connection.num_pending), False
+        if not establish:
+            return None, True
+        try:
+            connection = WebSocketConnection(self.endpoint.conn_descr)
+        except Exception:
+            self.stats.register_error_on_connection_creation()
+            raise
+        self.__add_connection(connection)
+        return connection, True
+
+    def get(self, out_of_sync: bool = False, establish: bool = True) -> MultiplexedConnectionHandler | None:
+        """Returns a handler of a call over a shared connection. With establish set to False, None is returned
+        if there are no live connections (connecting is a blocking operation)."""
+        if not out_of_sync and not self.is_active():
+            raise Exception("the pool is disabled")  # TODO better exception
+        if out_of_sync and not self.is_out_of_sync() and not self.is_active():
+            raise Exception("the pool is disabled")  # TODO better exception
+        connection, is_new = self.__pick_connection(establish)
+        if connection is None:
+            return None
+        self.endpoint.get_connection_stats().update_pool_access(not is_new)
+
+        handler = MultiplexedConnectionHandler(connection, self)
+        with self.__ws_lock:
+            self.busy_connections.add(handler)
+        return handler
+
+    def __close_if_done(self) -> None:
+        if self.status == self.PoolStatus.CLOSING and len(self.busy_connections) == 0:
+            self.connection_close_queue.put(None)  # sentinel
+            self.status = self.PoolStatus.CLOSED
+            self.__logger.info("Pool has been closed")
+
+    def put(self, handler: MultiplexedConnectionHandler) -> None:
+        with self.__ws_lock:
+            self.busy_connections.discard(handler)
+            if self.is_active():
+                self.stats.register_successful_connection()
+            self.__close_if_done()
+
+    def handle_broken_connection(self, handler: MultiplexedConnectionHandler, is_new=False):
+        self.__logger.warning(f"Reported failure for connection {handler.connection}")
+        with self.__ws_lock:
+            self.busy_connections.discard(handler)
+            self.stats.register_error_on_connection()
+            self.__close_if_done()
+
+    def __close_connections(self) -> None:
+        with self.__ws_lock:
+            connections = self.ws_connections
+            self.ws_connections = []
+        for connection in connections:
+            connection.close()
+
+    def disable(self):
+        super().disable()
+        self.__close_connections()
+
+    def out_of_sync(self):
+        super().out_of_sync()
+        self.__close_connections()
+
+    def test_conn(self) -> bool:
+        """Should not throw any exceptions.
+        Always creates a new connection outside a pool and tests a node."""
+        content = b'{"jsonrpc":"2.0","method":"eth_getBlockByNumber","params":["latest",false],"id":1}'
+        try:
+            connection = WebSocketConnection(self.endpoint.conn_descr)
+        except Exception:
+            return False
+        try:
+            _, future, _ = connection.call(content)
+            return "result" in json.loads(future.result(Config.WEBSOCKET_RESPONSE_TIMEOUT))
+        except Exception:
+            return False
+        finally:
+            connection.close()
+
+    def close(self) -> None:
+        with self.__ws_lock:
+            super().close()
+        self.__close_connections()
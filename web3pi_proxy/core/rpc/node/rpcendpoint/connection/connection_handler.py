@@ -3,7 +3,7 @@ from abc import ABCMeta, abstractmethod
 
 class ConnectionHandler(metaclass=ABCMeta):
     @abstractmethod
-    def send(self) -> bytearray:
+    def send(self) -> int:
         pass
 
     @abstractmethod
@@ -17,3 +17,7 @@ class ConnectionHandler(metaclass=ABCMeta):
     @abstractmethod
     def close(self) -> None:
         pass
+
+    def can_relay(self) -> bool:
+        """Whether the response can be relayed to a client socket without copying it to the process"""
+        return False
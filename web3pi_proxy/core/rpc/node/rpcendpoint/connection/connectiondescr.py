@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Optional
 
 import urllib3.util
 
@@ -12,15 +13,35 @@ class EndpointConnectionDescriptor:
     auth_key: str
     is_ssl: bool
     url: str
+    # idle connections kept by the pool of the endpoint, MIN_IDLE_CONNECTIONS and MAX_IDLE_CONNECTIONS if not set
+    min_idle: Optional[int] = None
+    max_idle: Optional[int] = None
+    # path of the IPC socket of a node on the same machine (unix:///path/to/geth.ipc), JSON-RPC is sent without HTTP
+    unix_path: Optional[str] = None
+    # JSON-RPC is multiplexed over a few WebSocket connections (ws://host:port/path or wss://host/path)
+    is_websocket: bool = False
+
+    UNIX_SCHEME = "unix://"
 
     @classmethod
-    def from_url(cls, url) -> EndpointConnectionDescriptor | None:
+    def from_url(
+        cls, url, min_idle: Optional[int] = None, max_idle: Optional[int] = None
+    ) -> EndpointConnectionDescriptor | None:
+        if url.startswith(cls.UNIX_SCHEME):
+            unix_path = url[len(cls.UNIX_SCHEME):]
+            if not unix_path.startswith("/"):
+                return None
+            return EndpointConnectionDescriptor(
+                "localhost", 0, "", False, url, min_idle, max_idle, unix_path=unix_path
+            )
+
         parsed = urllib3.util.parse_url(url)
 
         host = parsed.host
         port = parsed.port
         auth_key = parsed.path or ""
-        is_ssl = parsed.scheme == "https" if parsed.scheme is not None else None
+        is_ssl = parsed.scheme in ("https", "wss") if parsed.scheme is not None else None
+        is_websocket = parsed.scheme in ("ws", "wss")
 
         if host is None:
             return None
@@ -37,4 +58,6 @@ class EndpointConnectionDescriptor:
             else:
                 return None
 
-        return EndpointConnectionDescriptor(host, int(port), auth_key, is_ssl, url)
+        return EndpointConnectionDescriptor(
+            host, int(port), auth_key, is_ssl, url, min_idle, max_idle, is_websocket=is_websocket
+        )
@@ -1,4 +1,5 @@
-from typing import Callable
+import asyncio
+from typing import Awaitable, Callable, Optional
 
 from web3pi_proxy.core.rpc.node.endpoint_pool.endpoint_connection_pool import (
     ConnectionPool,
@@ -9,8 +10,15 @@ from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connection_handler import
 from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpointconnection import (
     EndpointConnection,
 )
-from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import ConnectionClosedError
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import (
+    ClientWriteError,
+    ConnectionClosedError,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.responsesize import (
+    ResponseSizeEstimator,
+)
 from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.sockets.basesocket import BaseSocket
 from web3pi_proxy.utils.logger import get_logger
 
 
@@ -29,7 +37,19 @@ class BrokenFreshConnectionError(BrokenConnectionError):
 class ReconnectError(BrokenConnectionError):
     message = "Error while attempting reconnect"
 
+
+class InvalidRequestError(Exception):
+    message = "Request cannot be sent to the endpoint"
+
 def _acquired_connection(func: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(func):
+        async def async_decorator(instance: "EndpointConnectionHandler", *args, **kwargs):
+            if instance.connection is None:
+                raise ConnectionReleasedError
+            return await func(instance, *args, **kwargs)
+
+        return async_decorator
+
     def decorator(instance: "EndpointConnectionHandler", *args, **kwargs):
         if instance.connection is None:
             raise ConnectionReleasedError
@@ -49,12 +69,18 @@ class EndpointConnectionHandler(ConnectionHandler):
         self.connection_pool = connection_pool
         self.is_new_connection = is_new_connection
         self.is_reconnect_forbidden = is_new_connection
+        self.method: Optional[str] = None  # of the last sent request, its responses size the receive buffer
 
         self.__logger = get_logger(f"EndpointConnectionHandler.{id(self)}")
         self.__logger.debug(f"Created handler for connection {connection}")
 
+    @property
+    def response_sizes(self) -> ResponseSizeEstimator:
+        return self.connection.endpoint.get_connection_stats().response_sizes
+
     @_acquired_connection
-    def send(self, req: RPCRequest) -> bytearray:
+    def send(self, req: RPCRequest) -> int:
+        self.method = req.method
         try:
             request = self.connection.req_sender.send_request(req)
             self.is_reconnect_forbidden = True
@@ -86,20 +112,124 @@ class EndpointConnectionHandler(ConnectionHandler):
             self.__handle_broken_connection()
             raise BrokenConnectionError
 
+    @staticmethod
+    def __client_callback(callback: Callable) -> Callable:
+        """The errors of passing the response to the client are told apart from the errors of the endpoint"""
+
+        def client_callback(data) -> None:
+            try:
+                callback(data)
+            except OSError as error:
+                raise ClientWriteError from error
+
+        return client_callback
+
+    @staticmethod
+    def __client_callback_async(callback: Callable[[bytes], Awaitable[None]]) -> Callable[[bytes], Awaitable[None]]:
+        async def client_callback(data) -> None:
+            try:
+                await callback(data)
+            except OSError as error:
+                raise ClientWriteError from error
+
+        return client_callback
+
     @_acquired_connection
     def receive(self, callback: Callable) -> None:
+        response_sizes = self.response_sizes
+        try:
+            size = self.connection.res_receiver.recv_response(
+                self.__client_callback(callback), response_sizes.buffer_size(self.method)
+            )
+        except ClientWriteError:
+            self.__discard_connection()
+            raise
+        except (ConnectionClosedError, ConnectionError):
+            self.__logger.error(f"Connection {self.connection} broke while receiving")
+            self.__handle_broken_connection()
+            raise BrokenConnectionError
+        response_sizes.update(self.method, size)
+
+    @_acquired_connection
+    def can_relay(self) -> bool:
+        return self.connection.res_receiver.can_relay()
+
+    @_acquired_connection
+    def relay(self, callback: Callable, dst: BaseSocket, relayed_callback: Callable) -> None:
+        """Passes the first part of the response to the callback, the rest is moved to the dst socket by the kernel"""
+        response_sizes = self.response_sizes
+        try:
+            size = self.connection.res_receiver.relay_response(
+                self.__client_callback(callback), dst, relayed_callback, response_sizes.buffer_size(self.method)
+            )
+        except ClientWriteError:
+            self.__discard_connection()
+            raise
+        except (ConnectionClosedError, OSError):  # a failed splice leaves the response partly read
+            self.__logger.error(f"Connection {self.connection} broke while relaying")
+            self.__handle_broken_connection()
+            raise BrokenConnectionError
+        response_sizes.update(self.method, size)
+
+    @_acquired_connection
+    async def send_async(self, req: RPCRequest) -> int:
+        """Non-blocking counterpart of send, intended for the asyncio proxy engine"""
+        self.method = req.method
+        try:
+            request = await self.connection.req_sender.send_request_async(req)
+            self.is_reconnect_forbidden = True
+            return request
+        except:
+            self.__logger.error(
+                f"Failed to send request {req} over connection {self.connection}"
+            )
+
+        if not self.is_reconnect_forbidden:
+            try:
+                self.__logger.debug(f"Reconnecting {self.connection}")
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.connection.reconnect
+                )
+            except:
+                self.__logger.error(
+                    f"Connection {self.connection} failed to reconnect!"
+                )
+                self.__handle_broken_connection()
+                raise ReconnectError
+        else:
+            self.__logger.error(f"Connection {self.connection} started broken!")
+            self.__handle_broken_connection()
+            raise BrokenFreshConnectionError
+
         try:
-            self.connection.res_receiver.recv_response(callback)
-        except ConnectionClosedError:
+            return await self.connection.req_sender.send_request_async(req)
+        except:
+            self.__logger.error(f"Connection {self.connection} is broken")
+            self.__handle_broken_connection()
             raise BrokenConnectionError
-        except ConnectionError:
+
+    @_acquired_connection
+    async def receive_async(self, callback: Callable[[bytes], Awaitable[None]]) -> None:
+        """Non-blocking counterpart of receive, intended for the asyncio proxy engine"""
+        response_sizes = self.response_sizes
+        try:
+            size = await self.connection.res_receiver.recv_response_async(
+                self.__client_callback_async(callback), response_sizes.buffer_size(self.method)
+            )
+        except ClientWriteError:
+            self.__discard_connection()
+            raise
+        except (ConnectionClosedError, ConnectionError):
+            self.__logger.error(f"Connection {self.connection} broke while receiving")
+            self.__handle_broken_connection()
             raise BrokenConnectionError
+        response_sizes.update(self.method, size)
 
     def update_request_stats(self, request: RPCRequest):
-        self.connection.update_endpoint_stats(request.last_queried_bytes, bytearray())
+        self.connection.update_endpoint_stats(request.last_queried_size, 0)
 
     def update_response_stats(self, response_bytes: bytearray) -> None:
-        self.connection.update_endpoint_stats(bytearray(), response_bytes)
+        self.connection.update_endpoint_stats(0, len(response_bytes))
 
     def release(self) -> None:
         if self.connection is not None:
@@ -112,9 +242,17 @@ class EndpointConnectionHandler(ConnectionHandler):
         )
         self.connection = None
 
+    def __discard_connection(self) -> None:
+        """The response is left partly read as the client is gone, the connection is closed without an error"""
+        self.__logger.warning(f"Client is gone, connection {self.connection} is discarded")
+        self.connection_pool.discard(self.connection)
+        self.connection = None
+
     def close(self) -> None:
+        """Closes a broken connection, it is reported to the pool instead of being returned to it"""
         if self.connection is not None:
             self.connection.close()
+            self.__handle_broken_connection()
 
     def __del__(self) -> None:
         self.release()
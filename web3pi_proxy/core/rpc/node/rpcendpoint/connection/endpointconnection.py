@@ -7,14 +7,21 @@ from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connectiondescr import (
 from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import (
     ResponseReceiver,
     ResponseReceiverGeth,
+    ResponseReceiverIPC,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.sender import (
+    IPCRequestSender,
+    RequestSender,
 )
-from web3pi_proxy.core.rpc.node.rpcendpoint.connection.sender import RequestSender
 from web3pi_proxy.core.rpc.node.rpcendpoint.endpointimpl import RPCEndpoint
 from web3pi_proxy.core.sockets.basesocket import BaseSocket
 from web3pi_proxy.utils.logger import get_logger
 
 
 class EndpointConnection:
+    # an idle connection is not reused this many seconds before the keep-alive timeout of the endpoint
+    KEEP_ALIVE_TIMEOUT_MARGIN = 1.0
+
     endpoint: RPCEndpoint
     socket: BaseSocket
     req_sender: RequestSender
@@ -32,15 +39,9 @@ class EndpointConnection:
         self.endpoint = endpoint
 
         self.__logger.debug(f"Creating socket for endpoint: {endpoint}")
-        self.socket = self.__create_socket()
+        self.__connect()
         self.__logger.debug(f"Socket created for description: {self.conn_descr}")
 
-        self.req_sender = RequestSender(
-            self.socket, self.conn_descr.host, self.conn_descr.auth_key
-        )
-
-        self.res_receiver = ResponseReceiverGeth(self.socket)
-
         self.last_use_timestamp = time.time_ns()
 
     @property
@@ -49,25 +50,53 @@ class EndpointConnection:
 
     @property
     def ip(self) -> str:
+        if self.conn_descr.unix_path is not None:
+            return self.conn_descr.unix_path
         return self.socket.get_peer_name()[0]
 
+    def __connect(self) -> None:
+        if self.conn_descr.unix_path is not None:
+            self.socket = BaseSocket.create_unix_socket(self.conn_descr.unix_path)
+            self.req_sender = IPCRequestSender(self.socket)
+            self.res_receiver = ResponseReceiverIPC(self.socket)
+            return
+
+        self.socket = self.__create_socket()
+        self.req_sender = RequestSender(
+            self.socket, self.conn_descr.host, self.conn_descr.auth_key
+        )
+        self.res_receiver = ResponseReceiverGeth(self.socket)
+
     def __create_socket(self) -> BaseSocket:
-        return BaseSocket.create_socket(
+        socket = BaseSocket.create_socket(
             self.conn_descr.host, self.conn_descr.port, self.conn_descr.is_ssl
         )
+        if socket.handshake_time is not None:
+            self.endpoint.get_connection_stats().update_tls_handshake(socket.handshake_time, socket.session_reused)
+        return socket
 
     def close(self) -> None:
+        self.res_receiver.close()
         self.socket.close()
 
     def reconnect(self) -> None:
         self.close()
-        self.socket = self.__create_socket()
-        self.req_sender = RequestSender(
-            self.socket, self.conn_descr.host, self.conn_descr.auth_key
-        )
-        self.res_receiver = ResponseReceiverGeth(self.socket)
+        self.__connect()
+
+    def is_kept_alive(self) -> bool:
+        """Whether the endpoint keeps the connection open after the last response"""
+        return self.res_receiver.keep_alive
+
+    def is_alive(self) -> bool:
+        """Checks an idle connection before it is used again, the endpoint or a load balancer may have closed it"""
+        timeout = self.res_receiver.keep_alive_timeout
+        if timeout is not None:
+            idle_time = (time.time_ns() - self.last_use_timestamp) / 1_000_000_000
+            if idle_time > timeout - self.KEEP_ALIVE_TIMEOUT_MARGIN:
+                return False
+        return self.socket.is_alive()
 
     def update_endpoint_stats(
-        self, request_bytes: bytearray, response_bytes: bytearray
+        self, no_request_bytes: int, no_response_bytes: int
     ) -> None:
-        self.endpoint.update_stats(request_bytes, response_bytes)
+        self.endpoint.update_stats(no_request_bytes, no_response_bytes)
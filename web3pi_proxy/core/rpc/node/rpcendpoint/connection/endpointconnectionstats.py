@@ -1,12 +1,24 @@
 import time
 from threading import Lock
 
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.responsesize import (
+    ResponseSizeEstimator,
+)
+
 
 class EndpointConnectionStats:
     _started_at: float
     _no_bytes_sent: int
     _no_bytes_received: int
     _no_requests_handled: int
+    _no_tls_handshakes: int
+    _no_tls_resumed_handshakes: int
+    _tls_handshake_time: float
+    _no_pool_hits: int
+    _no_pool_misses: int
+    _no_stale_connections: int
+    _no_retries: int
+    _no_failovers: int
 
     def __init__(self):
         self._started_at = time.time()
@@ -15,6 +27,18 @@ class EndpointConnectionStats:
         self._no_bytes_received = 0
         self._no_requests_handled = 0
 
+        self._no_tls_handshakes = 0
+        self._no_tls_resumed_handshakes = 0
+        self._tls_handshake_time = 0.0
+
+        self._no_pool_hits = 0
+        self._no_pool_misses = 0
+        self._no_stale_connections = 0
+        self._no_retries = 0
+        self._no_failovers = 0
+
+        self.response_sizes = ResponseSizeEstimator()
+
         self.__lock = Lock()
 
     @property
@@ -33,6 +57,38 @@ class EndpointConnectionStats:
     def no_requests_handled(self):
         return self._no_requests_handled
 
+    @property
+    def no_tls_handshakes(self):
+        return self._no_tls_handshakes
+
+    @property
+    def no_tls_resumed_handshakes(self):
+        return self._no_tls_resumed_handshakes
+
+    @property
+    def avg_tls_handshake_time(self):
+        return self._tls_handshake_time / self._no_tls_handshakes if self._no_tls_handshakes else 0.0
+
+    @property
+    def no_pool_hits(self):
+        return self._no_pool_hits
+
+    @property
+    def no_pool_misses(self):
+        return self._no_pool_misses
+
+    @property
+    def no_stale_connections(self):
+        return self._no_stale_connections
+
+    @property
+    def no_retries(self):
+        return self._no_retries
+
+    @property
+    def no_failovers(self):
+        return self._no_failovers
+
     def _update(
         self, no_bytes_received: int, no_bytes_sent: int, no_requests_handled: int
     ) -> None:
@@ -41,20 +97,52 @@ class EndpointConnectionStats:
             self._no_bytes_sent += no_bytes_sent
             self._no_bytes_received += no_bytes_received
 
-    def update_request_bytes(self, req_data: bytearray) -> None:
-        no_req_bytes = len(req_data)
+    def update_request_bytes(self, no_req_bytes: int) -> None:
         if no_req_bytes:
             self._update(no_req_bytes, 0, 1)
 
-    def update_response_bytes(self, res_data: bytearray) -> None:
-        no_res_bytes = len(res_data)
+    def update_response_bytes(self, no_res_bytes: int) -> None:
         if no_res_bytes:
             self._update(0, no_res_bytes, 0)
 
+    def update_tls_handshake(self, handshake_time: float, resumed: bool) -> None:
+        with self.__lock:
+            self._no_tls_handshakes += 1
+            self._no_tls_resumed_handshakes += resumed
+            self._tls_handshake_time += handshake_time
+
+    def update_pool_access(self, hit: bool) -> None:
+        """Counts the requests served with an idle connection of the pool (hits) and with a new connection (misses)"""
+        with self.__lock:
+            if hit:
+                self._no_pool_hits += 1
+            else:
+                self._no_pool_misses += 1
+
+    def update_stale_connection(self) -> None:
+        """Counts the idle connections found closed by the endpoint when taken from the pool"""
+        with self.__lock:
+            self._no_stale_connections += 1
+
+    def update_retry(self, failover: bool) -> None:
+        """Counts the calls retried with the endpoint, failovers are the calls that failed on another endpoint"""
+        with self.__lock:
+            self._no_retries += 1
+            self._no_failovers += failover
+
     def to_dict(self):
         return {
             "started_at_timestamp": self.started_at,
             "req_no": self.no_requests_handled,
             "bytes_sent": self.no_bytes_sent,
             "bytes_received": self.no_bytes_received,
+            "tls_handshakes": self.no_tls_handshakes,
+            "tls_resumed_handshakes": self.no_tls_resumed_handshakes,
+            "avg_tls_handshake_ms": round(self.avg_tls_handshake_time * 1000, 3),
+            "pool_hits": self.no_pool_hits,
+            "pool_misses": self.no_pool_misses,
+            "stale_connections": self.no_stale_connections,
+            "retries": self.no_retries,
+            "failovers": self.no_failovers,
+            "recv_buf_sizes": self.response_sizes.to_dict(),
         }
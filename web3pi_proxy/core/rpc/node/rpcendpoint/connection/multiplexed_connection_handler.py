@@ -0,0 +1,127 @@
+import asyncio
+import concurrent.futures
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional
+
+from web3pi_proxy.config.conf import Config
+from web3pi_proxy.core.rpc.node.endpoint_pool.connection_pool import (
+    ConnectionPool,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connection_handler import (
+    ConnectionHandler,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.endpoint_connection_handler import (
+    BrokenConnectionError,
+    ConnectionReleasedError,
+    InvalidRequestError,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import (
+    ClientWriteError,
+    ConnectionClosedError,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.websocketconnection import (
+    WebSocketConnection,
+)
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.utils.logger import get_logger
+
+
+class MultiplexedConnectionHandler(ConnectionHandler):
+    """
+    A single call over a WebSocket connection shared with other calls. The response is passed to the callback
+    as an HTTP response, the same way the responses of the HTTP connections are.
+    """
+
+    RESPONSE_HEAD = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+
+    def __init__(
+        self,
+        connection: WebSocketConnection,
+        connection_pool: ConnectionPool,
+        timeout: float = Config.WEBSOCKET_RESPONSE_TIMEOUT,
+    ) -> None:
+        self.connection: Optional[WebSocketConnection] = connection
+        self.connection_pool = connection_pool
+        self.timeout = timeout
+        self.call_id: Optional[int] = None
+        self.future: Optional[Future] = None
+
+        self.__logger = get_logger(f"MultiplexedConnectionHandler.{id(self)}")
+
+    def send(self, req: RPCRequest) -> int:
+        if self.connection is None:
+            raise ConnectionReleasedError
+        try:
+            self.call_id, self.future, req.last_queried_size = self.connection.call(req.content)
+        except (ConnectionClosedError, OSError):
+            self.__logger.error(f"Failed to send request {req} over connection {self.connection}")
+            self.__handle_broken_connection()
+            raise BrokenConnectionError
+        except (ValueError, AttributeError):  # the body is not a JSON object, the connection is fine
+            self.__logger.error(f"Request {req} is not a JSON-RPC call")
+            self.release()
+            raise InvalidRequestError
+        return req.last_queried_size
+
+    def __response(self, body: bytes) -> bytes:
+        return self.RESPONSE_HEAD % len(body) + body
+
+    def receive(self, callback: Callable) -> None:
+        if self.connection is None:
+            raise ConnectionReleasedError
+        try:
+            body = self.future.result(self.timeout)
+        except (concurrent.futures.TimeoutError, ConnectionClosedError):
+            self.__logger.error(f"No response to call {self.call_id} over connection {self.connection}")
+            self.__handle_broken_connection()
+            raise BrokenConnectionError
+        try:
+            callback(self.__response(body))
+        except OSError as error:  # the response was received whole, the shared connection is fine
+            self.release()
+            raise ClientWriteError from error
+
+    async def send_async(self, req: RPCRequest) -> int:
+        """Non-blocking counterpart of send, intended for the asyncio proxy engine. Sending a frame does not wait
+        for the endpoint."""
+        return self.send(req)
+
+    async def receive_async(self, callback: Callable[[bytes], Awaitable[None]]) -> None:
+        """Non-blocking counterpart of receive, intended for the asyncio proxy engine"""
+        if self.connection is None:
+            raise ConnectionReleasedError
+        try:
+            body = await asyncio.wait_for(asyncio.wrap_future(self.future), self.timeout)
+        except (asyncio.TimeoutError, ConnectionClosedError):
+            self.__logger.error(f"No response to call {self.call_id} over connection {self.connection}")
+            self.__handle_broken_connection()
+            raise BrokenConnectionError
+        try:
+            await callback(self.__response(body))
+        except OSError as error:
+            self.release()
+            raise ClientWriteError from error
+
+    def update_request_stats(self, request: RPCRequest):
+        self.connection_pool.endpoint.update_stats(request.last_queried_size, 0)
+
+    def update_response_stats(self, response_bytes: bytearray) -> None:
+        self.connection_pool.endpoint.update_stats(0, len(response_bytes))
+
+    def release(self) -> None:
+        if self.connection is not None:
+            self.connection_pool.put(self)
+            self.connection = None
+
+    def __handle_broken_connection(self) -> None:
+        if self.call_id is not None:
+            self.connection.discard(self.call_id)
+        self.connection_pool.handle_broken_connection(self)
+        self.connection = None
+
+    def close(self) -> None:
+        """The connection is shared with other calls, only this call is given up"""
+        self.release()
+
+    def __del__(self) -> None:
+        self.release()
@@ -1,5 +1,9 @@
+import errno
+import os
+import socket
+import time
 from abc import ABC, abstractmethod
-from typing import Callable
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
 
 from httptools import HttpResponseParser
 
@@ -13,6 +17,27 @@ class HttpResponseParserListener:
     def __init__(self) -> None:
         self.need_more_data = True
         self.chunk_completed = False
+        self.connection_options: Set[bytes] = set()
+        self.keep_alive_timeout: Optional[float] = None
+
+    def reset(self) -> None:
+        self.need_more_data = True
+        self.chunk_completed = False
+        self.connection_options = set()
+        self.keep_alive_timeout = None
+
+    def on_header(self, name: bytes, value: bytes):
+        name = name.lower()
+        if name == b"connection":
+            self.connection_options.update(option.strip().lower() for option in value.split(b","))
+        elif name == b"keep-alive":  # e.g. Keep-Alive: timeout=5, max=1000
+            for param in value.split(b","):
+                key, _, number = param.partition(b"=")
+                if key.strip().lower() == b"timeout":
+                    try:
+                        self.keep_alive_timeout = float(number)
+                    except ValueError:
+                        pass
 
     def on_message_complete(
         self,
@@ -26,14 +51,69 @@ class HttpResponseParserListener:
         self.chunk_completed = False
 
 
+class ResponseBodyCollector:
+    """Parses an endpoint response passed in parts, keeps its body"""
+
+    def __init__(self) -> None:
+        self.body_parts: List[bytes] = []
+        self.parser = HttpResponseParser(self)
+
+    def on_body(self, body: bytes):
+        self.body_parts.append(body)
+
+    def feed_data(self, data: bytes) -> None:
+        self.parser.feed_data(data)
+
+    def get_body(self) -> bytes:
+        status_code = self.parser.get_status_code()
+        if status_code != 200:
+            raise EndpointResponseError(f"Endpoint responded with status {status_code}")
+        return b"".join(self.body_parts).strip()
+
+
 class ConnectionClosedError(Exception):
     message = "Connection is closed"
 
 
+class ClientWriteError(Exception):
+    """Passing the response to the client failed, it is not an error of the endpoint"""
+
+    message = "Client connection is broken"
+
+
+class EndpointResponseError(Exception):
+    pass
+
+
 class ResponseReceiver(ABC):
+    """
+    The data passed to a callback may be a view of a reused buffer, it is valid only until the callback returns.
+    The response is received with reads of up to buf_size bytes, the receiving methods return the response size.
+    """
+
+    keep_alive = True  # the endpoint keeps the connection open after the last response
+    keep_alive_timeout: Optional[float] = None  # the idle timeout of the connection announced by the endpoint, seconds
 
     @abstractmethod
-    def recv_response(self, callback: Callable) -> None:
+    def recv_response(self, callback: Callable, buf_size: Optional[int] = None) -> int:
+        pass
+
+    def can_relay(self) -> bool:
+        """Whether relay_response is supported"""
+        return False
+
+    def relay_response(
+        self, callback: Callable, dst: BaseSocket, relayed_callback: Callable, buf_size: Optional[int] = None
+    ) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def recv_response_async(
+        self, callback: Callable[[bytes], Awaitable[None]], buf_size: Optional[int] = None
+    ) -> int:
         pass
 
     @abstractmethod
@@ -42,29 +122,286 @@ class ResponseReceiver(ABC):
 
 
 class ResponseReceiverGeth(ResponseReceiver):
+    """
+    The parser and its listener are kept for the consecutive responses of the endpoint connection.
+    The parser is replaced only when a response is not read completely, its state is unknown then.
+    """
+
     __logger = get_logger("ResponseReceiverGeth")
 
+    RELAY_SEND_TIMEOUT = 5.0  # TODO parametrize?
+
     def __init__(self, sock: BaseSocket) -> None:
         self.socket = sock
+        self.response_listener = HttpResponseParserListener()
+        self.response_parser = HttpResponseParser(self.response_listener)
+        self.pipe: Optional[Tuple[int, int]] = None  # created with the first relayed response
 
-    def recv_response(self, callback: Callable) -> None:
-        buf_size = Config.DEFAULT_RECV_BUF_SIZE
+    def __reset_parser(self) -> None:
+        self.response_listener.reset()
+        self.response_parser = HttpResponseParser(self.response_listener)
 
-        response_listener = HttpResponseParserListener()
-        response_parser = HttpResponseParser(response_listener)
+    def __complete_response(self) -> None:
+        """Keeps the connection management of the endpoint from the completed response (Connection and Keep-Alive)"""
+        connection_options = self.response_listener.connection_options
+        if self.response_parser.get_http_version() == "1.0":
+            self.keep_alive = b"keep-alive" in connection_options
+        else:
+            self.keep_alive = b"close" not in connection_options
+        self.keep_alive_timeout = self.response_listener.keep_alive_timeout
 
+    def __acquire_buffer(self, buf_size: Optional[int]) -> bytearray:
+        buf_size = buf_size or Config.DEFAULT_RECV_BUF_SIZE
+        if Config.RECV_SOCKET_BUF_ADAPTIVE:
+            self.socket.fit_recv_buf_size(buf_size)
+        return BaseSocket.RECV_BUFFERS.acquire(buf_size)
+
+    def recv_response(self, callback: Callable, buf_size: Optional[int] = None) -> int:
+        response_listener = self.response_listener
+        response_listener.reset()
+
+        buffer = self.__acquire_buffer(buf_size)
+        buffer_view = memoryview(buffer)
+        size = 0
         self.__logger.debug("Loop starting")
-        while response_listener.need_more_data:
+        try:
+            while response_listener.need_more_data:
+                if not self.socket.is_ready_read(5):  # TODO parametrize?
+                    raise ConnectionClosedError
+                num_received = self.socket.recv_into(buffer)
+                if not num_received:
+                    raise ConnectionClosedError
+                size += num_received
+                data = buffer_view[:num_received]
+                self.response_parser.feed_data(data)
+                callback(data)
+        except BaseException:
+            self.__reset_parser()
+            raise
+        finally:
+            buffer_view.release()
+            BaseSocket.RECV_BUFFERS.release(buffer)
+
+        self.__complete_response()
+        self.__logger.debug("Response completed")
+        return size
+
+    def can_relay(self) -> bool:
+        return hasattr(os, "splice") and not self.socket.is_ssl()
+
+    def __get_pipe(self) -> Tuple[int, int]:
+        if self.pipe is None:
+            self.pipe = os.pipe()
+        return self.pipe
+
+    def __discard(self, size: int) -> None:
+        while size:
+            data = self.socket.recv(size)
+            if not data:
+                raise ConnectionClosedError
+            size -= len(data)
+
+    def __splice_to(self, moved: int, dst: BaseSocket) -> int:
+        """Moves the bytes in the pipe to the dst socket, waits at most RELAY_SEND_TIMEOUT seconds for the socket
+        to take them. Returns the number of bytes left in the pipe, not 0 if the client is gone or does not read."""
+        pipe_read_fd = self.__get_pipe()[0]
+        deadline = time.monotonic() + self.RELAY_SEND_TIMEOUT
+        while moved:
+            if not dst.is_ready_write(max(0.0, deadline - time.monotonic())):
+                self.__logger.warning(f"Client {dst.get_peer_name()} does not read the relayed response, aborted")
+                try:  # the client must not take the truncated response for a complete one
+                    dst.socket.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                return moved
+            try:
+                moved -= os.splice(
+                    pipe_read_fd, dst.socket.fileno(), moved, flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK
+                )
+            except BlockingIOError:
+                continue
+            except OSError as error:
+                if error.errno not in (errno.EPIPE, errno.ECONNRESET):
+                    raise ClientWriteError from error
+                self.__logger.debug("Client is gone, the relayed response is discarded")
+                return moved
+        return 0
+
+    def __splice(self, size: int, dst: BaseSocket) -> bool:
+        """Moves the bytes from the endpoint socket to dst through the pipe, they are not copied to the process.
+        Returns False if writing to dst failed, the bytes are consumed anyway."""
+        pipe_read_fd, pipe_write_fd = self.__get_pipe()
+        while size:
+            moved = os.splice(self.socket.fd, pipe_write_fd, size, flags=os.SPLICE_F_MOVE)
+            if not moved:
+                raise ConnectionClosedError
+            size -= moved
+            moved = self.__splice_to(moved, dst)
+            if moved:
+                while moved:  # the pipe is left empty for the next responses
+                    moved -= len(os.read(pipe_read_fd, moved))
+                self.__discard(size)
+                return False
+        return True
+
+    def __close_pipe(self) -> None:
+        if self.pipe is not None:
+            os.close(self.pipe[0])
+            os.close(self.pipe[1])
+            self.pipe = None
+
+    def relay_response(
+        self, callback: Callable, dst: BaseSocket, relayed_callback: Callable, buf_size: Optional[int] = None
+    ) -> int:
+        """
+        Receives the first part of the response, with the head, like recv_response. The rest is moved to the dst socket
+        with splice, the parser is fed from a peeked copy of the data and relayed_callback is called with it.
+        """
+        response_listener = self.response_listener
+        response_listener.reset()
+
+        buffer = self.__acquire_buffer(buf_size)
+        buffer_view = memoryview(buffer)
+        size = 0
+        dst_fd = dst.socket.fileno()
+        first = True
+        try:
+            while response_listener.need_more_data:
+                if not self.socket.is_ready_read(5):  # TODO parametrize?
+                    raise ConnectionClosedError
+                num_received = self.socket.recv_into(buffer, 0 if first else socket.MSG_PEEK)
+                if not num_received:
+                    raise ConnectionClosedError
+                size += num_received
+                data = buffer_view[:num_received]
+                self.response_parser.feed_data(data)
+                if first:
+                    callback(data)
+                    first = False
+                    continue
+                relayed_callback(data)
+                if dst_fd < 0:
+                    self.__discard(num_received)
+                elif not self.__splice(num_received, dst):
+                    dst_fd = -1  # the client is gone, the response is still consumed to keep the connection
+        except BaseException:
+            self.__reset_parser()
+            self.__close_pipe()  # it may hold a part of the response
+            raise
+        finally:
+            buffer_view.release()
+            BaseSocket.RECV_BUFFERS.release(buffer)
+
+        self.__complete_response()
+        self.__logger.debug("Response relayed")
+        return size
+
+    async def recv_response_async(
+        self, callback: Callable[[bytes], Awaitable[None]], buf_size: Optional[int] = None
+    ) -> int:
+        buf_size = buf_size or Config.DEFAULT_RECV_BUF_SIZE
+        if Config.RECV_SOCKET_BUF_ADAPTIVE:
+            self.socket.fit_recv_buf_size(buf_size)
+
+        response_listener = self.response_listener
+        response_listener.reset()
+
+        size = 0
+        try:
+            while response_listener.need_more_data:
+                try:
+                    data = await self.socket.recv_async(buf_size, 5)  # TODO parametrize?
+                except TimeoutError:
+                    raise ConnectionClosedError
+                if not data:
+                    raise ConnectionClosedError
+                size += len(data)
+                self.response_parser.feed_data(data)
+                await callback(data)
+        except BaseException:
+            self.__reset_parser()
+            raise
+
+        self.__complete_response()
+        self.__logger.debug("Response completed")
+        return size
+
+    def update_socket(self, sock: BaseSocket) -> None:
+        self.socket = sock
+        self.__reset_parser()
+
+    def close(self) -> None:
+        self.__close_pipe()
+
+
+class ResponseReceiverIPC(ResponseReceiver):
+    """
+    Receives responses from the IPC socket of a node. The node writes a response as a JSON line.
+    The response is passed on as a chunked HTTP response as it is received, like the responses of HTTP endpoints.
+    """
+
+    RESPONSE_HEAD = (
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: application/json\r\n"
+        b"Transfer-Encoding: chunked\r\n"
+        b"\r\n"
+    )
+    LAST_CHUNK = b"0\r\n\r\n"
+
+    __logger = get_logger("ResponseReceiverIPC")
+
+    def __init__(self, sock: BaseSocket) -> None:
+        self.socket = sock
+
+    @classmethod
+    def __frame(cls, data: bytes, first: bool) -> bytes:
+        chunk = b"%x\r\n%b\r\n" % (len(data), data)
+        if data.endswith(b"\n"):  # the end of the response, the lines of JSON-RPC messages have no other line breaks
+            chunk += cls.LAST_CHUNK
+        return cls.RESPONSE_HEAD + chunk if first else chunk
+
+    def recv_response(self, callback: Callable, buf_size: Optional[int] = None) -> int:
+        buf_size = buf_size or Config.DEFAULT_RECV_BUF_SIZE
+
+        size = 0
+        first = True
+        while True:
             if not self.socket.is_ready_read(5):  # TODO parametrize?
                 raise ConnectionClosedError
             data = self.socket.recv(buf_size)
             if not data:
                 raise ConnectionClosedError
-            response_parser.feed_data(data)
-            self.__logger.debug(f"Raw response -> {data}")
-            callback(data)
+            size += len(data)
+            callback(self.__frame(data, first))
+            first = False
+            if data.endswith(b"\n"):
+                break
+
+        self.__logger.debug("Response completed")
+        return size
+
+    async def recv_response_async(
+        self, callback: Callable[[bytes], Awaitable[None]], buf_size: Optional[int] = None
+    ) -> int:
+        buf_size = buf_size or Config.DEFAULT_RECV_BUF_SIZE
+
+        size = 0
+        first = True
+        while True:
+            try:
+                data = await self.socket.recv_async(buf_size, 5)  # TODO parametrize?
+            except TimeoutError:
+                raise ConnectionClosedError
+            if not data:
+                raise ConnectionClosedError
+            size += len(data)
+            await callback(self.__frame(data, first))
+            first = False
+            if data.endswith(b"\n"):
+                break
 
         self.__logger.debug("Response completed")
+        return size
 
     def update_socket(self, sock: BaseSocket) -> None:
         self.socket = sock
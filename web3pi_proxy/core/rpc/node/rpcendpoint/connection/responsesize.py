@@ -0,0 +1,46 @@
+from threading import Lock
+from typing import Dict, Optional
+
+from web3pi_proxy.config.conf import Config
+
+
+class ResponseSizeEstimator:
+    """
+    Learns the typical response size of each method of an endpoint, as an exponentially weighted moving average.
+    The receive buffer of a response is sized to hold it in a few reads, a power of two between the min and max sizes.
+    """
+
+    ALPHA = 0.2
+    # methods over the limit are not tracked, the method names are not validated if the validation is off
+    MAX_METHODS = 256
+
+    def __init__(
+        self,
+        min_size: int = Config.DEFAULT_RECV_BUF_SIZE,
+        max_size: int = Config.MAX_RECV_BUF_SIZE,
+    ) -> None:
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.averages: Dict[Optional[str], float] = {}
+        self.__lock = Lock()
+
+    def update(self, method: Optional[str], size: int) -> None:
+        with self.__lock:
+            average = self.averages.get(method)
+            if average is None:
+                if len(self.averages) < self.MAX_METHODS:
+                    self.averages[method] = float(size)
+            else:
+                self.averages[method] = average + self.ALPHA * (size - average)
+
+    def buffer_size(self, method: Optional[str]) -> int:
+        average = self.averages.get(method)
+        if average is None or average <= self.min_size:
+            return self.min_size
+        return min(1 << (int(average) - 1).bit_length(), self.max_size)
+
+    def to_dict(self) -> Dict[str, int]:
+        """The buffer sizes chosen for the methods"""
+        with self.__lock:
+            methods = list(self.averages)
+        return {str(method): self.buffer_size(method) for method in methods}
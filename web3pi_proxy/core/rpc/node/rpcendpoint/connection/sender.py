@@ -5,37 +5,74 @@ from web3pi_proxy.core.sockets.basesocket import BaseSocket
 class RequestSender:
 
     POST_REQUEST_LINE = "POST /{} HTTP/1.1\r\n"
-    POST_REQUEST_LINE_1 = bytearray(b"POST ")
-    POST_REQUEST_LINE_2 = bytearray(b" HTTP/1.1\r\n")
+    POST_REQUEST_LINE_PATH_PREFIX = "POST /{}"
+    POST_REQUEST_LINE_END = b" HTTP/1.1\r\n"
     HOST_LAST_HEADER = "Host: {}\r\n\r\n"
 
     def __init__(self, sock: BaseSocket, host: str, api_key: str = "") -> None:
         self.socket = sock
 
-        self.url_context = bytearray(api_key.encode("UTF-8"))
+        # the prefixes of the requests sent over the connection are precomputed, see RPCRequest.as_segments
         self.post_request_line = RequestSender.get_post_request_line(api_key)
+        self.post_request_line_path_prefix = RequestSender.get_post_request_line_path_prefix(api_key)
         self.host_header_last = RequestSender.get_raw_host_last_header(host)
 
     def update_socket(self, sock: BaseSocket) -> None:
         self.socket = sock
 
-    def send_request(self, req: RPCRequest) -> bytearray:
-        req_data = req.as_bytearray(
-            RequestSender.POST_REQUEST_LINE_1,
-            self.url_context,
-            RequestSender.POST_REQUEST_LINE_2,
+    def send_request(self, req: RPCRequest) -> int:
+        """Sends the request with scatter/gather I/O, returns the number of bytes sent"""
+        segments = req.as_segments(
+            self.post_request_line,
+            self.post_request_line_path_prefix,
+            RequestSender.POST_REQUEST_LINE_END,
             self.host_header_last
         )
 
         assert self.socket.is_ready_write()
-        self.socket.send_all(req_data)
+        req.last_queried_size = self.socket.send_segments(segments)
 
-        return req_data
+        return req.last_queried_size
+
+    async def send_request_async(self, req: RPCRequest) -> int:
+        segments = req.as_segments(
+            self.post_request_line,
+            self.post_request_line_path_prefix,
+            RequestSender.POST_REQUEST_LINE_END,
+            self.host_header_last
+        )
+
+        req.last_queried_size = await self.socket.send_segments_async(segments)
+
+        return req.last_queried_size
+
+    @classmethod
+    def get_raw_host_last_header(cls, host: str) -> bytes:
+        return cls.HOST_LAST_HEADER.format(host).encode("UTF-8")
 
     @classmethod
-    def get_raw_host_last_header(cls, host: str) -> bytearray:
-        return bytearray(cls.HOST_LAST_HEADER.format(host).encode("UTF-8"))
+    def get_post_request_line(cls, api_key: str = "") -> bytes:
+        return cls.POST_REQUEST_LINE.format(api_key).encode("UTF-8")
 
     @classmethod
-    def get_post_request_line(cls, api_key: str = "") -> bytearray:
-        return bytearray(cls.POST_REQUEST_LINE.format(api_key).encode("UTF-8"))
+    def get_post_request_line_path_prefix(cls, api_key: str = "") -> bytes:
+        """The request line up to the request path, the path is joined to the api key (url context) with a slash"""
+        return cls.POST_REQUEST_LINE_PATH_PREFIX.format(f"{api_key}/" if api_key else "").encode("UTF-8")
+
+
+class IPCRequestSender(RequestSender):
+    """Sends the JSON-RPC content alone to the IPC socket of a node, IPC is not HTTP"""
+
+    def __init__(self, sock: BaseSocket) -> None:
+        super().__init__(sock, "localhost")
+
+    def send_request(self, req: RPCRequest) -> int:
+        assert self.socket.is_ready_write()
+        req.last_queried_size = self.socket.send_segments([req.content])
+
+        return req.last_queried_size
+
+    async def send_request_async(self, req: RPCRequest) -> int:
+        req.last_queried_size = await self.socket.send_segments_async([req.content])
+
+        return req.last_queried_size
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import itertools
+import json
+import os
+import re
+import socket
+import ssl
+import struct
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import Dict, List, Optional, Tuple
+
+from web3pi_proxy.config.conf import Config
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.connectiondescr import (
+    EndpointConnectionDescriptor,
+)
+from web3pi_proxy.core.rpc.node.rpcendpoint.connection.receiver import ConnectionClosedError
+from web3pi_proxy.core.sockets.basesocket import BaseSocket
+from web3pi_proxy.utils.logger import get_logger
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# ids of the calls sent over all the WebSocket connections, the original ids of the requests are restored in responses
+_call_ids = itertools.count(1)
+
+
+class WebSocketProtocolError(ConnectionError):
+    pass
+
+
+def mask_payload(payload: bytes, mask: bytes) -> bytes:
+    """XORs the payload with the repeated mask, with integer arithmetic instead of a loop over the bytes"""
+    size = len(payload)
+    if size == 0:
+        return payload
+    repeated_mask = (mask * (size // 4 + 1))[:size]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated_mask, "big")).to_bytes(size, "big")
+
+
+def encode_frame(payload: bytes, opcode: int = OP_TEXT, masked: bool = True) -> bytes:
+    """A final frame of a message, the frames sent by clients must be masked"""
+    size = len(payload)
+    mask_bit = 0x80 if masked else 0
+    if size < 126:
+        head = struct.pack("!BB", 0x80 | opcode, mask_bit | size)
+    elif size < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, mask_bit | 126, size)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, mask_bit | 127, size)
+    if not masked:
+        return head + payload
+    mask = os.urandom(4)
+    return head + mask + mask_payload(payload, mask)
+
+
+class FrameReader:
+    """Parses received data into messages, the fragments of a message are joined. Control frames are returned as
+    messages with their opcodes, they can be received between the fragments of a data message."""
+
+    def __init__(self, max_message_size: int) -> None:
+        self.max_message_size = max_message_size
+        self.buffer = bytearray()
+        self.fragments: List[bytes] = []
+        self.fragments_size = 0
+        self.fragments_opcode = OP_TEXT
+
+    def feed(self, data: bytes) -> List[Tuple[int, bytes]]:
+        self.buffer += data
+        messages = []
+        while True:
+            frame = self.__next_frame()
+            if frame is None:
+                return messages
+            fin, opcode, payload = frame
+            if opcode >= OP_CLOSE:
+                messages.append((opcode, payload))
+                continue
+            if opcode != OP_CONTINUATION:
+                self.fragments_opcode = opcode
+            self.fragments.append(payload)
+            self.fragments_size += len(payload)
+            if self.fragments_size > self.max_message_size:
+                raise WebSocketProtocolError("Message too large")
+            if fin:
+                messages.append((self.fragments_opcode, b"".join(self.fragments)))
+                self.fragments = []
+                self.fragments_size = 0
+
+    def __next_frame(self) -> Optional[Tuple[bool, int, bytes]]:
+        buffer = self.buffer
+        if len(buffer) < 2:
+            return None
+        first, second = buffer[0], buffer[1]
+        size = second & 0x7F
+        offset = 2
+        if size == 126:
+            if len(buffer) < 4:
+                return None
+            size = struct.unpack_from("!H", buffer, 2)[0]
+            offset = 4
+        elif size == 127:
+            if len(buffer) < 10:
+                return None
+            size = struct.unpack_from("!Q", buffer, 2)[0]
+            offset = 10
+        if size > self.max_message_size:
+            raise WebSocketProtocolError("Frame too large")
+        mask = None
+        if second & 0x80:
+            mask = bytes(buffer[offset:offset + 4])
+            offset += 4
+        if len(buffer) < offset + size:
+            return None
+        payload = bytes(buffer[offset:offset + size])
+        del buffer[:offset + size]
+        if mask is not None:
+            payload = mask_payload(payload, mask)
+        return bool(first & 0x80), first & 0x0F, payload
+
+
+class WebSocketConnection:
+    """
+    WebSocket connection to an endpoint shared by many calls at once. The ids of the calls are replaced with
+    proxy-unique ids, the responses are matched with their calls by a reader thread as soon as they are received,
+    in any order, and the original ids are restored.
+    """
+
+    GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+    HANDSHAKE_TEMPLATE = (
+        "GET /{path} HTTP/1.1\r\n"
+        "Host: {host}:{port}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        "Sec-WebSocket-Key: {key}\r\n"
+        "Sec-WebSocket-Version: 13\r\n"
+        "\r\n"
+    )
+    # the id of a response is found without decoding it, geth writes the jsonrpc and id members first
+    RESPONSE_ID = re.compile(rb'\s*\{\s*"jsonrpc"\s*:\s*"2\.0"\s*,\s*"id"\s*:\s*(\d+)')
+
+    def __init__(
+        self,
+        conn_descr: EndpointConnectionDescriptor,
+        max_message_size: int = Config.WEBSOCKET_MAX_MESSAGE_SIZE,
+    ) -> None:
+        self.__logger = get_logger(f"WebSocketConnection.{id(self)}")
+        self.conn_descr = conn_descr
+        self.socket = BaseSocket.create_socket(conn_descr.host, conn_descr.port, conn_descr.is_ssl)
+        self.frame_reader = FrameReader(max_message_size)
+        self.pending: Dict[int, Tuple[Future, bytes]] = {}
+        self.closed = False
+        self.__lock = Lock()
+        # ssl sockets cannot be read and written at once, the reader thread reads with the send lock for them,
+        # without blocking, see __recv_ssl
+        self.__send_lock = Lock()
+        try:
+            self.__handshake()
+        except Exception:
+            self.socket.close()
+            raise
+        self.reader_thread = Thread(target=self.__run_reader_thread, daemon=True)
+        self.reader_thread.start()
+
+    def __handshake(self) -> None:
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = self.HANDSHAKE_TEMPLATE.format(
+            path=self.conn_descr.auth_key, host=self.conn_descr.host, port=self.conn_descr.port, key=key
+        )
+        self.socket.socket.sendall(request.encode())
+
+        response = b""
+        while b"\r\n\r\n" not in response:
+            if not self.socket.is_ready_read(5) or len(response) > Config.MAX_REQUEST_HEADER_SIZE:
+                raise WebSocketProtocolError("No handshake response")
+            data = self.socket.recv(Config.DEFAULT_RECV_BUF_SIZE)
+            if not data:
+                raise ConnectionClosedError
+            response += data
+        head, _, rest = response.partition(b"\r\n\r\n")
+        lines = head.split(b"\r\n")
+        if len(lines[0].split()) < 2 or lines[0].split()[1] != b"101":
+            raise WebSocketProtocolError(f"Handshake rejected: {lines[0]}")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1(key.encode() + self.GUID).digest())
+        if headers.get(b"sec-websocket-accept") != accept:
+            raise WebSocketProtocolError("Invalid handshake response")
+        if rest:
+            for message in self.frame_reader.feed(rest):
+                self.__handle_message(*message)
+
+    @property
+    def num_pending(self) -> int:
+        return len(self.pending)
+
+    def __send_frame(self, frame: bytes) -> None:
+        try:
+            with self.__send_lock:
+                self.socket.socket.sendall(frame)
+        except OSError:
+            self.close()
+            raise ConnectionClosedError
+
+    def call(self, content: bytes) -> Tuple[int, Future, int]:
+        """Sends a JSON-RPC request, returns the call id, the future of the response and the number of bytes sent"""
+        message = json.loads(content)
+        call_id = next(_call_ids)
+        original_id = json.dumps(message.get("id")).encode()
+        message["id"] = call_id
+        frame = encode_frame(json.dumps(message, separators=(",", ":")).encode())
+
+        future = Future()
+        with self.__lock:
+            if self.closed:
+                raise ConnectionClosedError
+            self.pending[call_id] = (future, original_id)
+        self.__send_frame(frame)
+        return call_id, future, len(frame)
+
+    def discard(self, call_id: int) -> None:
+        """Forgets a call which is not awaited anymore, its response is dropped if it comes"""
+        with self.__lock:
+            self.pending.pop(call_id, None)
+
+    def __handle_message(self, opcode: int, payload: bytes) -> None:
+        if opcode == OP_TEXT or opcode == OP_BINARY:
+            self.__resolve(payload)
+        elif opcode == OP_PING:
+            self.__send_frame(encode_frame(payload, OP_PONG))
+        elif opcode == OP_CLOSE:
+            raise ConnectionClosedError
+
+    def __resolve(self, response: bytes) -> None:
+        match = self.RESPONSE_ID.match(response)
+        if match is not None:
+            call_id = int(match.group(1))
+        else:
+            try:
+                call_id = json.loads(response).get("id")
+            except (ValueError, AttributeError):
+                self.__logger.warning("Received a message which is not a JSON-RPC response")
+                return
+        with self.__lock:
+            entry = self.pending.pop(call_id, None)
+        if entry is None:  # a notification, or a call already given up
+            return
+        future, original_id = entry
+        if match is not None:
+            response = response[:match.start(1)] + original_id + response[match.end(1):]
+        else:
+            message = json.loads(response)
+            message["id"] = json.loads(original_id)
+            response = json.dumps(message, separators=(",", ":")).encode()
+        future.set_result(response)
+
+    def __recv_ssl(self, buf_size: int) -> Optional[bytes]:
+        """Reads the decrypted data without blocking. The readable socket may hold only TLS data, e.g. a session
+        ticket or a part of a record, a blocking read would hold the send lock until the endpoint sends a message.
+        Returns None if there is no application data yet."""
+        sock = self.socket.socket
+        with self.__send_lock:
+            sock.setblocking(False)
+            try:
+                data = sock.recv(buf_size)
+                while data and sock.pending():  # the rest of a decrypted record is not signalled by the poller
+                    data += sock.recv(sock.pending())
+                return data
+            except ssl.SSLWantReadError:
+                return None
+            finally:
+                sock.setblocking(True)
+
+    def __run_reader_thread(self) -> None:
+        buf_size = Config.DEFAULT_RECV_BUF_SIZE
+        is_ssl = self.socket.is_ssl()
+        try:
+            while True:
+                if is_ssl:
+                    while not self.socket.is_ready_read(1):
+                        if self.closed:
+                            return
+                    data = self.__recv_ssl(buf_size)
+                    if data is None:
+                        continue
+                else:
+                    data = self.socket.recv(buf_size)
+                if not data:
+                    break
+                for message in self.frame_reader.feed(data):
+                    self.__handle_message(*message)
+        except Exception as error:
+            if not self.closed:
+                self.__logger.warning(f"WebSocket connection broken: {error.__class__.__name__} {error}")
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.closed:
+                return
+            self.closed = True
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for future, _ in pending:
+            future.set_exception(ConnectionClosedError())
+        try:
+            self.socket.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
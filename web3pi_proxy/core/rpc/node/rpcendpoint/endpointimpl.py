@@ -18,6 +18,8 @@ class RPCEndpoint:
         return f"{self.__class__.__name__}(name={self.name}, addr={self.get_endpoint_addr()})"
 
     def get_endpoint_addr(self) -> str:
+        if self.conn_descr.unix_path is not None:
+            return self.conn_descr.unix_path
         return f"{self.conn_descr.host}:{self.conn_descr.port}"
 
     def get_name(self) -> str:
@@ -26,9 +28,9 @@ class RPCEndpoint:
     def get_connection_stats(self) -> EndpointConnectionStats:
         return self.conn_stats
 
-    def update_stats(self, request_bytes: bytearray, response_bytes: bytearray) -> None:
-        self.conn_stats.update_request_bytes(request_bytes)
-        self.conn_stats.update_response_bytes(response_bytes)
+    def update_stats(self, no_request_bytes: int, no_response_bytes: int) -> None:
+        self.conn_stats.update_request_bytes(no_request_bytes)
+        self.conn_stats.update_response_bytes(no_response_bytes)
 
     @classmethod
     def create(cls, name: str, conn_descr: EndpointConnectionDescriptor) -> RPCEndpoint:
@@ -0,0 +1,55 @@
+import math
+from typing import Dict, Hashable, List, Set, Tuple
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel.
+    Deadlines are hashed into slots of tick length, the wheel spans the max timeout, so a slot holds only the keys
+    expiring in its tick. Schedule and cancel are O(1), advancing the wheel is O(elapsed ticks + expired keys).
+    Not thread-safe, the owner must synchronize calls.
+    """
+
+    def __init__(self, max_timeout: float, tick: float = 1.0) -> None:
+        self.tick = tick
+        self.num_slots = math.ceil(max_timeout / tick) + 1
+        self.slots: List[Set[Hashable]] = [set() for _ in range(self.num_slots)]
+        self.key_slots: Dict[Hashable, Tuple[int, float]] = {}  # key -> (slot index, deadline)
+        self.current_tick = None
+
+    def __len__(self) -> int:
+        return len(self.key_slots)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Schedules the key to expire at the deadline, replaces the previous deadline of the key"""
+        self.cancel(key)
+        slot = int(deadline // self.tick) % self.num_slots
+        self.slots[slot].add(key)
+        self.key_slots[key] = (slot, deadline)
+
+    def cancel(self, key: Hashable) -> None:
+        entry = self.key_slots.pop(key, None)
+        if entry is not None:
+            self.slots[entry[0]].discard(key)
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Removes and returns the keys with deadlines up to now"""
+        now_tick = int(now // self.tick)
+        if self.current_tick is None:
+            self.current_tick = now_tick - self.num_slots + 1
+        # a whole turn covers all the slots
+        first_tick = max(self.current_tick, now_tick - self.num_slots + 1)
+
+        expired = []
+        for tick in range(first_tick, now_tick + 1):
+            slot = self.slots[tick % self.num_slots]
+            if not slot:
+                continue
+            for key in [key for key in slot if self.key_slots[key][1] <= now]:  # later deadlines stay in the slot
+                slot.discard(key)
+                del self.key_slots[key]
+                expired.append(key)
+
+        # the current tick is visited again, it may still hold keys expiring later in this tick
+        self.current_tick = now_tick
+        return expired
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from web3pi_proxy.core.interfaces.rpcrequest import RequestReaderMiddleware
 from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
 from web3pi_proxy.core.sockets.clientsocket import ClientSocket
@@ -21,16 +23,32 @@ class AuthRequestReader(RequestReaderMiddleware):
         self.auth = client_permissions
         self.next_reader = next_reader
 
-    def read_request(
-        self, cs: ClientSocket, req: RPCRequest
-    ) -> RequestReaderMiddleware.ReturnType:
+    def authorize(self, req: RPCRequest) -> Optional[bytes]:
         if not req.user_api_key:
             if Config.MODE != ProxyMode.SIM:
                 logger.error("No user API key supplied.")
-                return self.failure(ErrorResponses.unauthorized_invalid_API_key(), req)
+                return ErrorResponses.unauthorized_invalid_API_key()
         elif not self.auth.is_authorized(req.user_api_key):
             logger.error("User API key unauthorized: `%s`", req.user_api_key)
-            return self.failure(ErrorResponses.unauthorized_invalid_API_key(), req)
+            return ErrorResponses.unauthorized_invalid_API_key()
+
+        return None
+
+    def validate_head(self, req: RPCRequest) -> Optional[bytes]:
+        # the API key is in the URL, unauthorized requests are rejected before their body is read
+        error = self.authorize(req)
+        if error is not None:
+            return error
+
+        return self.next_reader.validate_head(req)
+
+    def read_request(
+        self, cs: ClientSocket, req: RPCRequest
+    ) -> RequestReaderMiddleware.ReturnType:
+        if not req.head_validated:
+            error = self.authorize(req)
+            if error is not None:
+                return self.failure(error, req)
 
         return self.next_reader.read_request(cs, req)
 
@@ -17,12 +17,23 @@ class AcceptMethodRequestReader(RequestReaderMiddleware):
     def read_request(
         self, cs: ClientSocket, req: RPCRequest
     ) -> RequestReaderMiddleware.ReturnType:
+        if req.batch is not None:
+            self.__accept_batch(req)
+        elif not self.__accept_call(req):
+            return self.failure(ErrorResponses.forbidden_payment_required(req.id), req)
+
+        if self.next_reader:
+            return self.next_reader.read_request(cs, req)
+
+        return self.success(req)
+
+    def __accept_call(self, req: RPCRequest) -> bool:
         if Config.MODE == ProxyMode.SIM:
             req.priority = 0
             req.constant_pool = None
         else:
             if not self.call_acceptor.is_allowed(req.user_api_key, req.method):
-                return self.failure(ErrorResponses.forbidden_payment_required(req.id), req)
+                return False
 
             user_priority = self.call_acceptor.get_call_priority(
                 req.user_api_key, req.method
@@ -31,10 +42,13 @@ class AcceptMethodRequestReader(RequestReaderMiddleware):
             user_constant_pool = self.call_acceptor.get_user_constant_pool(req.user_api_key)
             req.constant_pool = user_constant_pool
 
-        if self.next_reader:
-            return self.next_reader.read_request(cs, req)
+        return True
 
-        return self.success(req)
+    def __accept_batch(self, req: RPCRequest) -> None:
+        """Every call of the batch is accepted individually, the rejected calls get an error response"""
+        for element in req.batch:
+            if element.response is None and not self.__accept_call(element):
+                element.response = ErrorResponses.payment_required_object(element.id)
 
     def __str__(self):
         if self.next_reader:
@@ -1,18 +1,41 @@
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Deque, FrozenSet, List, Optional
+
 from httptools import HttpParserError, HttpRequestParser
 
 from web3pi_proxy.config.conf import Config
 from web3pi_proxy.core.interfaces.rpcrequest import RequestReaderMiddleware
 from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
 from web3pi_proxy.core.sockets.clientsocket import ClientSocket
+from web3pi_proxy.core.utilhttp.compression import GZIP, negotiate_encoding
 from web3pi_proxy.core.utilhttp.errors import ErrorResponses
 from web3pi_proxy.utils.logger import get_logger
 
 
+@lru_cache
+def parse_header_allowlist(header_names: str) -> Optional[FrozenSet[bytes]]:
+    """Parses a comma separated list of header names, None (all headers allowed) for an empty list"""
+    names = frozenset(name.strip().lower().encode() for name in header_names.split(",") if name.strip())
+    if not names:
+        return None
+    return names | {b"content-type", b"content-length"}  # required to forward the body
+
+
 class HttpRequestParserListener:
+    """
+    Collects the request from the parser callbacks.
+    Headers and body arrive in fragments, they are collected in lists and joined once the message is complete.
+    Only the headers in forwarded_headers (lowercase names, None for all) are forwarded to the endpoints.
+    """
 
-    def __init__(self, req: RPCRequest) -> None:
+    def __init__(self, req: RPCRequest, forwarded_headers: Optional[FrozenSet[bytes]] = None) -> None:
         self.req = req
-        req.headers = b""
+        self.forwarded_headers = forwarded_headers
+        self.header_parts: List[bytes] = []
+        self.body_parts: List[bytes] = []
+        self.chunked = False
         self.need_more_data = True
 
     def on_url(self, url: bytes):
@@ -40,17 +63,213 @@ class HttpRequestParserListener:
             )  # TODO is value already trimmed? TODO value is case sensitive?
         elif name_lower == b"origin":
             self.req.cors_origin = value
-        else:
-            self.req.headers = self.req.headers + name + b": " + value + b"\r\n"
+        elif name_lower == b"transfer-encoding":
+            self.chunked = True  # the body is decoded by the parser, it is forwarded with Content-Length
+        elif name_lower == b"accept-encoding" and Config.RESPONSE_COMPRESSION_ENABLED:
+            self.req.response_encoding = negotiate_encoding(value)  # the proxy negotiates with the endpoints itself
+        elif self.forwarded_headers is None or name_lower in self.forwarded_headers:
+            self.header_parts.extend((name, b": ", value, b"\r\n"))
 
     def on_body(self, body: bytes):
-        self.req.content = body
-        self.req.content_len = len(body)
+        self.body_parts.append(body)
 
     def on_message_complete(self):
+        if self.body_parts:
+            body = self.body_parts[0] if len(self.body_parts) == 1 else b"".join(self.body_parts)
+            self.req.content = body
+            self.req.content_len = len(body)
+        if self.chunked:
+            self.header_parts.append(b"Content-Length: %d\r\n" % max(self.req.content_len, 0))
+        if self.req.response_encoding == GZIP and Config.UPSTREAM_COMPRESSION_ENABLED:
+            self.header_parts.append(b"Accept-Encoding: gzip\r\n")  # passed through to the client untouched
+        self.req.headers = b"".join(self.header_parts)
         self.need_more_data = False
 
 
+class RequestRejected(Exception):
+    """Raised from the parser callbacks to stop reading a request, the response is returned to the client"""
+
+    def __init__(self, response: bytes) -> None:
+        super().__init__()
+        self.response = response
+
+
+class PipelinedRequestParserListener(HttpRequestParserListener):
+    """
+    Starts a new request on every message, so a single parser can read consecutive (pipelined) requests.
+    Enforces the request size limits and validates the request head before its body is read.
+    """
+
+    def __init__(self, stream: "RequestStream") -> None:
+        super().__init__(RPCRequest(), stream.forwarded_headers)
+        self.stream = stream
+        self.header_size = 0
+        self.content_length = None
+        self.body_size = 0
+
+    def on_message_begin(self):
+        self.req = self.stream.take_spare_request()
+        self.header_parts = []
+        self.body_parts = []
+        self.chunked = False
+        self.need_more_data = True
+        self.header_size = 0
+        self.content_length = None
+        self.body_size = 0
+        self.stream.message_begin()
+
+    def __add_header_size(self, size: int) -> None:
+        self.header_size += size
+        if self.header_size > self.stream.max_header_size:
+            raise RequestRejected(ErrorResponses.http_request_header_fields_too_large())
+
+    def on_url(self, url: bytes):
+        self.__add_header_size(len(url))
+        super().on_url(url)
+
+    def on_header(self, name: bytes, value: bytes):
+        self.__add_header_size(len(name) + len(value) + 4)
+        if name.lower() == b"content-length":
+            try:
+                self.content_length = int(value)
+            except ValueError:
+                pass  # the parser rejects it
+        super().on_header(name, value)
+
+    def on_headers_complete(self):
+        self.req.http_method = self.stream.parser.get_method()
+        if self.content_length is not None and self.content_length > self.stream.max_body_size:
+            raise RequestRejected(ErrorResponses.http_payload_too_large())
+        if self.stream.defer_head_validation:
+            self.stream.unvalidated.append(self.req)
+        else:
+            error = self.stream.validate_head(self.req)
+            if error is not None:
+                raise RequestRejected(error)
+            self.req.head_validated = True
+        self.stream.headers_complete()
+
+    def on_body(self, body: bytes):
+        self.body_size += len(body)
+        if self.body_size > self.stream.max_body_size:  # chunked bodies have no Content-Length
+            raise RequestRejected(ErrorResponses.http_payload_too_large())
+        super().on_body(body)
+
+    def on_message_complete(self):
+        super().on_message_complete()
+        self.req.http_method = self.stream.parser.get_method()
+        self.stream.completed.append(self.req)
+        self.stream.message_complete()
+
+
+class RequestStream:
+    """
+    Requests read from a single client connection.
+    The parser is kept between the requests, so the bytes received after a request are not lost:
+    requests pipelined by the client are queued in the order of arrival and the incomplete one waits for more data.
+    Reading of the request head and body is limited by deadlines, see read_timeout.
+    Handled requests are returned with recycle, the request objects are reused for the next requests.
+    With defer_head_validation the heads are not validated by the parser, they are queued in unvalidated and the reader
+    validates them with validate_unvalidated before reading more data, e.g. off the event loop.
+    """
+
+    __logger = get_logger("RequestStream")
+
+    MAX_FREE_REQUESTS = 4
+
+    def __init__(
+        self,
+        head_validator: Optional[Callable[[RPCRequest], Optional[bytes]]] = None,
+        header_timeout: float = Config.REQUEST_HEADER_TIMEOUT,
+        body_timeout: float = Config.REQUEST_BODY_TIMEOUT,
+        max_header_size: int = Config.MAX_REQUEST_HEADER_SIZE,
+        max_body_size: int = Config.MAX_REQUEST_BODY_SIZE,
+        forwarded_headers: str = Config.FORWARDED_REQUEST_HEADERS,
+        defer_head_validation: bool = False,
+    ) -> None:
+        self.completed: Deque[RPCRequest] = deque()
+        self.defer_head_validation = defer_head_validation
+        self.unvalidated: Deque[RPCRequest] = deque()
+        self.spare: Optional[RPCRequest] = None
+        self.free: List[RPCRequest] = []
+        self.error: Optional[bytes] = None
+        self.head_validator = head_validator
+        self.header_timeout = header_timeout
+        self.body_timeout = body_timeout
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.forwarded_headers = parse_header_allowlist(forwarded_headers)
+        self.deadline = None
+        self.parser = HttpRequestParser(PipelinedRequestParserListener(self))
+
+    def take_spare_request(self) -> RPCRequest:
+        req = self.spare
+        if req is not None:
+            self.spare = None
+            return req
+        return self.free.pop() if self.free else RPCRequest()
+
+    def recycle(self, req: RPCRequest) -> None:
+        """Returns a handled request for reuse, it must not be used by the caller anymore"""
+        if len(self.free) < self.MAX_FREE_REQUESTS:
+            req.reset()
+            self.free.append(req)
+
+    def has_completed(self) -> bool:
+        return len(self.completed) > 0
+
+    def validate_head(self, req: RPCRequest) -> Optional[bytes]:
+        return self.head_validator(req) if self.head_validator else None
+
+    def validate_unvalidated(self) -> None:
+        """Validates the queued heads, see defer_head_validation. A rejected request is dropped with the rest of
+        the stream, like a request rejected by the parser."""
+        while self.unvalidated:
+            req = self.unvalidated.popleft()
+            error = self.validate_head(req)
+            if error is not None:
+                self.unvalidated.clear()
+                completed = deque()  # the requests before the rejected one are still handled
+                for completed_req in self.completed:
+                    if completed_req is req:
+                        break
+                    completed.append(completed_req)
+                self.completed = completed
+                self.error = error
+                return
+            req.head_validated = True
+
+    def message_begin(self) -> None:
+        self.deadline = time.monotonic() + self.header_timeout
+
+    def headers_complete(self) -> None:
+        self.deadline = time.monotonic() + self.body_timeout
+
+    def message_complete(self) -> None:
+        self.deadline = None
+
+    def is_reading(self) -> bool:
+        """Whether a request is partially read"""
+        return self.deadline is not None
+
+    def read_timeout(self, max_timeout: float) -> float:
+        """Returns the time left for reading the current request, but at most max_timeout"""
+        if self.deadline is None:
+            return max_timeout
+        return max(min(max_timeout, self.deadline - time.monotonic()), 0.0)
+
+    def feed_data(self, data: bytes) -> None:
+        """Parses the data, the requests completed before a parser error are still queued"""
+        try:
+            self.parser.feed_data(data)
+        except HttpParserError as error:
+            if isinstance(error.__context__, RequestRejected):
+                self.error = error.__context__.response
+            else:
+                self.__logger.error(error)
+                self.error = ErrorResponses.http_bad_request()
+
+
 class RequestReader(RequestReaderMiddleware):
     __logger = get_logger("RequestReader")
 
@@ -62,14 +281,22 @@ class RequestReader(RequestReaderMiddleware):
     ) -> RequestReaderMiddleware.ReturnType:
         buf_size = Config.DEFAULT_RECV_BUF_SIZE
 
-        request_listener = HttpRequestParserListener(req)
-        request_parser = HttpRequestParser(request_listener)
+        if cs.request_stream is None:
+            cs.request_stream = RequestStream(self.validate_head)
+        request_stream: RequestStream = cs.request_stream
+        request_stream.spare = req
 
         try:
-            while request_listener.need_more_data:
-                if not cs.is_ready_read(
-                    timeout=0.1
-                ):  # TODO total timeout for request reading, TODO parametrization
+            while not request_stream.has_completed():
+                if request_stream.error is not None:
+                    req.keep_alive = False  # the rest of the request is not read
+                    return self.failure(request_stream.error, req)
+                timeout = request_stream.read_timeout(0.1)  # TODO parametrization of the time between packets
+                if timeout <= 0:
+                    self.__logger.warning("client request read deadline exceeded")
+                    req.keep_alive = False
+                    return None, None
+                if not cs.is_ready_read(timeout=timeout):
 
                     self.__logger.warning("client socket read timeout")
                     req.keep_alive = False  # just in case
@@ -79,18 +306,23 @@ class RequestReader(RequestReaderMiddleware):
                     self.__logger.debug("client socket closed")
                     req.keep_alive = False  # just in case
                     return None, None
-                request_parser.feed_data(data)
-        except HttpParserError as error:
-            self.__logger.error(error)
-            req.keep_alive = False
-            return self.failure(ErrorResponses.http_bad_request(), req)
+                request_stream.feed_data(data)
         except IOError:
             self.__logger.error("IOError")
             req.keep_alive = False
             return None, None
 
-        req.http_method = request_parser.get_method()
+        return self.accept_request(cs, request_stream.completed.popleft())
 
+    def validate_head(self, req: RPCRequest) -> Optional[bytes]:
+        if req.http_method == b"OPTIONS":  # CORS preflights are answered by the proxy without authorization
+            return None
+        return super().validate_head(req)
+
+    def accept_request(
+        self, cs: ClientSocket, req: RPCRequest
+    ) -> RequestReaderMiddleware.ReturnType:
+        """Validates an already parsed HTTP request and passes it down the middleware chain"""
         if req.http_method == b"POST":
             if req.content is None or req.content_len == 0 or len(req.content.strip()) == 0:
                 return self.failure(ErrorResponses.http_bad_request(), req)
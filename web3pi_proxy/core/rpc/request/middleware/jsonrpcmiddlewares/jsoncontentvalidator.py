@@ -3,10 +3,10 @@ import json
 from web3pi_proxy.config.conf import Config
 from web3pi_proxy.core.interfaces.rpcrequest import RequestReaderMiddleware
 from web3pi_proxy.core.rpc.request.middleware.jsonrpcmiddlewares.validation.errors import (
+    InvalidRequestError,
     JSONRPCError,
 )
 from web3pi_proxy.core.rpc.request.middleware.jsonrpcmiddlewares.validation.validators import (
-    JSONRPCContentValidator,
     JSONRPCFormatValidator,
     JSONRPCMethodValidator,
 )
@@ -19,9 +19,9 @@ from web3pi_proxy.utils.logger import get_logger
 class AcceptJSONRPCContentReader(RequestReaderMiddleware):
     VALIDATORS = [
         JSONRPCFormatValidator,
-        JSONRPCContentValidator,
         JSONRPCMethodValidator,
     ]
+    BATCH_ELEMENT_HEADERS = b"Content-Type: application/json\r\nContent-Length: %d\r\n"
     __logger = get_logger("AcceptJSONRPCContentReader")
 
     def __init__(self, next_reader: RequestReaderMiddleware = None) -> None:
@@ -30,58 +30,96 @@ class AcceptJSONRPCContentReader(RequestReaderMiddleware):
     def read_request(
         self, cs: ClientSocket, req: RPCRequest
     ) -> RequestReaderMiddleware.ReturnType:
-        if not Config.JSON_RPC_REQUEST_PARSER_ENABLED:
-            method = None
-            id = None
-            for tok in req.content.split(b","):
-                if tok.startswith(b'"id":') or tok.startswith(b' "id":'):
-                    id = str(tok.split(b":")[1][1:-1], "utf-8").replace('"', "").strip()
-                if tok.startswith(b'"method":') or tok.startswith(b' "method":'):
-                    method = (
-                        str(tok.split(b":")[1][1:-1], "utf-8").replace('"', "").strip()
-                    )
-
-            if method is None:
-                return self.failure(
-                    ErrorResponses.bad_request_web3(
-                        -32600, "Missing method field", req.id
-                    ),
-                    req,
-                )
-
-            req.method = method
-            req.id = id
-
-        else:
-            jsonrpc_content = req.content
-
-            try:
-                json_content = json.loads(jsonrpc_content.decode("utf-8"))
-            except:
-                self.__logger.error(f"Request {req} is incorrect JSON format")
+        jsonrpc_content = req.content
+
+        # the content is decoded in a single pass of the json module in both modes, splitting the raw content
+        # misreads commas and colons inside params
+        try:
+            json_content = json.loads(jsonrpc_content.decode("utf-8"))
+        except:
+            self.__logger.error(f"Request {req} is incorrect JSON format")
+            if Config.JSON_RPC_REQUEST_PARSER_ENABLED:
                 return self.failure(ErrorResponses.parse_error(req.id), req)
+            json_content = None
+
+        if type(json_content) is list:
+            return self.__read_batch(cs, req, json_content)
 
-            try:
-                for validator in self.VALIDATORS:
-                    validator.validate(json_content)
-            except JSONRPCError as error:
-                self.__logger.error(f"Request {req} failed with {error}")
-                return self.failure(
-                    ErrorResponses.bad_request_web3(error.code, error.message, req.id),
-                    req,
-                )
-            except:
-                self.__logger.error(f"Internal error while parsing request {req}")
-                return self.failure(ErrorResponses.http_internal_server_error(), req)
-
-            req.method = json_content["method"]
-            req.id = json_content["id"]
+        try:
+            self.__validate(json_content)
+        except JSONRPCError as error:
+            self.__logger.error(f"Request {req} failed with {error}")
+            return self.failure(
+                ErrorResponses.bad_request_web3(error.code, error.message, req.id),
+                req,
+            )
+        except:
+            self.__logger.error(f"Internal error while parsing request {req}")
+            return self.failure(ErrorResponses.http_internal_server_error(), req)
+
+        req.method = json_content["method"]
+        req.id = json_content.get("id")
 
         if self.next_reader:
             return self.next_reader.read_request(cs, req)
 
         return self.success(req)
 
+    def __validate(self, json_content) -> None:
+        """Validates a single call, a request or a call of a batch. With the request parser disabled only the method
+        is required, the content is forwarded as it is."""
+        if Config.JSON_RPC_REQUEST_PARSER_ENABLED:
+            for validator in self.VALIDATORS:
+                validator.validate(json_content)
+        elif type(json_content) is not dict or type(json_content.get("method")) is not str:
+            raise InvalidRequestError("Missing method field")
+
+    def __read_batch(
+        self, cs: ClientSocket, req: RPCRequest, json_content: list
+    ) -> RequestReaderMiddleware.ReturnType:
+        if not json_content:
+            return self.failure(ErrorResponses.bad_request_web3(-32600, "Empty batch"), req)
+        if len(json_content) > Config.MAX_BATCH_SIZE:
+            return self.failure(
+                ErrorResponses.bad_request_web3(-32600, f"Batch exceeds {Config.MAX_BATCH_SIZE} calls"), req
+            )
+
+        req.batch = [self.__create_batch_element(req, element) for element in json_content]
+
+        if self.next_reader:
+            return self.next_reader.read_request(cs, req)
+
+        return self.success(req)
+
+    def __create_batch_element(self, req: RPCRequest, json_content: dict) -> RPCRequest:
+        """Each call of a batch is validated and forwarded separately, invalid calls get an error response"""
+        element = RPCRequest(
+            user_api_key=req.user_api_key,
+            url_path=req.url_path,
+            keep_alive=req.keep_alive,
+            http_method=req.http_method,
+            head_validated=req.head_validated,
+        )
+        if type(json_content) is dict:
+            element.id = json_content.get("id")
+
+        try:
+            self.__validate(json_content)
+        except JSONRPCError as error:
+            self.__logger.error(f"Batch call {json_content} failed with {error}")
+            element.response = ErrorResponses.web3_error_object(error.code, error.message, element.id)
+            return element
+        except:
+            self.__logger.error(f"Internal error while parsing batch call {json_content}")
+            element.response = ErrorResponses.web3_error_object(-32603, "Internal error", element.id)
+            return element
+
+        element.method = json_content["method"]
+        element.content = json.dumps(json_content, separators=(",", ":")).encode("utf-8")
+        element.content_len = len(element.content)
+        element.headers = self.BATCH_ELEMENT_HEADERS % element.content_len
+        return element
+
     def __str__(self):
         if self.next_reader:
             return f"AcceptRPCPayload -> {self.next_reader}"
@@ -0,0 +1,298 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from web3pi_proxy.core.rpc.request.middleware.jsonrpcmiddlewares.validation.conditions import (
+    Condition,
+    Exact,
+    In,
+)
+
+Check = Callable[[Any], bool]
+
+
+class Schema(ABC):
+    """Describes a param value, compiled once into a check function returning whether the value conforms"""
+
+    @abstractmethod
+    def compile(self) -> Check:
+        pass
+
+    @property
+    @abstractmethod
+    def description(self) -> str:
+        pass
+
+
+class Pattern(Schema):
+    def __init__(self, regex: str, description: str) -> None:
+        self.regex = re.compile(regex)
+        self._description = description
+
+    def compile(self) -> Check:
+        fullmatch = self.regex.fullmatch
+        return lambda value: type(value) is str and fullmatch(value) is not None
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+
+class HexData(Pattern):
+    """Hex string of whole bytes, the length is checked apart from the pattern - repeating a group is much slower"""
+
+    def __init__(self, description: str) -> None:
+        super().__init__(r"0x[0-9a-fA-F]*", description)
+
+    def compile(self) -> Check:
+        fullmatch = self.regex.fullmatch
+        return lambda value: type(value) is str and len(value) % 2 == 0 and fullmatch(value) is not None
+
+
+class Tag(Schema):
+    def __init__(self, *tags: str) -> None:
+        self.tags = frozenset(tags)
+
+    def compile(self) -> Check:
+        tags = self.tags
+        return lambda value: type(value) is str and value in tags
+
+    @property
+    def description(self) -> str:
+        return " or ".join(sorted(self.tags))
+
+
+class Boolean(Schema):
+    def compile(self) -> Check:
+        return lambda value: type(value) is bool
+
+    @property
+    def description(self) -> str:
+        return "boolean"
+
+
+class Number(Schema):
+    def __init__(self, minimum: float, maximum: float, integer: bool = False) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.integer = integer
+
+    def compile(self) -> Check:
+        minimum, maximum = self.minimum, self.maximum
+        if self.integer:
+            return lambda value: type(value) is int and minimum <= value <= maximum
+        return lambda value: (type(value) is int or type(value) is float) and minimum <= value <= maximum
+
+    @property
+    def description(self) -> str:
+        return f"{'integer' if self.integer else 'number'} from {self.minimum} to {self.maximum}"
+
+
+class Plain(Schema):
+    """Any value with word keys and scalars, the rule applied to the params of all the methods before the schemas"""
+
+    WORD = re.compile(r"\w+")
+
+    def compile(self) -> Check:
+        fullmatch = self.WORD.fullmatch
+
+        def check(value: Any) -> bool:
+            if type(value) is dict:
+                return all(fullmatch(key) for key in value) and all(map(check, value.values()))
+            if type(value) is list:
+                return all(map(check, value))
+            return fullmatch(str(value)) is not None
+
+        return check
+
+    @property
+    def description(self) -> str:
+        return "word characters"
+
+
+class Nullable(Schema):
+    def __init__(self, schema: Schema) -> None:
+        self.schema = schema
+
+    def compile(self) -> Check:
+        check = self.schema.compile()
+        return lambda value: value is None or check(value)
+
+    @property
+    def description(self) -> str:
+        return f"{self.schema.description} or null"
+
+
+class AnyOf(Schema):
+    def __init__(self, *schemas: Schema, description: Optional[str] = None) -> None:
+        self.schemas = schemas
+        self._description = description
+
+    def compile(self) -> Check:
+        checks = tuple(schema.compile() for schema in self.schemas)
+
+        def check(value: Any) -> bool:
+            for schema_check in checks:
+                if schema_check(value):
+                    return True
+            return False
+
+        return check
+
+    @property
+    def description(self) -> str:
+        return self._description or " or ".join(schema.description for schema in self.schemas)
+
+
+class ListOf(Schema):
+    def __init__(self, schema: Schema) -> None:
+        self.schema = schema
+
+    def compile(self) -> Check:
+        item_check = self.schema.compile()
+        return lambda value: type(value) is list and all(map(item_check, value))
+
+    @property
+    def description(self) -> str:
+        return f"list of {self.schema.description}"
+
+
+class Object(Schema):
+    """
+    Object with known fields, the other fields are accepted as Plain.
+    The fields of the required sequence must be present, at least one of any_of if given.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, Schema],
+        description: str,
+        required: Sequence[str] = (),
+        any_of: Sequence[str] = (),
+    ) -> None:
+        self.fields = fields
+        self._description = description
+        self.required = tuple(required)
+        self.any_of = tuple(any_of)
+
+    def compile(self) -> Check:
+        field_checks = {name: schema.compile() for name, schema in self.fields.items()}
+        other_check = Plain().compile()
+        word = Plain.WORD.fullmatch
+        required = self.required
+        any_of = self.any_of
+
+        def check(value: Any) -> bool:
+            if type(value) is not dict:
+                return False
+            for name, field_value in value.items():
+                field_check = field_checks.get(name)
+                if field_check is None:
+                    if not word(name) or not other_check(field_value):
+                        return False
+                elif not field_check(field_value):
+                    return False
+            for name in required:
+                if name not in value:
+                    return False
+            if any_of:
+                for name in any_of:
+                    if name in value:
+                        return True
+                return False
+            return True
+
+        return check
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+
+class MethodParams:
+    """Schemas of the params of a method, the last num_optional params may be omitted"""
+
+    def __init__(self, *params: Schema, num_optional: int = 0) -> None:
+        self.params = params
+        self.num_optional = num_optional
+
+    @property
+    def count_condition(self) -> Condition:
+        if self.num_optional == 0:
+            return Exact(len(self.params))
+        return In(*range(len(self.params) - self.num_optional, len(self.params) + 1))
+
+    def compile(self) -> Callable[[list], Optional[int]]:
+        """Returns a function checking params of a valid count, it returns the index of the first invalid param"""
+        checks = tuple(param.compile() for param in self.params)
+
+        def check(params: list) -> Optional[int]:
+            for index, value in enumerate(params):
+                if not checks[index](value):
+                    return index
+            return None
+
+        return check
+
+
+# Ethereum JSON-RPC types
+
+HEX = Pattern(r"0x[0-9a-fA-F]*", "hex string")
+QUANTITY = Pattern(r"0x[0-9a-fA-F]{1,64}", "hex quantity")
+DATA = HexData("hex data")
+ADDRESS = Pattern(r"0x[0-9a-fA-F]{40}", "address")
+HASH = Pattern(r"0x[0-9a-fA-F]{64}", "32-byte hash")
+BOOLEAN = Boolean()
+
+BLOCK_TAG = AnyOf(QUANTITY, Tag("earliest", "finalized", "latest", "pending", "safe"), description="block tag")
+BLOCK = AnyOf(
+    BLOCK_TAG,
+    HASH,
+    Object(
+        {"blockNumber": BLOCK_TAG, "blockHash": HASH, "requireCanonical": BOOLEAN},
+        "block object",
+        any_of=("blockNumber", "blockHash"),
+    ),
+    description="block tag, hash or object",
+)
+
+ACCESS_LIST = ListOf(
+    Object({"address": ADDRESS, "storageKeys": ListOf(HASH)}, "access list entry", required=("address",))
+)
+CALL_OBJECT = Object(
+    {
+        "from": Nullable(ADDRESS),
+        "to": Nullable(ADDRESS),
+        "gas": Nullable(QUANTITY),
+        "gasPrice": Nullable(QUANTITY),
+        "maxFeePerGas": Nullable(QUANTITY),
+        "maxPriorityFeePerGas": Nullable(QUANTITY),
+        "maxFeePerBlobGas": Nullable(QUANTITY),
+        "value": Nullable(QUANTITY),
+        "nonce": Nullable(QUANTITY),
+        "type": Nullable(QUANTITY),
+        "chainId": Nullable(QUANTITY),
+        "data": Nullable(DATA),
+        "input": Nullable(DATA),
+        "accessList": Nullable(ACCESS_LIST),
+        "blobVersionedHashes": Nullable(ListOf(HASH)),
+    },
+    "call object",
+)
+
+TOPIC = Nullable(AnyOf(HASH, ListOf(Nullable(HASH))))
+FILTER_OBJECT = Object(
+    {
+        "fromBlock": Nullable(BLOCK_TAG),
+        "toBlock": Nullable(BLOCK_TAG),
+        "blockHash": Nullable(HASH),
+        "address": Nullable(AnyOf(ADDRESS, ListOf(ADDRESS))),
+        "topics": Nullable(ListOf(TOPIC)),
+    },
+    "filter object",
+)
+
+BLOCK_COUNT = AnyOf(QUANTITY, Number(1, 1024, integer=True), description="block count")
+REWARD_PERCENTILES = ListOf(Number(0, 100))
+STORAGE_KEY = QUANTITY
+FILTER_ID = HEX
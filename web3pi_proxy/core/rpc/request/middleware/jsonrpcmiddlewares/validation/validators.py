@@ -12,6 +12,23 @@ from web3pi_proxy.core.rpc.request.middleware.jsonrpcmiddlewares.validation.erro
     InvalidRequestError,
     MethodNotFoundError,
 )
+from web3pi_proxy.core.rpc.request.middleware.jsonrpcmiddlewares.validation.schema import (
+    ADDRESS,
+    BLOCK,
+    BLOCK_COUNT,
+    BLOCK_TAG,
+    BOOLEAN,
+    CALL_OBJECT,
+    DATA,
+    FILTER_ID,
+    FILTER_OBJECT,
+    HASH,
+    QUANTITY,
+    REWARD_PERCENTILES,
+    STORAGE_KEY,
+    ListOf,
+    MethodParams,
+)
 
 
 class JSONValidator(ABC):
@@ -31,9 +48,7 @@ class JSONRPCFormatValidator(JSONValidator):
     @classmethod
     def validate(cls, content: dict) -> None:
         if type(content) != dict:
-            raise InvalidRequestError(
-                f"JSON-RPC request must be an object, batches are not supported"
-            )
+            raise InvalidRequestError(f"JSON-RPC request must be an object")
         for key, condition in cls.RPC_PARAM_CONDITIONS.items():
             if not key in content:
                 if key != "params":
@@ -72,55 +87,62 @@ class JSONRPCContentValidator(JSONValidator):
 
 
 class JSONRPCMethodValidator(JSONValidator):
-    METHOD_PARAM_COUNT_CONDITIONS = {
-        "net_peerCount": Exact(0),
-        "net_listening": Exact(0),
-        "net_version": Exact(0),
-        "web3_clientVersion": Exact(0),
-        "web3_sha3": Exact(1),
-        "eth_protocolVersion": Exact(0),
-        "eth_accounts": Exact(0),
-        "eth_blockNumber": Exact(0),
-        "eth_call": In(1, 2),
-        "eth_chainId": Exact(0),
-        "eth_coinbase": Exact(0),
-        "eth_mining": Exact(0),
-        "eth_hashrate": Exact(0),
-        "eth_createAccessList": In(1, 2),
-        "eth_estimateGas": In(1, 2),
-        "eth_feeHistory": Exact(3),
-        "eth_gasPrice": Exact(0),
-        "eth_getBalance": Exact(2),
-        "eth_getBlockByHash": Exact(2),
-        "eth_getBlockByNumber": Exact(2),
-        "eth_getBlockReceipts": Exact(1),
-        "eth_getBlockTransactionCountByHash": Exact(1),
-        "eth_getBlockTransactionCountByNumber": Exact(1),
-        "eth_getCode": Exact(2),
-        "eth_getFilterChanges": Exact(1),
-        "eth_getFilterLogs": Exact(1),
-        "eth_getLogs": Exact(1),
-        "eth_getProof": Exact(3),
-        "eth_getStorageAt": Exact(3),
-        "eth_getTransactionByBlockHashAndIndex": Exact(2),
-        "eth_getTransactionByBlockNumberAndIndex": Exact(2),
-        "eth_getTransactionByHash": Exact(1),
-        "eth_getTransactionCount": Exact(2),
-        "eth_getTransactionReceipt": Exact(1),
-        "eth_getUncleCountByBlockHash": Exact(1),
-        "eth_getUncleCountByBlockNumber": Exact(1),
-        "eth_getUncleByBlockNumberAndIndex": Exact(2),
-        "eth_getUncleByBlockHashAndIndex": Exact(2),
-        "eth_maxPriorityFeePerGas": Exact(0),
-        "eth_newBlockFilter": Exact(0),
-        "eth_newFilter": Exact(1),
-        "eth_newPendingTransactionFilter": Exact(0),
-        "eth_sendRawTransaction": Exact(1),
-        "eth_sendTransaction": Exact(1),
-        "eth_sign": Exact(2),
-        "eth_signTransaction": Exact(1),
-        "eth_syncing": Exact(0),
-        "eth_uninstallFilter": Exact(1),
+    """Validates the params of the supported methods with their schemas, compiled once into check functions"""
+
+    METHOD_PARAMS = {
+        "net_peerCount": MethodParams(),
+        "net_listening": MethodParams(),
+        "net_version": MethodParams(),
+        "web3_clientVersion": MethodParams(),
+        "web3_sha3": MethodParams(DATA),
+        "eth_protocolVersion": MethodParams(),
+        "eth_accounts": MethodParams(),
+        "eth_blockNumber": MethodParams(),
+        "eth_call": MethodParams(CALL_OBJECT, BLOCK, num_optional=1),
+        "eth_chainId": MethodParams(),
+        "eth_coinbase": MethodParams(),
+        "eth_mining": MethodParams(),
+        "eth_hashrate": MethodParams(),
+        "eth_createAccessList": MethodParams(CALL_OBJECT, BLOCK, num_optional=1),
+        "eth_estimateGas": MethodParams(CALL_OBJECT, BLOCK, num_optional=1),
+        "eth_feeHistory": MethodParams(BLOCK_COUNT, BLOCK_TAG, REWARD_PERCENTILES),
+        "eth_gasPrice": MethodParams(),
+        "eth_getBalance": MethodParams(ADDRESS, BLOCK),
+        "eth_getBlockByHash": MethodParams(HASH, BOOLEAN),
+        "eth_getBlockByNumber": MethodParams(BLOCK_TAG, BOOLEAN),
+        "eth_getBlockReceipts": MethodParams(BLOCK),
+        "eth_getBlockTransactionCountByHash": MethodParams(HASH),
+        "eth_getBlockTransactionCountByNumber": MethodParams(BLOCK_TAG),
+        "eth_getCode": MethodParams(ADDRESS, BLOCK),
+        "eth_getFilterChanges": MethodParams(FILTER_ID),
+        "eth_getFilterLogs": MethodParams(FILTER_ID),
+        "eth_getLogs": MethodParams(FILTER_OBJECT),
+        "eth_getProof": MethodParams(ADDRESS, ListOf(STORAGE_KEY), BLOCK),
+        "eth_getStorageAt": MethodParams(ADDRESS, STORAGE_KEY, BLOCK),
+        "eth_getTransactionByBlockHashAndIndex": MethodParams(HASH, QUANTITY),
+        "eth_getTransactionByBlockNumberAndIndex": MethodParams(BLOCK_TAG, QUANTITY),
+        "eth_getTransactionByHash": MethodParams(HASH),
+        "eth_getTransactionCount": MethodParams(ADDRESS, BLOCK),
+        "eth_getTransactionReceipt": MethodParams(HASH),
+        "eth_getUncleCountByBlockHash": MethodParams(HASH),
+        "eth_getUncleCountByBlockNumber": MethodParams(BLOCK_TAG),
+        "eth_getUncleByBlockNumberAndIndex": MethodParams(BLOCK_TAG, QUANTITY),
+        "eth_getUncleByBlockHashAndIndex": MethodParams(HASH, QUANTITY),
+        "eth_maxPriorityFeePerGas": MethodParams(),
+        "eth_newBlockFilter": MethodParams(),
+        "eth_newFilter": MethodParams(FILTER_OBJECT),
+        "eth_newPendingTransactionFilter": MethodParams(),
+        "eth_sendRawTransaction": MethodParams(DATA),
+        "eth_sendTransaction": MethodParams(CALL_OBJECT),
+        "eth_sign": MethodParams(ADDRESS, DATA),
+        "eth_signTransaction": MethodParams(CALL_OBJECT),
+        "eth_syncing": MethodParams(),
+        "eth_uninstallFilter": MethodParams(FILTER_ID),
+    }
+    # method -> (count condition, check)
+    COMPILED_METHOD_PARAMS = {
+        method_name: (method_params.count_condition, method_params.compile())
+        for method_name, method_params in METHOD_PARAMS.items()
     }
 
     @classmethod
@@ -129,11 +151,21 @@ class JSONRPCMethodValidator(JSONValidator):
         method_params = content.get("params", [])
         params_length = len(method_params)
 
-        method_condition = cls.METHOD_PARAM_COUNT_CONDITIONS.get(method_name)
-        if method_condition is None:
+        compiled = cls.COMPILED_METHOD_PARAMS.get(method_name)
+        if compiled is None:
             raise MethodNotFoundError(f"Unsupported method '{method_name}'")
+        method_condition, check = compiled
         if not method_condition.validate(params_length):
             raise InvalidParamsError(
                 f"Number of parameters for method '{method_name}' {method_condition.description}, "
                 f"but {params_length} were given"
             )
+
+        invalid_index = check(method_params)
+        if invalid_index is not None:
+            # invalid characters are reported the same as before the schemas
+            JSONRPCContentValidator.traverse_and_validate_params(method_params[invalid_index])
+            expected = cls.METHOD_PARAMS[method_name].params[invalid_index].description
+            raise InvalidParamsError(
+                f"Invalid value of parameter {invalid_index} for method '{method_name}', expected {expected}"
+            )
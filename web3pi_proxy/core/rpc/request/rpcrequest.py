@@ -1,42 +1,85 @@
-from dataclasses import dataclass
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 
-@dataclass
 class RPCRequest:
-    user_api_key: Optional[str] = None
-    url_path: Optional[bytearray] = None
-    headers: Optional[bytearray] = None
-    content_len: int = -1
-    content: Optional[bytearray] = None
-    method: str = ""
-    id: Optional[Union[int, str]] = None
-    priority: int = 0
-    constant_pool: Optional[str] = None
-    last_queried_bytes: Optional[bytearray] = None
-    keep_alive: bool = True
-    http_method: Optional[bytearray] = None
-    cors_origin: Optional[bytes] = None
+    """
+    Slotted, so the requests are small and cheap to create.
+    The request objects are reused for consecutive requests of a client connection, see RequestStream.recycle,
+    reset restores the default values.
+    """
 
-    def as_bytearray(
-        self, request_line_1: bytearray, url_context: bytearray, request_line_2: bytearray, host_header: bytearray
-    ) -> bytearray:
-        if url_context:
-            if self.url_path:
-                self.last_queried_bytes = (
-                        request_line_1 + b'/' + url_context + b'/' + self.url_path + request_line_2 + self.headers + host_header + self.content
-                )
-            else:
-                self.last_queried_bytes = (
-                        request_line_1 + b'/' + url_context + request_line_2 + self.headers + host_header + self.content
-                )
-        else:
-            if self.url_path:
-                self.last_queried_bytes = (
-                        request_line_1 + b'/' + self.url_path + request_line_2 + self.headers + host_header + self.content
-                )
-            else:
-                self.last_queried_bytes = (
-                        request_line_1 + b'/' + request_line_2 + self.headers + host_header + self.content
-                )
-        return self.last_queried_bytes
+    __slots__ = (
+        "user_api_key",
+        "url_path",
+        "headers",
+        "content_len",
+        "content",
+        "method",
+        "id",
+        "priority",
+        "constant_pool",
+        "last_queried_size",
+        "keep_alive",
+        "http_method",
+        "cors_origin",
+        "head_validated",
+        "batch",
+        "response",
+        "response_encoding",
+    )
+
+    def __init__(
+        self,
+        user_api_key: Optional[str] = None,
+        url_path: Optional[bytearray] = None,
+        headers: Optional[bytearray] = None,
+        content_len: int = -1,
+        content: Optional[bytearray] = None,
+        method: str = "",
+        id: Optional[Union[int, str]] = None,
+        priority: int = 0,
+        constant_pool: Optional[str] = None,
+        last_queried_size: int = 0,  # number of bytes sent to an endpoint
+        keep_alive: bool = True,
+        http_method: Optional[bytearray] = None,
+        cors_origin: Optional[bytes] = None,
+        head_validated: bool = False,  # request line and headers already passed validate_head of the middlewares
+        batch: Optional[List["RPCRequest"]] = None,  # elements of a batch request, each forwarded separately
+        response: Optional[bytes] = None,  # JSON-RPC response object of a batch element
+        response_encoding: Optional[bytes] = None,  # content coding of the response negotiated with the client
+    ) -> None:
+        self.user_api_key = user_api_key
+        self.url_path = url_path
+        self.headers = headers
+        self.content_len = content_len
+        self.content = content
+        self.method = method
+        self.id = id
+        self.priority = priority
+        self.constant_pool = constant_pool
+        self.last_queried_size = last_queried_size
+        self.keep_alive = keep_alive
+        self.http_method = http_method
+        self.cors_origin = cors_origin
+        self.head_validated = head_validated
+        self.batch = batch
+        self.response = response
+        self.response_encoding = response_encoding
+
+    def reset(self) -> None:
+        """Restores the default values, the payload buffers are released"""
+        self.__init__()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"RPCRequest({fields})"
+
+    def as_segments(
+        self, request_line: bytes, request_line_path_prefix: bytes, request_line_end: bytes, host_header: bytes
+    ) -> List[Union[bytes, bytearray]]:
+        """Returns the request to be sent to an endpoint as a list of buffers, they are not joined into a copy"""
+        if self.url_path:
+            return [
+                request_line_path_prefix, self.url_path, request_line_end, self.headers, host_header, self.content
+            ]
+        return [request_line, self.headers, host_header, self.content]
@@ -0,0 +1,32 @@
+from typing import Optional
+
+from web3pi_proxy.config.conf import Config
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.core.utilhttp.compression import compress
+
+
+class BatchResponses:
+
+    RESPONSE_HEAD_TEMPLATE = (
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: application/json\r\n"
+        b"%b"
+        b"Content-Length: %d\r\n"
+        b"\r\n"
+    )
+
+    ENCODING_HEADERS_TEMPLATE = b"Content-Encoding: %b\r\nVary: Accept-Encoding\r\n"
+
+    @classmethod
+    def batch_response(
+        cls,
+        req: RPCRequest,
+        extra_headers: Optional[bytes] = None,
+        min_compressed_size: int = Config.RESPONSE_COMPRESSION_MIN_SIZE,
+    ) -> bytes:
+        """Response array of a batch request, in the order of the calls"""
+        body = b"[" + b",".join(element.response for element in req.batch) + b"]"
+        if req.response_encoding is not None and len(body) >= min_compressed_size:
+            body = compress(body, req.response_encoding)
+            extra_headers = cls.ENCODING_HEADERS_TEMPLATE % req.response_encoding + (extra_headers or b"")
+        return cls.RESPONSE_HEAD_TEMPLATE % (extra_headers or b"", len(body)) + body
@@ -1,22 +1,44 @@
 from __future__ import annotations
 
+import asyncio
 import errno
-import select
 import socket
 import ssl
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Tuple, Union
 
 from web3pi_proxy.config.conf import Config
+from web3pi_proxy.core.sockets.bufferpool import BufferPool
+from web3pi_proxy.core.sockets.poller import POLLIN, POLLOUT, ReadinessPoller
+from web3pi_proxy.core.sockets.resolver import Resolver, with_port
+from web3pi_proxy.core.sockets.tlsclient import TLSClient
 from web3pi_proxy.utils.logger import get_logger
 
 
 class BaseSocket:
     __logger = get_logger("BaseSocket")
 
-    HOST_IP_MAPPING = {}
+    RESOLVER = Resolver()
+
+    CONNECT_TIMEOUT = 5.0  # TODO parametrize?
+    # total time of connecting to any of the resolved addresses and the TLS handshake, seconds
+    CONNECT_DEADLINE = 2 * CONNECT_TIMEOUT
+
+    RECV_BUFFERS = BufferPool(Config.DEFAULT_RECV_BUF_SIZE, Config.RECV_BUFFER_POOL_SIZE)
+
+    # TLS contexts and sessions of the endpoints by host and port
+    TLS_CLIENTS: Dict[Tuple[str, int], TLSClient] = {}
+    __tls_clients_lock = Lock()
 
     def __init__(self, _socket: socket.socket) -> None:
         self.fd = _socket.fileno()
         self.socket = _socket
+        self.readiness = ReadinessPoller(self.fd)
+        self.handshake_time: Optional[float] = None
+        self.session_reused = False
+        self.tls_client: Optional[TLSClient] = None  # the session is saved to it with the first received data
+        self.recv_buf_size = 0  # SO_RCVBUF set with fit_recv_buf_size, 0 if left to the kernel
 
     def send_all(self, data):
         try:
@@ -24,8 +46,77 @@ class BaseSocket:
         except BrokenPipeError:
             self.__logger.error("Broken pipe while trying to write to a socket.")
 
+    @classmethod
+    def __advance_segments(cls, segments: List[memoryview], num_sent: int) -> None:
+        """Drops the sent bytes from the front of the segments"""
+        while num_sent:
+            if num_sent >= len(segments[0]):
+                num_sent -= len(segments[0])
+                segments.pop(0)
+            else:
+                segments[0] = segments[0][num_sent:]
+                num_sent = 0
+
+    def send_segments(self, segments: List[Union[bytes, bytearray]]) -> int:
+        """Sends the segments one after another with scatter/gather I/O (sendmsg), the segments are not joined.
+        Returns the number of bytes sent."""
+        size = sum(len(segment) for segment in segments)
+        if self.is_ssl():  # ssl sockets do not support sendmsg
+            self.send_all(b"".join(segments))
+            return size
+
+        views = [memoryview(segment) for segment in segments if segment]
+        try:
+            while views:
+                self.__advance_segments(views, self.socket.sendmsg(views))
+        except BrokenPipeError:
+            self.__logger.error("Broken pipe while trying to write to a socket.")
+        return size
+
     def recv(self, buf_size=Config.DEFAULT_RECV_BUF_SIZE):
-        return self.socket.recv(buf_size)
+        data = self.socket.recv(buf_size)
+        if self.tls_client is not None:
+            self.tls_client.save_session(self.socket)
+            self.tls_client = None
+        return data
+
+    def recv_into(self, buffer: bytearray, flags: int = 0) -> int:
+        """Receives data into the buffer, returns the number of bytes received"""
+        num_received = self.socket.recv_into(buffer, len(buffer), flags)
+        if self.tls_client is not None:
+            self.tls_client.save_session(self.socket)
+            self.tls_client = None
+        return num_received
+
+    def fit_recv_buf_size(self, buf_size: int) -> None:
+        """Raises SO_RCVBUF of the socket to hold buf_size bytes, the kernel may cap it"""
+        if buf_size > self.recv_buf_size:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buf_size)
+            self.recv_buf_size = buf_size
+
+    def is_alive(self) -> bool:
+        """Checks an idle connection without blocking. It is dead if the peer closed or reset it, or if the peer sent
+        anything while no request was sent, like an error response sent before closing the connection."""
+        if not self.is_ssl():
+            try:
+                self.socket.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return True
+            except OSError:
+                return False
+            return False
+        if not self.is_ready_read(0):
+            return True
+        self.socket.setblocking(False)
+        try:
+            self.recv(1)
+        except ssl.SSLWantReadError:  # only TLS records were pending, like session tickets
+            return True
+        except OSError:
+            return False
+        finally:
+            self.socket.setblocking(True)
+        return False
 
     def get_peer_name(self):
         return self.socket.getpeername()
@@ -43,50 +134,139 @@ class BaseSocket:
 
         return connected
 
-    def is_ready_read(self, timeout=None):  # TODO something more effective than select
-        s_read, _, _ = select.select([self.socket], [], [], timeout)
+    def is_ready_read(self, timeout=None):
+        # ssl may have already read and decrypted the data, it is not visible on the descriptor
+        if self.is_ssl() and self.socket.pending() > 0:
+            return True
+
+        return self.readiness.wait(POLLIN, timeout)
 
-        return len(s_read) > 0
+    def is_ready_write(self, timeout=None):
+        return self.readiness.wait(POLLOUT, timeout)
 
-    def is_ready_write(self, timeout=None):  # TODO something more effective than select
-        _, s_write, _ = select.select([], [self.socket], [], timeout)
+    def is_ssl(self) -> bool:
+        return isinstance(self.socket, ssl.SSLSocket)
 
-        return len(s_write) > 0
+    def __recv_with_timeout(self, buf_size: int, timeout: float) -> bytes:
+        if not self.is_ready_read(timeout):
+            raise TimeoutError
+        return self.recv(buf_size)
+
+    async def send_all_async(self, data) -> None:
+        """Sends data without blocking the running event loop.
+        The socket stays in blocking mode outside the call, so it can be still used by the threaded code."""
+        loop = asyncio.get_running_loop()
+        if self.is_ssl():  # the event loop socket API does not support ssl sockets
+            await loop.run_in_executor(None, self.socket.sendall, data)
+            return
+        self.socket.setblocking(False)
+        try:
+            await loop.sock_sendall(self.socket, data)
+        finally:
+            self.socket.setblocking(True)
+
+    async def send_segments_async(self, segments: List[Union[bytes, bytearray]]) -> int:
+        """Non-blocking counterpart of send_segments"""
+        loop = asyncio.get_running_loop()
+        if self.is_ssl():
+            return await loop.run_in_executor(None, self.send_segments, segments)
+        size = sum(len(segment) for segment in segments)
+        views = [memoryview(segment) for segment in segments if segment]
+        self.socket.setblocking(False)
+        try:
+            try:
+                self.__advance_segments(views, self.socket.sendmsg(views))
+            except BlockingIOError:
+                pass
+            if views:  # the socket buffer is full, the rest is rarely more than a large request body
+                await loop.sock_sendall(self.socket, b"".join(views))
+        finally:
+            self.socket.setblocking(True)
+        return size
+
+    async def recv_async(self, buf_size: int, timeout: float) -> bytes:
+        """Receives data without blocking the running event loop, raises TimeoutError on timeout"""
+        loop = asyncio.get_running_loop()
+        if self.is_ssl():  # the event loop socket API does not support ssl sockets
+            return await loop.run_in_executor(
+                None, self.__recv_with_timeout, buf_size, timeout
+            )
+        self.socket.setblocking(False)
+        try:
+            return await asyncio.wait_for(loop.sock_recv(self.socket, buf_size), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError
+        finally:
+            self.socket.setblocking(True)
 
     def close(self) -> None:
         self.socket.close()
 
     @classmethod
-    def clear_mapping(cls, host: str) -> None:
-        if host in cls.HOST_IP_MAPPING:
-            cls.HOST_IP_MAPPING.pop(host)
+    def get_tls_client(cls, host: str, port: int) -> TLSClient:
+        with cls.__tls_clients_lock:
+            tls_client = cls.TLS_CLIENTS.get((host, port))
+            if tls_client is None:
+                tls_client = cls.TLS_CLIENTS[(host, port)] = TLSClient(host)
+            return tls_client
+
+    @classmethod
+    def create_unix_socket(cls, path: str) -> BaseSocket:
+        """Connects to the IPC socket of a node on the same machine, there is no TCP and TLS overhead"""
+        s_dst = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s_dst.settimeout(cls.CONNECT_TIMEOUT)
+        try:
+            s_dst.connect(path)
+        except OSError:
+            s_dst.close()
+            raise
+        s_dst.settimeout(None)
+        return BaseSocket(s_dst)
 
     # FIXME: this call can fail (wrong address, endpoint no ready -> failed connection)
     @classmethod
     def create_socket(cls, host: str, port: int, is_ssl: bool) -> BaseSocket:
-        # This hack allows multiple connections to a single endpoint (using mdns requires waiting some time between
-        # sockets are successfully processed). Connecting with directly specified IP address solves this problem.
-        # FIXME: it may fail for remote endpoints (such as infura), as there is no guarantee that the IP stays
-        # FIXME: unchanged
-        if host not in cls.HOST_IP_MAPPING:
-            cls.HOST_IP_MAPPING[host] = socket.gethostbyname(host)
+        # Connecting with a resolved IP address allows multiple connections to a single endpoint (using mdns requires
+        # waiting some time between sockets are successfully processed). The addresses are tried one after another.
+        error = None
+        deadline = time.monotonic() + cls.CONNECT_DEADLINE
+        for family, address in cls.RESOLVER.resolve(host):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            cls.__logger.debug("Creating socket")
+            s_dst = socket.socket(family, socket.SOCK_STREAM)
+            cls.__logger.debug("Connecting socket")
 
-        host_ip = cls.HOST_IP_MAPPING[host]
+            s_dst.settimeout(min(cls.CONNECT_TIMEOUT, remaining))
+            try:
+                s_dst.connect(with_port(address, port))
+            except OSError as e:
+                s_dst.close()
+                cls.RESOLVER.report_failure((family, address))
+                error = e
+                continue
+            cls.RESOLVER.report_success((family, address))
 
-        cls.__logger.debug("Creating socket")
-        s_dst = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        cls.__logger.debug("Connecting socket")
-
-        s_dst.settimeout(5.0)  # TODO parametrize?
-        s_dst.connect((host_ip, port))
-        s_dst.settimeout(None)
+            cls.__logger.debug("Finished connecting socket")
 
-        cls.__logger.debug("Finished connecting socket")
+            if not is_ssl:
+                s_dst.settimeout(None)
+                return BaseSocket(s_dst)
 
-        if is_ssl:
-            context = ssl.create_default_context()
-            s_dst = context.wrap_socket(s_dst, server_hostname=host)
-
-        res = BaseSocket(s_dst)
-
-        return res
+            tls_client = cls.get_tls_client(host, port)
+            # the handshake is bounded by the rest of the deadline, an endpoint which accepts and does not answer
+            # would block the connecting thread forever otherwise
+            s_dst.settimeout(max(deadline - time.monotonic(), 0.001))
+            try:
+                s_dst, handshake_time = tls_client.wrap_socket(s_dst)
+            except OSError:
+                s_dst.close()
+                raise
+            s_dst.settimeout(None)
+            res = BaseSocket(s_dst)
+            res.handshake_time = handshake_time
+            res.session_reused = s_dst.session_reused
+            res.tls_client = tls_client
+            return res
+        raise error or TimeoutError("Connecting to the endpoint timed out")
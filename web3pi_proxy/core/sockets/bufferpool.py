@@ -0,0 +1,34 @@
+from queue import Empty, SimpleQueue
+from typing import Dict, Optional
+
+
+class BufferPool:
+    """
+    Receive buffers reused by the connections, data is received into them with recv_into instead of a new bytes
+    object per recv. A buffer is owned by a single receiving loop between acquire and release.
+    The buffers are kept by size, a size class larger than buf_size keeps proportionally fewer buffers.
+    """
+
+    def __init__(self, buf_size: int, max_buffers: int) -> None:
+        self.buf_size = buf_size
+        self.max_buffers = max_buffers
+        self.buffers: Dict[int, SimpleQueue[bytearray]] = {}
+
+    def acquire(self, buf_size: Optional[int] = None) -> bytearray:
+        buf_size = buf_size or self.buf_size
+        buffers = self.buffers.get(buf_size)
+        if buffers is not None:
+            try:
+                return buffers.get_nowait()
+            except Empty:
+                pass
+        return bytearray(buf_size)
+
+    def release(self, buffer: bytearray) -> None:
+        buf_size = len(buffer)
+        buffers = self.buffers.get(buf_size)
+        if buffers is None:
+            buffers = self.buffers.setdefault(buf_size, SimpleQueue())
+        # more buffers than receiving loops at once are not kept
+        if buffers.qsize() < max(1, self.max_buffers * self.buf_size // buf_size):
+            buffers.put(buffer)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import socket
+
 from web3pi_proxy.config.conf import Config
 from web3pi_proxy.core.sockets.basesocket import BaseSocket
 
@@ -8,8 +10,13 @@ class ClientSocket(BaseSocket):
 
     def __init__(self, _socket) -> None:
         super().__init__(_socket)
+        if _socket.family != socket.AF_UNIX:
+            # the responses are sent in whole parts, Nagle's algorithm would only hold back their last segment
+            # until the client acks the previous one, so it is off for all the client connections
+            _socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         self.rfile = _socket.makefile("rb", -1)
+        self.request_stream = None  # requests read from the connection, set by RequestReader
 
     def recv_discard_data(self) -> None:
         ready_read = self.is_ready_read()
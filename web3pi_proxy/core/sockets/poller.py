@@ -1,5 +1,5 @@
 import select
-from typing import Protocol, List, Tuple, TypeAlias
+from typing import Iterable, Optional, Protocol, List, Tuple, TypeAlias
 
 POLLIN = 0x0001
 POLLPRI = 0x0002
@@ -35,3 +35,37 @@ def get_poller() -> Poller:
         return select.epoll()
     except AttributeError:
         return select.poll()
+
+
+def to_poll_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Converts select-like timeout in seconds (None blocks) to poll timeout in milliseconds"""
+    return None if timeout is None else timeout * 1000
+
+
+def poll_ready(fds: Iterable[FileDescriptorLike], eventmask: int, timeout: Optional[float] = None) -> List[int]:
+    """Replacement of select.select for a group of descriptors, works with fd numbers above FD_SETSIZE"""
+    poller = select.poll()
+    for fd in fds:
+        poller.register(fd, eventmask)
+
+    return [fd for fd, _ in poller.poll(to_poll_timeout(timeout))]
+
+
+class ReadinessPoller:
+    """
+    Readiness check of a single descriptor. Unlike select.select it does not fail for fd numbers above FD_SETSIZE
+    and its cost does not depend on the fd number. The poll object is kept, so there is no setup on each check.
+    """
+
+    def __init__(self, fd: FileDescriptorLike) -> None:
+        self.poller = select.poll()
+        self.fd = fd
+        self.eventmask = 0
+
+    def wait(self, eventmask: int, timeout: Optional[float] = None) -> bool:
+        if eventmask != self.eventmask:
+            self.poller.register(self.fd, eventmask)  # modifies the mask if already registered
+            self.eventmask = eventmask
+
+        # POLLHUP and POLLERR are reported as ready too, the following socket call returns the error
+        return len(self.poller.poll(to_poll_timeout(timeout))) > 0
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import ipaddress
+import socket
+import time
+from dataclasses import dataclass
+from queue import SimpleQueue
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, Optional, Tuple
+
+from web3pi_proxy.config.conf import Config
+from web3pi_proxy.utils.logger import get_logger
+
+# socket family and address of a host, the port of the address is not used
+Address = Tuple[int, tuple]
+# returns the addresses of a host and the number of seconds they may be cached for
+Lookup = Callable[[str], Tuple[List[Address], float]]
+
+
+def system_lookup(host: str) -> Tuple[List[Address], float]:
+    """Resolves A and AAAA records with the system resolver, it does not report TTLs so DNS_CACHE_TTL is used"""
+    addresses = []
+    for family, _, _, _, address in socket.getaddrinfo(host, 0, type=socket.SOCK_STREAM):
+        if (family, address) not in addresses:
+            addresses.append((family, address))
+    return addresses, Config.DNS_CACHE_TTL
+
+
+def with_port(address: tuple, port: int) -> tuple:
+    """Socket address to connect to, IPv6 addresses keep the flow info and scope id"""
+    return (address[0], port) + address[2:]
+
+
+@dataclass
+class HostRecord:
+    addresses: List[Address]
+    expires_at: float
+    next_index: int = 0
+    refreshing: bool = False
+
+
+class Resolver:
+    """
+    Resolves endpoint hosts and caches all their addresses until the TTL of the lookup expires.
+    Only the first resolution of a host waits for the lookup, the hosts of the endpoints are resolved in advance.
+    An expired record is still used while it is refreshed in the background, also when the refresh fails.
+    Consecutive resolutions rotate the addresses (round-robin), the addresses failing to connect are tried last.
+    """
+
+    def __init__(
+        self,
+        lookup: Lookup = system_lookup,
+        failure_backoff: float = Config.DNS_FAILURE_BACKOFF,
+    ) -> None:
+        self.lookup = lookup
+        self.failure_backoff = failure_backoff
+        self.__records: Dict[str, HostRecord] = {}
+        self.__pending: Dict[str, Event] = {}  # the first lookups of the hosts in progress
+        self.__failed_until: Dict[tuple, float] = {}
+        self.__lock = Lock()
+        self.__refresh_queue: SimpleQueue[str] = SimpleQueue()
+        self.__refresh_thread: Optional[Thread] = None
+        self.__logger = get_logger("Resolver")
+
+    @staticmethod
+    def __ip_literal(host: str) -> Optional[Address]:
+        try:
+            ip = ipaddress.ip_address(host)
+        except ValueError:
+            return None
+        if ip.version == 6:
+            return socket.AF_INET6, (host, 0, 0, 0)
+        return socket.AF_INET, (host, 0)
+
+    def __store(self, host: str, addresses: List[Address], ttl: float, next_index: int = 0) -> HostRecord:
+        record = HostRecord(addresses, time.monotonic() + ttl, next_index % len(addresses))
+        with self.__lock:
+            self.__records[host] = record
+        return record
+
+    def __first_lookup(self, host: str) -> HostRecord:
+        with self.__lock:
+            record = self.__records.get(host)
+            if record is not None:
+                return record
+            pending = self.__pending.get(host)
+            if pending is None:
+                self.__pending[host] = Event()
+        if pending is not None:  # the host is being resolved by another thread
+            pending.wait()
+            with self.__lock:
+                record = self.__records.get(host)
+            if record is not None:
+                return record
+            return self.__first_lookup(host)
+
+        try:
+            addresses, ttl = self.lookup(host)
+            if not addresses:
+                raise socket.gaierror(socket.EAI_NONAME, f"No addresses of host {host}")
+            return self.__store(host, addresses, ttl)
+        finally:
+            with self.__lock:
+                self.__pending.pop(host).set()
+
+    def __start_refresh(self, host: str) -> None:
+        self.__refresh_queue.put(host)
+        with self.__lock:
+            if self.__refresh_thread is None:
+                self.__refresh_thread = Thread(target=self.__run_refresh_thread, daemon=True)
+                self.__refresh_thread.start()
+
+    def __run_refresh_thread(self) -> None:
+        while True:
+            host = self.__refresh_queue.get()
+            with self.__lock:
+                record = self.__records.get(host)
+            try:
+                if record is None:
+                    self.__first_lookup(host)
+                    continue
+                addresses, ttl = self.lookup(host)
+                if not addresses:
+                    raise socket.gaierror(socket.EAI_NONAME, f"No addresses of host {host}")
+                self.__store(host, addresses, ttl, record.next_index)
+            except Exception as error:
+                self.__logger.warning(f"Failed to resolve host {host}: {error}")
+                if record is not None:  # the known addresses are used until the next attempt
+                    with self.__lock:
+                        record.expires_at = time.monotonic() + self.failure_backoff
+                        record.refreshing = False
+
+    def prefetch(self, host: str) -> None:
+        """Resolves the host in the background, if it is not resolved yet"""
+        if self.__ip_literal(host) is not None:
+            return
+        with self.__lock:
+            if host in self.__records:
+                return
+        self.__start_refresh(host)
+
+    def resolve(self, host: str) -> List[Address]:
+        """Returns the addresses of the host in the order they should be tried, raises OSError if it is unknown"""
+        literal = self.__ip_literal(host)
+        if literal is not None:
+            return [literal]
+
+        with self.__lock:
+            record = self.__records.get(host)
+        if record is None:
+            record = self.__first_lookup(host)
+
+        now = time.monotonic()
+        with self.__lock:
+            if record.expires_at <= now and not record.refreshing:
+                record.refreshing = True
+                refresh = True
+            else:
+                refresh = False
+            start = record.next_index
+            record.next_index = (start + 1) % len(record.addresses)
+            addresses = record.addresses[start:] + record.addresses[:start]
+            if self.__failed_until:
+                addresses.sort(key=lambda address: self.__failed_until.get(address[1], 0) > now)
+        if refresh:
+            self.__start_refresh(host)
+        return addresses
+
+    def report_failure(self, address: Address) -> None:
+        """The address is tried after the other addresses of its host for failure_backoff seconds"""
+        with self.__lock:
+            self.__failed_until[address[1]] = time.monotonic() + self.failure_backoff
+
+    def report_success(self, address: Address) -> None:
+        if self.__failed_until:
+            with self.__lock:
+                self.__failed_until.pop(address[1], None)
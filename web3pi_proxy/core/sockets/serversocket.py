@@ -1,18 +1,20 @@
 from __future__ import annotations
 
 import logging
-import select
 import socket
 import ssl
+from typing import List
 
 from web3pi_proxy.config.conf import Config
 from web3pi_proxy.core.sockets.clientsocket import ClientSocket
+from web3pi_proxy.core.sockets.poller import POLLIN, ReadinessPoller
 
 
 class ServerSocket:
 
     def __init__(self, _socket: socket.socket) -> None:
         self.socket = _socket
+        self.readiness = ReadinessPoller(_socket.fileno())
 
     def close(self) -> None:
         self.socket.close()
@@ -20,8 +22,7 @@ class ServerSocket:
     def accept(self, timeout: float | None = None) -> ClientSocket:
         res = None
 
-        s_read, _, _ = select.select([self.socket], [], [], timeout)
-        if len(s_read) > 0:
+        if self.readiness.wait(POLLIN, timeout):
             try:
                 s_src, _ = self.socket.accept()
                 res = ClientSocket.from_socket(s_src)
@@ -42,6 +43,29 @@ class ServerSocket:
 
         return res
 
+    def accept_awaiting_connections(self, max_connections: int) -> List[ClientSocket]:
+        """Accepts connections waiting in the listen backlog, at most max_connections, without blocking"""
+        res = []
+        timeout = self.socket.gettimeout()
+        self.socket.setblocking(False)  # the accepted sockets are blocking anyway
+        try:
+            while len(res) < max_connections:
+                try:
+                    s_src, _ = self.socket.accept()
+                except (BlockingIOError, InterruptedError):
+                    break
+                except ssl.SSLError as ssl_err:  # TODO handle errors
+                    logging.error(ssl_err)
+                    continue
+                except OSError as error:  # e.g. EMFILE, the connection waits in the backlog
+                    logging.error(error)
+                    break
+                res.append(ClientSocket.from_socket(s_src))
+        finally:
+            self.socket.settimeout(timeout)
+
+        return res
+
     @classmethod
     def create(
         cls,
@@ -49,18 +73,25 @@ class ServerSocket:
         listen_port: int,
         listen_backlog_param: int = Config.LISTEN_BACKLOG_PARAM,
         timeout=None,
+        reuse_port: bool = False,
     ) -> ServerSocket:
 
         s_srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         s_srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:  # lets several proxy processes listen on the same port, the kernel balances connections
+            s_srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         s_srv.bind((listen_address, listen_port))
         s_srv.listen(listen_backlog_param)
         if Config.SSL_ENABLED:
-            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-            context.load_cert_chain(Config.SSL_CERT_FILE, Config.SSL_KEY_FILE)
-            s_srv = context.wrap_socket(s_srv, server_side=True)
+            s_srv = cls.create_ssl_context().wrap_socket(s_srv, server_side=True)
 
         if timeout:
             s_srv.settimeout(timeout)
 
         return ServerSocket(s_srv)
+
+    @classmethod
+    def create_ssl_context(cls) -> ssl.SSLContext:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(Config.SSL_CERT_FILE, Config.SSL_KEY_FILE)
+        return context
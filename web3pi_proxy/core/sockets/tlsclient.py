@@ -0,0 +1,35 @@
+import socket
+import ssl
+import time
+from typing import Optional, Tuple
+
+
+class TLSClient:
+    """
+    TLS of the connections to an endpoint. The context, and so the CA store, is loaded once for all the connections.
+    A new connection resumes the session of a previous one, which saves a full handshake.
+    """
+
+    def __init__(self, host: str, context: Optional[ssl.SSLContext] = None) -> None:
+        self.host = host
+        self.context = context or ssl.create_default_context()
+        self.session: Optional[ssl.SSLSession] = None
+
+    def wrap_socket(self, sock: socket.socket) -> Tuple[ssl.SSLSocket, float]:
+        """Performs the handshake, returns the TLS socket and the handshake time in seconds"""
+        start = time.perf_counter()
+        try:
+            ssl_sock = self.context.wrap_socket(sock, server_hostname=self.host, session=self.session)
+        except ssl.SSLError:
+            self.session = None  # the next connection makes a full handshake
+            raise
+        return ssl_sock, time.perf_counter() - start
+
+    def save_session(self, ssl_sock: ssl.SSLSocket) -> bool:
+        """Keeps the session of the connection for the next connections, returns False if it cannot be resumed.
+        The session tickets of TLS 1.3 are sent after the handshake, they are received with the first response."""
+        session = ssl_sock.session
+        if session is None or (ssl_sock.version() == "TLSv1.3" and not session.has_ticket):
+            return False
+        self.session = session
+        return True
@@ -0,0 +1,155 @@
+import zlib
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from httptools import HttpResponseParser
+
+from web3pi_proxy.config.conf import Config
+
+GZIP = b"gzip"
+DEFLATE = b"deflate"
+
+# zlib wbits of the content codings, deflate of HTTP is the zlib format
+WBITS = {GZIP: 31, DEFLATE: 15}
+
+
+@lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding: bytes) -> Optional[bytes]:
+    """Returns the content coding for the Accept-Encoding value of a client, gzip preferred, None for identity"""
+    accepted = set()
+    for coding in accept_encoding.lower().split(b","):
+        name, _, params = coding.partition(b";")
+        name = name.strip()
+        if name not in WBITS and name != b"*":
+            continue
+        q = params.strip()
+        if q.startswith(b"q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name)
+    if GZIP in accepted or b"*" in accepted:
+        return GZIP
+    if DEFLATE in accepted:
+        return DEFLATE
+    return None
+
+
+def compress(data: bytes, encoding: bytes, level: int = Config.RESPONSE_COMPRESSION_LEVEL) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+class ResponseCompressor:
+    """
+    Compresses an endpoint response passed in parts, with the content coding negotiated with the client.
+    The response is passed untouched until its size is known to be at least min_size, so small responses are not
+    delayed. A compressed response is re-framed: its body is sent in chunks as soon as the parts are compressed,
+    Content-Length of the endpoint is replaced with Transfer-Encoding: chunked.
+    Responses already encoded by the endpoint are passed untouched.
+    """
+
+    PENDING = 0
+    PASS = 1
+    COMPRESS = 2
+
+    # headers of the endpoint response replaced when the response is compressed
+    REFRAMED_HEADERS = frozenset((b"content-length", b"transfer-encoding", b"vary"))
+
+    def __init__(
+        self,
+        encoding: bytes,
+        min_size: int = Config.RESPONSE_COMPRESSION_MIN_SIZE,
+        level: int = Config.RESPONSE_COMPRESSION_LEVEL,
+    ) -> None:
+        self.encoding = encoding
+        self.min_size = min_size
+        self.level = level
+
+        self.state = self.PENDING
+        self.raw_parts: List[bytes] = []  # the response as received, until it is known not to be compressed
+        self.reason = b""
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.content_length = None
+        self.body_parts: List[bytes] = []
+        self.body_size = 0
+        self.output: List[bytes] = []
+        self.compressor = None
+        self.parser = HttpResponseParser(self)
+
+    def on_status(self, reason: bytes) -> None:
+        self.reason += reason
+
+    def on_header(self, name: bytes, value: bytes) -> None:
+        name_lower = name.lower()
+        if name_lower == b"content-encoding":
+            self.state = self.PASS
+        elif name_lower == b"content-length":
+            self.content_length = int(value)
+        self.headers.append((name, value))
+
+    def on_headers_complete(self) -> None:
+        if self.state == self.PASS:
+            return
+        status_code = self.parser.get_status_code()
+        if status_code < 200 or status_code in (204, 304) or self.parser.get_http_version() != "1.1":
+            self.state = self.PASS
+        elif self.content_length is not None:
+            if self.content_length < self.min_size:
+                self.state = self.PASS
+            else:
+                self.__start_compression()
+
+    def on_body(self, body: bytes) -> None:
+        if self.state == self.COMPRESS:
+            self.__send_chunk(self.compressor.compress(body))
+        elif self.state == self.PENDING:  # the size of a chunked response is not known in advance
+            self.body_parts.append(body)
+            self.body_size += len(body)
+            if self.body_size >= self.min_size:
+                self.__start_compression()
+                self.__send_chunk(self.compressor.compress(b"".join(self.body_parts)))
+                self.body_parts = []
+
+    def on_message_complete(self) -> None:
+        if self.state == self.COMPRESS:
+            self.__send_chunk(self.compressor.flush())
+            self.output.append(b"0\r\n\r\n")
+        elif self.state == self.PENDING:
+            self.state = self.PASS
+
+    def __start_compression(self) -> None:
+        self.state = self.COMPRESS
+        self.compressor = zlib.compressobj(self.level, zlib.DEFLATED, WBITS[self.encoding])
+        head = [b"HTTP/1.1 %d %b\r\n" % (self.parser.get_status_code(), self.reason)]
+        for name, value in self.headers:
+            if name.lower() not in self.REFRAMED_HEADERS:
+                head.append(b"%b: %b\r\n" % (name, value))
+        head.append(
+            b"Content-Encoding: %b\r\nVary: Accept-Encoding\r\nTransfer-Encoding: chunked\r\n\r\n" % self.encoding
+        )
+        self.output.append(b"".join(head))
+
+    def __send_chunk(self, data: bytes) -> None:
+        if data:
+            self.output.append(b"%x\r\n%b\r\n" % (len(data), data))
+
+    def feed_data(self, data: bytes) -> bytes:
+        """Returns the data to be sent to the client, possibly empty"""
+        if self.state == self.PASS:
+            return data
+
+        self.raw_parts.append(bytes(data))  # the data can be a view of a reused receive buffer
+        self.parser.feed_data(data)
+
+        if self.state == self.PASS:
+            raw = b"".join(self.raw_parts)
+            self.raw_parts = []
+            return raw
+        if self.state == self.COMPRESS:
+            self.raw_parts = []
+        output = b"".join(self.output)
+        self.output = []
+        return output
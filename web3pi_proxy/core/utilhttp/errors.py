@@ -1,3 +1,4 @@
+import json
 from typing import Union, Optional
 
 from email.utils import formatdate
@@ -17,6 +18,7 @@ class ErrorResponses:
         410: "Gone",
         413: "Payload Too Large",
         429: "Too Many Requests",
+        431: "Request Header Fields Too Large",
         500: "Internal Server Error",
         503: "Service Unavailable",
     }
@@ -30,6 +32,8 @@ class ErrorResponses:
     PE_PAYMENT_REQUIRED = 3
     PE_PAYLOAD_TOO_LARGE = 4
 
+    PAYMENT_REQUIRED_MESSAGE = "You exceeded the limit of calls. Check your plan"
+
     HTTP_ERROR_TEMPLATE = (
         "HTTP/1.1 {} {}\r\nContent-Type: text/plain\r\nContent-Length: {}\r\n\r\n{}\n"
     )
@@ -46,6 +50,8 @@ class ErrorResponses:
         "nosniff\r\n\r\n{}\n"
     )
 
+    SERVICE_UNAVAILABLE_RESPONSE = None
+
     WEB3_JSON_TEMPLATE = (
         '{{"jsonrpc":"2.0","id":{},"error":{{"code":{},"message":"{}"}}}}'
     )
@@ -69,6 +75,11 @@ class ErrorResponses:
     def web3_json(cls, code: int, message: str, _id: Union[int, str]) -> str:
         return cls.WEB3_JSON_TEMPLATE.format(_id, code, message)
 
+    @classmethod
+    def web3_error_object(cls, code: int, message: str, _id: Optional[Union[int, str]] = None) -> bytes:
+        """JSON-RPC error object, without HTTP headers, e.g. a response to an element of a batch"""
+        return cls.to_bytes(cls.web3_json(code, message, json.dumps(_id)))
+
     @classmethod
     def bad_request_web3(
         cls, code_web3: int, message: str, _id: Optional[Union[int, str]] = None
@@ -85,9 +96,16 @@ class ErrorResponses:
     @classmethod
     def forbidden_payment_required(cls, _id: Optional[Union[int, str]] = None) -> bytes:
         web3_err = -(cls.PROXY_ERROR_BASE_CODE + cls.PE_PAYMENT_REQUIRED)
-        return cls.bad_request_web3(
-            web3_err, "You exceeded the limit of calls. Check your plan", _id
-        )
+        return cls.bad_request_web3(web3_err, cls.PAYMENT_REQUIRED_MESSAGE, _id)
+
+    @classmethod
+    def payment_required_object(cls, _id: Optional[Union[int, str]] = None) -> bytes:
+        web3_err = -(cls.PROXY_ERROR_BASE_CODE + cls.PE_PAYMENT_REQUIRED)
+        return cls.web3_error_object(web3_err, cls.PAYMENT_REQUIRED_MESSAGE, _id)
+
+    @classmethod
+    def connection_error_object(cls, _id: Optional[Union[int, str]] = None) -> bytes:
+        return cls.web3_error_object(-32603, "Could not reach server", _id)
 
     @classmethod
     def parse_error(cls, _id: Optional[Union[int, str]] = None) -> bytes:
@@ -97,6 +115,14 @@ class ErrorResponses:
     def connection_error(cls, _id: Optional[Union[int, str]] = None) -> bytes:
         return cls.bad_request_web3(-32603, "Could not reach server", _id)
 
+    @classmethod
+    def invalid_request_object(cls, _id: Optional[Union[int, str]] = None) -> bytes:
+        return cls.web3_error_object(-32600, "Invalid request", _id)
+
+    @classmethod
+    def invalid_request(cls, _id: Optional[Union[int, str]] = None) -> bytes:
+        return cls.bad_request_web3(-32600, "Invalid request", _id)
+
     @classmethod
     def http_internal_server_error(cls) -> bytes:
         return cls.http_error(500)
@@ -108,10 +134,29 @@ class ErrorResponses:
             "System overload of sorts (proxy run out of resources???). Try again in a few minutes",
         )
 
+    @classmethod
+    def service_unavailable(cls) -> bytes:
+        """Precomputed, it is sent to every connection shed when the proxy is over capacity"""
+        if cls.SERVICE_UNAVAILABLE_RESPONSE is None:
+            message = "Proxy is over capacity, try again later"
+            cls.SERVICE_UNAVAILABLE_RESPONSE = cls.to_bytes(
+                f"HTTP/1.1 503 {cls.ERROR_CODES[503]}\r\nContent-Type: text/plain\r\n"
+                f"Content-Length: {len(message) + 1}\r\nConnection: close\r\nRetry-After: 1\r\n\r\n{message}\n"
+            )
+        return cls.SERVICE_UNAVAILABLE_RESPONSE
+
     @classmethod
     def http_bad_request(cls, message: str = "") -> bytes:
         return cls.http_error(400, message)
 
+    @classmethod
+    def http_payload_too_large(cls) -> bytes:
+        return cls.http_error(413, "Request body exceeds the size limit")
+
+    @classmethod
+    def http_request_header_fields_too_large(cls) -> bytes:
+        return cls.http_error(431, "Request headers exceed the size limit")
+
     @classmethod
     def http_method_not_allowed(cls) -> bytes:
         return cls.http_error(405, "Only POST requests are accepted")
@@ -0,0 +1,22 @@
+from typing import Optional
+
+from web3pi_proxy.config.conf import Config
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+
+
+class ResponseHeaders:
+
+    KEEP_ALIVE_TEMPLATE = "Keep-Alive: timeout={}\r\n"
+
+    @classmethod
+    def extra_headers(
+        cls, req: RPCRequest, idle_timeout: int = Config.CLIENT_IDLE_TIMEOUT
+    ) -> Optional[bytes]:
+        """Headers added by the proxy to the endpoint response, each terminated with CRLF"""
+        headers = b""
+        if req.cors_origin is not None:  # TODO CORS support here is very crude, needs improvement
+            headers += b"Access-Control-Allow-Origin: " + req.cors_origin + b"\r\n"
+        if req.keep_alive and idle_timeout > 0:  # the client should not reuse the connection after the proxy closes it
+            headers += cls.KEEP_ALIVE_TEMPLATE.format(idle_timeout).encode()
+
+        return headers or None
@@ -174,6 +174,8 @@ class RPCServiceAdmin:
         return self.as_dict(self.proxy_stats)
 
     def query_list_endpoints(self) -> ReturnType:
+        if self.endpoint_manager is None:  # multi-process mode, endpoints are managed by the proxy processes
+            return {}
         endpoints = self.endpoint_manager.get_endpoints()
         return_endpoints = {k: self.as_dict(v) for k, v in self.endpoint_stats.items()}
         if return_endpoints is None:
@@ -186,7 +188,7 @@ class RPCServiceAdmin:
         return return_endpoints
 
     def query_endpoint_stats(self, endpoint_name: str) -> ReturnType:
-        if endpoint_name in self.endpoint_stats:
+        if endpoint_name in self.endpoint_stats and self.endpoint_manager is not None:
             v = self.as_dict(self.endpoint_stats[endpoint_name])
             v["status"] = self.endpoint_manager.get_pool(endpoint_name).status
             return v
@@ -204,9 +206,13 @@ class RPCServiceAdmin:
     # #                ENDPOINT OPERATIONS                    #
     # #########################################################
     def get_endpoints(self) -> ReturnType:
+        if self.endpoint_manager is None:
+            return {"error": "endpoints are not available in the multi-process mode"}
         return self.endpoint_manager.get_endpoints()
 
     def add_endpoint(self, name: str, url: str) -> ReturnType:
+        if self.endpoint_manager is None:
+            return {"error": "endpoints are not available in the multi-process mode"}
         res = self.endpoint_manager.add_endpoint(name, url)
         if type(res) is dict:  # TODO not too good error handling
             return res
@@ -214,6 +220,8 @@ class RPCServiceAdmin:
         return {"message": f"Added and saved configuration for endpoint '{name}'"}
 
     def remove_endpoint(self, name: str) -> ReturnType:
+        if self.endpoint_manager is None:
+            return {"error": "endpoints are not available in the multi-process mode"}
         res = self.endpoint_manager.remove_endpoint(name)
         if type(res) is dict:  # TODO not too good error handling
             return res
@@ -221,6 +229,8 @@ class RPCServiceAdmin:
         return {"message": f"Removed endpoint '{name}'"}
 
     def update_endpoint(self, name: str, url: str) -> ReturnType:
+        if self.endpoint_manager is None:
+            return {"error": "endpoints are not available in the multi-process mode"}
         res = self.endpoint_manager.update_endpoint(name, url)
         if type(res) is dict:  # TODO not too good error handling
             return res
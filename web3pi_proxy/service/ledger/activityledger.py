@@ -60,6 +60,21 @@ class SimpleActivityLedger(StateUpdater):
             request=request, response=response, response_only=True
         )
 
+    def record_activity(
+        self,
+        user_api_key: str,
+        method: str,
+        req_bytes: int,
+        resp_bytes: int,
+        num_calls: int,
+    ) -> None:
+        """Records activity already reduced to numbers, e.g. forwarded from another proxy process"""
+        sample = self.get_active_state_sample()
+        sample.update_stats(user_api_key, method, req_bytes, resp_bytes, num_calls)
+        self.all_time_summary.update_stats(
+            user_api_key, method, req_bytes, resp_bytes, num_calls
+        )
+
     def get_all_time_summary(self) -> ServiceActivitySummary:
         return self.all_time_summary
 
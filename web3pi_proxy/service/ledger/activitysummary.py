@@ -81,11 +81,21 @@ class ServiceActivitySummary:
             req_bytes = 0
         else:
             num_calls = 1
-            req_bytes = len(request.last_queried_bytes)
+            req_bytes = request.last_queried_size
 
-        if request.user_api_key:  # in the ProxyMode.SIM there can be no user context
-            uas_entry = self._get_or_create_uas(request.user_api_key)
-            uas_entry.update(request.method, req_bytes, len(response), num_calls)
+        self.update_stats(request.user_api_key, request.method, req_bytes, len(response), num_calls)
+
+    def update_stats(
+        self,
+        user_api_key: Optional[str],
+        method: str,
+        req_bytes: int,
+        resp_bytes: int,
+        num_calls: int,
+    ) -> None:
+        if user_api_key:  # in the ProxyMode.SIM there can be no user context
+            uas_entry = self._get_or_create_uas(user_api_key)
+            uas_entry.update(method, req_bytes, resp_bytes, num_calls)
 
     def to_dict(self) -> Dict[str, Any]:
         # with self.__lock:
@@ -0,0 +1,71 @@
+import multiprocessing
+import os
+from threading import Thread
+from typing import Callable
+
+from web3pi_proxy.state.sharedstate import ActivityAggregator, SharedStateManager
+from web3pi_proxy.state.statemanager import SampleStateManager
+from web3pi_proxy.utils.logger import get_logger
+
+
+class MultiProcessWeb3RPCProxy:
+    """
+    Runs the proxy in several processes listening on the same port (SO_REUSEPORT).
+    The main process keeps the service state: client and call permissions are served to the workers
+    by SharedStateManager and the activity recorded by the workers is applied to the ledger by ActivityAggregator,
+    so the user limits are verified against the activity of all the processes.
+    """
+
+    __logger = get_logger("MultiProcessWeb3RPCProxy")
+
+    def __init__(
+        self,
+        ssm: SampleStateManager,
+        num_processes: int,
+        worker_target: Callable,
+        *worker_args,
+    ) -> None:
+        # workers are forked, so they start with the configuration and the modules already loaded by this process
+        ctx = multiprocessing.get_context("fork")
+
+        SharedStateManager.register_permissions(
+            ssm.get_client_permissions_instance(), ssm.get_call_permissions_instance()
+        )
+        authkey = os.urandom(32)
+        self.shared_state_server = SharedStateManager(authkey=authkey).get_server()
+
+        records = ctx.Queue()
+        self.activity_aggregator = ActivityAggregator(ssm.activity_ledger, records)
+
+        # fork before any thread of this process is started
+        self.processes = [
+            ctx.Process(
+                target=worker_target,
+                args=(self.shared_state_server.address, authkey, records, *worker_args),
+                name=f"proxy-worker-{i}",
+            )
+            for i in range(num_processes)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def __join_processes(self) -> None:
+        for process in self.processes:
+            process.join()
+            if process.exitcode:
+                self.__logger.error(f"Proxy process {process.name} exited with code {process.exitcode}")
+
+    def run_forever(self) -> None:
+        # the server is never stopped explicitly, it lives as long as the main process
+        Thread(target=self.shared_state_server.serve_forever, daemon=True).start()
+        self.activity_aggregator.start()
+
+        while True:
+            try:
+                self.__join_processes()
+                break
+            except KeyboardInterrupt:
+                # the workers get the interrupt as well, wait until they flush the recorded activity
+                pass
+
+        self.activity_aggregator.stop()
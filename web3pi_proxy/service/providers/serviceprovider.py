@@ -1,7 +1,9 @@
 import json
-from typing import List
+from multiprocessing.queues import Queue
+from typing import List, Union
 
 from web3pi_proxy.config.conf import Config
+from web3pi_proxy.core.asyncproxy import AsyncWeb3RPCProxy
 from web3pi_proxy.core.interfaces.rpcresponse import RPCResponseHandler
 from web3pi_proxy.core.proxy import Web3RPCProxy
 from web3pi_proxy.core.rpc.node.endpoint_pool import load_balancers
@@ -15,6 +17,7 @@ from web3pi_proxy.core.rpc.request.middleware.requestmiddlewaredescr import (
     RequestMiddlewareDescr,
 )
 from web3pi_proxy.db.models import Endpoint
+from web3pi_proxy.interfaces.servicestate import StateUpdater
 from web3pi_proxy.service.factories.requestmiddlewarefactory import (
     RPCRequestMiddlewareFactory,
 )
@@ -25,6 +28,8 @@ from web3pi_proxy.service.http.adminserver import (
     AdminHTTPServerThread,
     AdminServerRequestHandler,
 )
+from web3pi_proxy.service.processes.proxyprocesses import MultiProcessWeb3RPCProxy
+from web3pi_proxy.state.sharedstate import ForwardingStateUpdater, SharedStateManager
 from web3pi_proxy.state.statemanager import SampleStateManager
 
 
@@ -44,7 +49,9 @@ class ServiceComponentsProvider:
         descriptors = [
             (
                 entrypoint["name"],
-                EndpointConnectionDescriptor.from_url(entrypoint["url"]),
+                EndpointConnectionDescriptor.from_url(
+                    entrypoint["url"], entrypoint.get("min_idle"), entrypoint.get("max_idle")
+                ),
             )
             for entrypoint in endpoint_config
         ]
@@ -63,6 +70,28 @@ class ServiceComponentsProvider:
     def create_default_response_handler(cls) -> RPCResponseHandler:
         return RPCResponseMiddlewareFactory.create_default_response_handler()
 
+    @classmethod
+    def create_proxy(
+        cls,
+        middlewares: RequestMiddlewareDescr,
+        connection_pool: EndpointConnectionPoolManager,
+        state_updater: StateUpdater,
+        proxy_address: str,
+        proxy_port: int,
+        num_proxy_workers: int,
+        reuse_port: bool = False,
+    ) -> Union[Web3RPCProxy, AsyncWeb3RPCProxy]:
+        proxy_class = AsyncWeb3RPCProxy if Config.PROXY_ENGINE == "asyncio" else Web3RPCProxy
+        return proxy_class(
+            proxy_address,
+            proxy_port,
+            num_proxy_workers,
+            middlewares,
+            connection_pool,
+            state_updater,
+            reuse_port,
+        )
+
     @classmethod
     def create_web3_rpc_proxy(
         cls,
@@ -71,18 +100,18 @@ class ServiceComponentsProvider:
         proxy_address: str,
         proxy_port: int,
         num_proxy_workers: int,
-    ) -> Web3RPCProxy:
+    ) -> Union[Web3RPCProxy, AsyncWeb3RPCProxy]:
         # Create default components
         middlewares = cls.configure_default_reader_middlewares(ssm)
 
         # Create proxy (do not launch it yet)
-        proxy = Web3RPCProxy(
-            proxy_address,
-            proxy_port,
-            num_proxy_workers,
+        proxy = cls.create_proxy(
             middlewares,
             connection_pool,
             ssm.get_service_state_updater_instance(),
+            proxy_address,
+            proxy_port,
+            num_proxy_workers,
         )
 
         # Pass proxy stats to StateManager, so that it may be queried
@@ -94,23 +123,79 @@ class ServiceComponentsProvider:
         return proxy
 
     @classmethod
-    def create_default_web3_rpc_proxy(
-        cls, ssm: SampleStateManager, proxy_listen_address, proxy_listen_port, num_proxy_workers: int
-    ) -> Web3RPCProxy:
+    def load_eth_endpoints(cls) -> List[dict]:
         if Config.ETH_ENDPOINTS_STORE:
             eth_endpoints = []
-            uuu = Endpoint.select(Endpoint.config)
             for eth_endpoint_data in Endpoint.select(Endpoint.config):
                 eth_endpoints.append(json.loads(eth_endpoint_data.config))
         else:
             eth_endpoints = Config.ETH_ENDPOINTS
+        return eth_endpoints
+
+    @classmethod
+    def create_default_web3_rpc_proxy(
+        cls, ssm: SampleStateManager, proxy_listen_address, proxy_listen_port, num_proxy_workers: int
+    ) -> Union[Web3RPCProxy, AsyncWeb3RPCProxy]:
         # Create default components
-        connection_pool = cls.create_default_connection_pool(eth_endpoints, Config.LOADBALANCER)
+        connection_pool = cls.create_default_connection_pool(cls.load_eth_endpoints(), Config.LOADBALANCER)
 
         return cls.create_web3_rpc_proxy(
             ssm, connection_pool, proxy_listen_address, proxy_listen_port, num_proxy_workers
         )
 
+    @classmethod
+    def run_proxy_worker_process(
+        cls,
+        shared_state_address,
+        authkey: bytes,
+        records: Queue,
+        eth_endpoints: List[dict],
+        proxy_listen_address,
+        proxy_listen_port,
+        num_proxy_workers: int,
+    ) -> None:
+        shared_state = SharedStateManager(address=shared_state_address, authkey=authkey)
+        shared_state.connect()
+
+        middlewares = RPCRequestMiddlewareFactory.create_default_descr(
+            shared_state.client_permissions(), shared_state.call_permissions()
+        )
+        connection_pool = cls.create_default_connection_pool(eth_endpoints, Config.LOADBALANCER)
+        state_updater = ForwardingStateUpdater(records)
+
+        proxy = cls.create_proxy(
+            middlewares,
+            connection_pool,
+            state_updater,
+            proxy_listen_address,
+            proxy_listen_port,
+            num_proxy_workers,
+            reuse_port=True,
+        )
+        proxy.run_forever()
+
+        state_updater.close()
+
+    @classmethod
+    def create_multiprocess_web3_rpc_proxy(
+        cls,
+        ssm: SampleStateManager,
+        proxy_listen_address,
+        proxy_listen_port,
+        num_proxy_workers: int,
+        num_processes: int,
+    ) -> MultiProcessWeb3RPCProxy:
+        # Endpoint statistics and management stay in the worker processes, they are not available to the admin
+        return MultiProcessWeb3RPCProxy(
+            ssm,
+            num_processes,
+            cls.run_proxy_worker_process,
+            cls.load_eth_endpoints(),
+            proxy_listen_address,
+            proxy_listen_port,
+            num_proxy_workers,
+        )
+
     @classmethod
     def create_admin_http_server_thread(
         cls, state_manager: SampleStateManager, listen_address, listen_port
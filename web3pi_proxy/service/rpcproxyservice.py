@@ -63,9 +63,14 @@ class DefaultRPCProxyService:
         admin_thread = ServiceComponentsProvider.create_admin_http_server_thread(
             self.state_manager, admin_address, admin_port,
         )
-        proxy_server = ServiceComponentsProvider.create_default_web3_rpc_proxy(
-            self.state_manager, proxy_address, proxy_port, num_proxy_workers
-        )
+        if Config.NUM_PROCESSES > 1:
+            proxy_server = ServiceComponentsProvider.create_multiprocess_web3_rpc_proxy(
+                self.state_manager, proxy_address, proxy_port, num_proxy_workers, Config.NUM_PROCESSES
+            )
+        else:
+            proxy_server = ServiceComponentsProvider.create_default_web3_rpc_proxy(
+                self.state_manager, proxy_address, proxy_port, num_proxy_workers
+            )
 
         admin_thread.start()
         proxy_server.run_forever()
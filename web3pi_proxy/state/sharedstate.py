@@ -0,0 +1,112 @@
+from multiprocessing.managers import BaseManager
+from multiprocessing.queues import Queue
+from queue import Empty, SimpleQueue
+from threading import Thread
+
+from web3pi_proxy.core.rpc.request.rpcrequest import RPCRequest
+from web3pi_proxy.interfaces.permissions import CallPermissions, ClientPermissions
+from web3pi_proxy.interfaces.servicestate import StateUpdater
+from web3pi_proxy.service.ledger.activityledger import SimpleActivityLedger
+from web3pi_proxy.utils.logger import get_logger
+
+
+class SharedStateManager(BaseManager):
+    """
+    Exposes the permissions of the main process state to the proxy worker processes.
+    The main process serves it, the workers connect to it.
+    """
+
+    @classmethod
+    def register_permissions(
+        cls, client_permissions: ClientPermissions, call_permissions: CallPermissions
+    ) -> None:
+        # worker processes are forked, so they inherit this registry too
+        cls.register(
+            "client_permissions",
+            callable=lambda: client_permissions,
+            exposed=("is_authorized",),
+        )
+        cls.register(
+            "call_permissions",
+            callable=lambda: call_permissions,
+            exposed=("is_allowed", "get_call_priority", "get_user_constant_pool"),
+        )
+
+
+class ForwardingStateUpdater(StateUpdater):
+    """
+    StateUpdater of the proxy worker processes, the activity is forwarded to the main process in batches.
+    Proxy threads only append to a local queue, the batches are sent by a separate thread.
+    """
+
+    __logger = get_logger("ForwardingStateUpdater")
+
+    def __init__(self, records: Queue) -> None:
+        self.records = records
+        self.pending = SimpleQueue()
+
+        self.forwarding_thread = Thread(target=self.__forward, daemon=True)
+        self.forwarding_thread.start()
+
+    # records are (user_api_key, method, req_bytes, resp_bytes, num_calls)
+    def record_rpc_request(self, request: RPCRequest) -> None:
+        if request.user_api_key:  # in the ProxyMode.SIM there can be no user context
+            self.pending.put((request.user_api_key, request.method, request.last_queried_size, 0, 1))
+
+    def record_rpc_response(self, request: RPCRequest, response: bytearray) -> None:
+        if request.user_api_key:
+            self.pending.put((request.user_api_key, request.method, 0, len(response), 0))
+
+    def __forward(self) -> None:
+        finished = False
+        while not finished:
+            batch = []
+            record = self.pending.get()
+            while True:
+                if record is None:
+                    finished = True
+                    break
+                batch.append(record)
+                try:
+                    record = self.pending.get_nowait()
+                except Empty:
+                    break
+            if batch:
+                self.records.put(batch)
+
+    def close(self) -> None:
+        """Sends the remaining records and waits until they are flushed to the main process"""
+        self.pending.put(None)
+        self.forwarding_thread.join()
+        self.records.close()
+        self.records.join_thread()
+        self.__logger.debug("Forwarding state updater closed")
+
+
+class ActivityAggregator:
+    """Applies the activity forwarded by the proxy worker processes to the ledger of the main process"""
+
+    __logger = get_logger("ActivityAggregator")
+
+    def __init__(self, activity_ledger: SimpleActivityLedger, records: Queue) -> None:
+        self.activity_ledger = activity_ledger
+        self.records = records
+
+        self.aggregator_thread = Thread(target=self.__aggregate, daemon=True)
+
+    def start(self) -> None:
+        self.aggregator_thread.start()
+
+    def __aggregate(self) -> None:
+        while True:
+            batch = self.records.get()
+            if batch is None:
+                break
+            for record in batch:
+                self.activity_ledger.record_activity(*record)
+
+    def stop(self) -> None:
+        """Applies the records that are still queued, call when no more records are sent"""
+        self.records.put(None)
+        self.aggregator_thread.join()
+        self.__logger.debug("Activity aggregator stopped")